@@ -0,0 +1,159 @@
+"""Admission control: bounded concurrency pools with bounded wait queues.
+
+An AdmissionPool lets limit callers in at once and up to max_waiting more wait
+for a slot, for at most max_wait_seconds. Past that it sheds load instead of
+letting latency grow for everyone: a caller arriving at a full wait queue is
+rejected at once with 429, one that waited too long with 503. Both carry a
+Retry-After estimated from the pool's recent slot hold times and its queue.
+
+Three pools are used: agent turns (AdmissionMiddleware in front of the ADK run
+endpoints), and DB reads and DB writes (in the Repo, around every query and
+write). Their slots in use, queue depth, limit, wait times and rejections are
+exported through metrics for sizing.
+"""
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Collection
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+import metrics
+
+# Weight of the latest slot hold time in the moving average behind Retry-After
+HOLD_TIME_SMOOTHING = 0.1
+
+
+class Overloaded(Exception):
+    """Raised when an admission pool sheds a caller; carries the HTTP status and Retry-After."""
+
+    def __init__(self, pool: str, status_code: int, retry_after: int):
+        self.pool = pool
+        self.status_code = status_code
+        self.retry_after = retry_after
+        reason = "queue is full" if status_code == 429 else "wait timed out"
+        super().__init__(f"{pool} overloaded: {reason}, retry after {retry_after} s")
+
+
+class AdmissionPool:
+    """At most limit concurrent holders, at most max_waiting waiters.
+
+    Use as ``async with pool.slot():``. Runs on the event loop thread, so counters need no lock.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int, max_wait_seconds: float):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait_seconds = max_wait_seconds
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.avg_hold_seconds = 0.0
+        self._semaphore = asyncio.Semaphore(limit)
+        self._labels = (name,)
+        metrics.ADMISSION_LIMIT.set(self._labels, limit)
+        self._publish()
+
+    def _publish(self):
+        metrics.ADMISSION_ACTIVE.set(self._labels, self.active)
+        metrics.ADMISSION_QUEUE_DEPTH.set(self._labels, self.waiting)
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new caller, at least 1."""
+        return max(1, math.ceil(self.avg_hold_seconds * (self.waiting + 1) / self.limit))
+
+    def _reject(self, status_code: int, reason: str):
+        self.rejected += 1
+        metrics.ADMISSION_REJECTED.inc(self._labels + (reason,))
+        raise Overloaded(self.name, status_code, self.retry_after())
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.max_waiting:
+                self._reject(429, "queue_full")
+            self.waiting += 1
+            self._publish()
+            started = time.perf_counter()
+            # Not wait_for: before Python 3.12 it drops a cancel that lands just as the
+            # slot is granted, and the cancelled caller would carry on
+            try:
+                async with asyncio.timeout(self.max_wait_seconds):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                self._reject(503, "timeout")
+            finally:
+                self.waiting -= 1
+                self._publish()
+                metrics.ADMISSION_WAIT_SECONDS.observe(self._labels, time.perf_counter() - started)
+        else:
+            await self._semaphore.acquire()
+            metrics.ADMISSION_WAIT_SECONDS.observe(self._labels, 0.0)
+        self.active += 1
+        self._publish()
+
+    def release(self, held_seconds: float):
+        self.active -= 1
+        self._semaphore.release()
+        self.avg_hold_seconds += (held_seconds - self.avg_hold_seconds) * HOLD_TIME_SMOOTHING
+        self._publish()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block."""
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                "max_waiting": self.max_waiting, "rejected": self.rejected,
+                "avg_hold_ms": round(self.avg_hold_seconds * 1000, 3)}
+
+
+def overloaded_response(error: Overloaded) -> JSONResponse:
+    return JSONResponse({"detail": str(error)}, status_code=error.status_code,
+                        headers={"Retry-After": str(error.retry_after)})
+
+
+def tool_overloaded(tool, args, tool_context, error: Exception):
+    """on_tool_error_callback for an LlmAgent: a tool shed by a DB pool answers with the
+    error and Retry-After, so the model can tell the user, instead of failing the run."""
+    if isinstance(error, Overloaded):
+        return {"error": str(error), "retry_after_seconds": error.retry_after}
+    return None
+
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting the requests to paths through pool; other requests pass.
+
+    The slot is held until the response, e.g. an agent's event stream, is complete.
+    Rejected HTTP requests get overloaded_response(), rejected websockets are closed
+    with 1013 (try again later).
+    """
+
+    def __init__(self, app: ASGIApp, pool: AdmissionPool, paths: Collection[str]):
+        self.app = app
+        self.pool = pool
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] not in ("http", "websocket") or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.pool.acquire()
+        except Overloaded as error:
+            if scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1013, "reason": str(error)})
+            else:
+                await overloaded_response(error)(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.pool.release(time.perf_counter() - started)
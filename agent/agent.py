@@ -2,25 +2,37 @@ from google.adk.agents import LlmAgent
 from agent.prompt import *
 from agent.tools import *
 from constants import AGENT_NAME, AGENT_DESCRIPTION, AGENT_MODEL
+from metrics import model_call_started, model_call_finished, model_call_failed
+from admission import tool_overloaded
 
 root_agent = LlmAgent(
     name=AGENT_NAME,
     model=AGENT_MODEL,
     description=AGENT_DESCRIPTION,
     instruction=ROOT_AGENT_PROMPT,
+    before_model_callback=model_call_started,
+    after_model_callback=model_call_finished,
+    on_model_error_callback=model_call_failed,
+    on_tool_error_callback=tool_overloaded,
     tools=[
         get_inventory,
         get_items_by_category,
         get_items_needing_reorder,
+        draft_purchase_orders,
+        plan_reorders,
         check_item_stock,
+        check_items_stock,
         update_item_quantity,
+        update_items_quantities,
         remove_item,
+        remove_items,
         add_sample_inventory_data,
         get_inventory_count,
         get_total_stock_value,
         get_top_supplier,
         get_last_updated_item,
         get_items_not_updated_6_months,
+        get_stock_history,
         get_category_highest_avg_price,
         create_supplier_model,
         get_supplier_lowest_reorder_frequency,
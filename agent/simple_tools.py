@@ -1,22 +1,25 @@
-from services.service import Service
-from repos.repo import Repo
-from constants import DB_NAME
-
-repo = Repo(DB_NAME)
-service = Service(repo)
+from services.container import get_service
+from metrics import instrument
 
+@instrument("tool")
 async def get_inventory():
     """Get all inventory items"""
+    service = await get_service()
     items = await service.get_all_inventory_items()
     return [{"name": item.item_name, "quantity": item.quantity, "category": item.category} for item in items]
 
+@instrument("tool")
 async def count_items():
     """Count total inventory items"""
-    items = await service.get_all_inventory_items()
-    return {"count": len(items)}
+    service = await get_service()
+    totals = await service.get_inventory_totals()
+    return {"count": totals["item_count"]}
 
+@instrument("tool")
 async def check_stock(item_name: str):
     """Check if item is in stock"""
-    items = await service.get_all_inventory_items()
-    item = next((i for i in items if item_name.lower() in i.item_name.lower()), None)
+    service = await get_service()
+    item, matches = await service.resolve_inventory_item(item_name)
+    if not item and matches:
+        return {"found": False, "quantity": 0, "candidates": [match.item_name for match, _ in matches]}
     return {"found": bool(item), "quantity": item.quantity if item else 0}
\ No newline at end of file
@@ -1,74 +1,195 @@
-from services.service import Service
-from repos.repo import Repo
-from constants import DB_NAME
-from models.data_models import InventoryItem, Supplier
+from services.container import get_service
+from metrics import instrument
+from models.data_models import InventoryItem, Supplier, QuantityDelta, QuantityAdjustment, ItemQuantity
+from fastapi import HTTPException
 from datetime import datetime, timedelta
 import random
 from typing import List, Optional
 
-repo = Repo(DB_NAME)
-service = Service(repo)
+def _candidates(matches) -> List[dict]:
+    return [{"item_name": item.item_name, "score": round(score, 2)} for item, score in matches]
+
+def _ambiguous(item_name: str, matches) -> dict:
+    return {"message": f"'{item_name}' matches several items, ask which one is meant", "candidates": _candidates(matches)}
+
+def _stock_status(item_name: str, item, matches) -> dict:
+    if not item:
+        if matches:
+            return {"found": False, **_ambiguous(item_name, matches)}
+        return {"found": False, "message": f"{item_name} not found in inventory"}
+    return {"found": True, "item_name": item.item_name, "quantity": item.quantity, "in_stock": item.quantity > 0, "status": "IN STOCK" if item.quantity > 0 else "OUT OF STOCK"}
+
+def _new_item(item_name: str, quantity: int) -> InventoryItem:
+    return InventoryItem(id=str(random.randint(1000000000000, 9999999999999)), item_name=item_name, category="Spare Parts", quantity=quantity, reorder_level=5, supplier="Default Supplier", unit_price=0.0, last_updated=datetime.utcnow())
+
+_ADJUSTMENT_ERRORS = {
+    "not_found": "was removed before it could be updated",
+    "version_conflict": "was modified concurrently, check it again",
+    "insufficient_stock": "cannot go below zero",
+}
 
 # Fetch all inventory items
+@instrument("tool")
 async def get_inventory() -> List[dict]:
+    service = await get_service()
     items = await service.get_all_inventory_items()
     return [{"id": item.id, "item_name": item.item_name, "category": item.category, "quantity": item.quantity, "reorder_level": item.reorder_level, "supplier": item.supplier, "unit_price": item.unit_price} for item in items]
 
 # Get items by category
+@instrument("tool")
 async def get_items_by_category(category: str) -> List[dict]:
     """Get all items belonging to a specific category"""
-    items = await service.get_all_inventory_items()
-    filtered_items = [item for item in items if item.category and category.lower() in item.category.lower()]
-    return [{"item_name": item.item_name, "quantity": item.quantity, "category": item.category} for item in filtered_items]
+    service = await get_service()
+    items = await service.get_inventory_items_by_category(category)
+    return [{"item_name": item.item_name, "quantity": item.quantity, "category": item.category} for item in items]
 
 # Get items needing reordering
+@instrument("tool")
 async def get_items_needing_reorder() -> List[dict]:
     """Get all items where quantity is below reorder level"""
-    items = await service.get_all_inventory_items()
-    reorder_items = [item for item in items if item.quantity < item.reorder_level]
-    return [{"item_name": item.item_name, "current_quantity": item.quantity, "reorder_level": item.reorder_level, "shortage": item.reorder_level - item.quantity} for item in reorder_items]
+    service = await get_service()
+    reorder_items = await service.get_items_needing_reorder()
+    return [{"item_name": item.item_name, "current_quantity": item.quantity, "reorder_level": item.reorder_level, "shortage": item.reorder_level - item.quantity, "supplier": item.supplier} for item in reorder_items]
+
+# Draft purchase orders from the reorder queue
+@instrument("tool")
+async def draft_purchase_orders() -> List[dict]:
+    """Get the items needing reordering grouped per supplier, with the quantity to order and its estimated cost, to draft one purchase order per supplier"""
+    service = await get_service()
+    queue = await service.get_reorder_queue()
+    return [{"supplier": group["supplier"] or "Unknown supplier", "estimated_cost": round(group["estimated_cost"], 2), "lines": [{"item_name": line["item_name"], "order_quantity": line["shortage"]} for line in group["items"]]} for group in queue]
+
+# Plan reorders for the whole catalogue within a budget
+@instrument("tool")
+async def plan_reorders(budget: Optional[float] = None, supplier: Optional[str] = None, category: Optional[str] = None) -> dict:
+    """Plan what to reorder across the whole inventory: order quantity and cost per item and per supplier, most urgent first. With a budget, funds orders most urgent first, skipping any that no longer fit, and says which are funded"""
+    service = await get_service()
+    plan = await service.plan_reorders(budget, supplier, category, limit=20)
+    return {"items_to_reorder": plan["items"], "total_cost": plan["cost"], "budget": budget, "funded_items": plan["funded_items"], "funded_cost": plan["funded_cost"],
+            "suppliers": [{"supplier": total["supplier"] or "Unknown supplier", "items": total["items"], "cost": total["cost"], "funded_cost": total["funded_cost"]} for total in plan["suppliers"][:20]],
+            "most_urgent": [{"item_name": line["item_name"], "quantity": line["quantity"], "order_quantity": line["order_quantity"], "cost": line["cost"], "funded": line["funded"]} for line in plan["lines"]]}
 
 # Check stock status of specific item
+@instrument("tool")
 async def check_item_stock(item_name: str) -> dict:
     """Check if a specific item is in stock"""
-    items = await service.get_all_inventory_items()
-    item = next((item for item in items if item_name.lower() in item.item_name.lower()), None)
-    
-    if not item:
-        return {"found": False, "message": f"{item_name} not found in inventory"}
-    
-    return {"found": True, "item_name": item.item_name, "quantity": item.quantity, "in_stock": item.quantity > 0, "status": "IN STOCK" if item.quantity > 0 else "OUT OF STOCK"}
+    service = await get_service()
+    item, matches = await service.resolve_inventory_item(item_name)
+    return _stock_status(item_name, item, matches)
+
+# Check stock status of several items at once
+@instrument("tool")
+async def check_items_stock(item_names: List[str]) -> dict:
+    """Check whether several items are in stock with one call. Returns one result per name, in order"""
+    service = await get_service()
+    resolved = await service.resolve_inventory_items(item_names)
+    return {"results": [{"requested": name, **_stock_status(name, item, matches)} for name, (item, matches) in zip(item_names, resolved)]}
 
 # Update item quantity
+@instrument("tool")
 async def update_item_quantity(item_name: str, new_quantity: int) -> dict:
     """Update the quantity of a specific item"""
-    items = await service.get_all_inventory_items()
-    item = next((item for item in items if item_name.lower() in item.item_name.lower()), None)
+    service = await get_service()
+    item, matches = await service.resolve_inventory_item(item_name)
     
+    if not item and matches:
+        return {"success": False, **_ambiguous(item_name, matches)}
     if not item:
-        new_item = InventoryItem(id=str(random.randint(1000000000000, 9999999999999)), item_name=item_name, category="Spare Parts", quantity=new_quantity, reorder_level=5, supplier="Default Supplier", unit_price=0.0, last_updated=datetime.utcnow())
-        await service.create_inventory_item(new_item)
+        await service.create_inventory_item(_new_item(item_name, new_quantity))
         return {"success": True, "message": f"Created new item '{item_name}' with quantity {new_quantity}"}
     
-    item.quantity = new_quantity
-    await service.update_inventory_item(item.id, item)
-    return {"success": True, "message": f"Updated '{item_name}' quantity to {new_quantity}"}
+    # Apply the difference as a delta, refused if the item changed since it was read
+    delta = QuantityDelta(delta=new_quantity - item.quantity, expected_version=item.version)
+    try:
+        await service.adjust_inventory_quantity(item.id, delta)
+    except HTTPException as e:
+        return {"success": False, "message": e.detail}
+    return {"success": True, "message": f"Updated '{item.item_name}' quantity to {new_quantity}"}
+
+# Update the quantities of several items at once
+@instrument("tool")
+async def update_items_quantities(updates: List[ItemQuantity]) -> dict:
+    """Set the quantities of several items with one call, e.g. to restock a list of parts. Items not found are created. Returns one result per update, in order"""
+    service = await get_service()
+    resolved = await service.resolve_inventory_items([update.item_name for update in updates])
+    # Updates naming the same missing item or resolving to the same item are applied once,
+    # with the last quantity requested for it, and share its result
+    results, to_create, to_adjust = [], {}, {}
+    for update, (item, matches) in zip(updates, resolved):
+        result = {"requested": update.item_name, "new_quantity": update.new_quantity}
+        results.append(result)
+        if not item and matches:
+            result.update(success=False, **_ambiguous(update.item_name, matches))
+        elif not item:
+            target = to_create.setdefault(update.item_name.casefold(), {"name": update.item_name, "results": []})
+            target.update(quantity=update.new_quantity)
+            target["results"].append(result)
+        else:
+            target = to_adjust.setdefault(item.id, {"item": item, "results": []})
+            target.update(quantity=update.new_quantity)
+            target["results"].append(result)
+
+    new_items = [_new_item(target["name"], target["quantity"]) for target in to_create.values()]
+    # Deltas against the version read, refused per item if it changed since
+    adjustments = [QuantityAdjustment(item_id=target["item"].id, delta=target["quantity"] - target["item"].quantity,
+                                      expected_version=target["item"].version) for target in to_adjust.values()]
+    # Creations and deltas commit in one transaction; each result reports what the database did
+    created, adjusted = await service.create_and_adjust_inventory_items(new_items, adjustments)
+    for target, outcome in zip(to_create.values(), created):
+        name = target["name"]
+        if "error" in outcome:
+            reported = {"success": False, "message": f"'{name}' was created concurrently, check it again"}
+        else:
+            reported = {"success": True, "message": f"Created new item '{name}' with quantity {outcome['quantity']}"}
+        for result in target["results"]:
+            result.update(item_name=name, **reported)
+    for target, outcome in zip(to_adjust.values(), adjusted):
+        name = target["item"].item_name
+        if "error" in outcome:
+            reported = {"success": False, "message": f"'{name}' {_ADJUSTMENT_ERRORS[outcome['error']]}"}
+        else:
+            reported = {"success": True, "message": f"Updated '{name}' quantity to {outcome['quantity']}"}
+        for result in target["results"]:
+            result.update(item_name=name, **reported)
+    return {"results": results, "succeeded": sum(result["success"] for result in results), "failed": sum(not result["success"] for result in results)}
 
 # Remove item from inventory
+@instrument("tool")
 async def remove_item(item_name: str) -> dict:
     """Remove a specific item from inventory"""
-    items = await service.get_all_inventory_items()
-    item = next((item for item in items if item_name.lower() in item.item_name.lower()), None)
+    service = await get_service()
+    item, matches = await service.resolve_inventory_item(item_name)
     
     if not item:
+        if matches:
+            return {"success": False, **_ambiguous(item_name, matches)}
         return {"success": False, "message": f"{item_name} not found in inventory"}
     
     await service.delete_inventory_item(item.id)
-    return {"success": True, "message": f"Removed '{item_name}' from inventory"}
+    return {"success": True, "message": f"Removed '{item.item_name}' from inventory"}
+
+# Remove several items at once
+@instrument("tool")
+async def remove_items(item_names: List[str]) -> dict:
+    """Remove several items from inventory with one call. Returns one result per name, in order"""
+    service = await get_service()
+    resolved = await service.resolve_inventory_items(item_names)
+    deleted = set(await service.delete_inventory_items(list({item.id for item, _ in resolved if item})))
+    results = []
+    for name, (item, matches) in zip(item_names, resolved):
+        if not item and matches:
+            results.append({"requested": name, "success": False, **_ambiguous(name, matches)})
+        elif not item or item.id not in deleted:
+            results.append({"requested": name, "success": False, "message": f"{name} not found in inventory"})
+        else:
+            results.append({"requested": name, "success": True, "message": f"Removed '{item.item_name}' from inventory"})
+    return {"results": results, "removed": len(deleted)}
 
 # Add sample data
+@instrument("tool")
 async def add_sample_inventory_data() -> dict:
     """Add sample repair inventory data to the database"""
+    service = await get_service()
     sample_items = [
         {"item_name": "Air Filter", "category": "Spare Parts", "quantity": 15, "reorder_level": 5, "supplier": "Auto Parts Co", "unit_price": 12.50},
         {"item_name": "Brake Pads", "category": "Spare Parts", "quantity": 8, "reorder_level": 3, "supplier": "Brake Systems Ltd", "unit_price": 45.00},
@@ -76,91 +197,99 @@ async def add_sample_inventory_data() -> dict:
         {"item_name": "Engine Oil", "category": "Spare Parts", "quantity": 20, "reorder_level": 10, "supplier": "Oil Distributors", "unit_price": 8.75}
     ]
     
-    added_count = 0
-    for item_data in sample_items:
-        existing_items = await service.get_all_inventory_items()
-        if not any(existing.item_name.lower() == item_data["item_name"].lower() for existing in existing_items):
-            item = InventoryItem(id=str(random.randint(1000000000000, 9999999999999)), item_name=item_data["item_name"], category=item_data["category"], quantity=item_data["quantity"], reorder_level=item_data["reorder_level"], supplier=item_data["supplier"], unit_price=item_data["unit_price"], last_updated=datetime.utcnow())
-            await service.create_inventory_item(item)
-            added_count += 1
+    existing_items = await service.get_inventory_items_by_names([item_data["item_name"] for item_data in sample_items])
+    existing_names = {existing.item_name.lower() for existing in existing_items}
+    new_items = [
+        InventoryItem(id=str(random.randint(1000000000000, 9999999999999)), last_updated=datetime.utcnow(), **item_data)
+        for item_data in sample_items if item_data["item_name"].lower() not in existing_names
+    ]
+    result = await service.bulk_upsert_inventory_items(new_items)
     
-    return {"success": True, "message": f"Added {added_count} sample inventory items to the database"}
+    return {"success": True, "message": f"Added {result['inserted']} sample inventory items to the database"}
 
 # Analytics functions
+@instrument("tool")
 async def get_inventory_count() -> dict:
     """Get total count of inventory items"""
-    items = await service.get_all_inventory_items()
-    return {"total_items": len(items)}
+    service = await get_service()
+    totals = await service.get_inventory_totals()
+    return {"total_items": totals["item_count"]}
 
+@instrument("tool")
 async def get_total_stock_value() -> dict:
     """Calculate total stock value (quantity * unit_price)"""
-    items = await service.get_all_inventory_items()
-    total_value = sum(item.quantity * item.unit_price for item in items)
-    return {"total_value": round(total_value, 2)}
+    service = await get_service()
+    totals = await service.get_inventory_totals()
+    return {"total_value": round(totals["stock_value"], 2)}
 
+@instrument("tool")
 async def get_top_supplier() -> dict:
     """Find supplier that provides the most items"""
-    items = await service.get_all_inventory_items()
-    supplier_counts = {}
-    for item in items:
-        if item.supplier:
-            supplier_counts[item.supplier] = supplier_counts.get(item.supplier, 0) + 1
-    
-    if not supplier_counts:
+    service = await get_service()
+    top_supplier = await service.get_top_supplier()
+    if not top_supplier:
         return {"supplier": None, "count": 0}
     
-    top_supplier = max(supplier_counts, key=supplier_counts.get)
-    return {"supplier": top_supplier, "count": supplier_counts[top_supplier]}
+    return {"supplier": top_supplier["supplier"], "count": top_supplier["item_count"]}
 
 # Auditing functions
+@instrument("tool")
 async def get_last_updated_item() -> dict:
     """Get the inventory item that was last updated"""
-    items = await service.get_all_inventory_items()
-    if not items:
+    service = await get_service()
+    latest_item = await service.get_last_updated_item()
+    if not latest_item:
         return {"item_name": None, "last_updated": None}
     
-    latest_item = max(items, key=lambda x: x.last_updated if x.last_updated else datetime.min)
-    return {"item_name": latest_item.item_name, "last_updated": latest_item.last_updated.isoformat() if latest_item.last_updated else None}
+    return {"item_name": latest_item.item_name, "last_updated": latest_item.last_updated.isoformat()}
 
+@instrument("tool")
 async def get_items_not_updated_6_months() -> List[dict]:
     """Get items not updated in the last 6 months"""
-    items = await service.get_all_inventory_items()
+    service = await get_service()
     six_months_ago = datetime.utcnow() - timedelta(days=180)
+    items = await service.get_items_not_updated_since(six_months_ago)
     
-    old_items = []
-    for item in items:
-        if not item.last_updated or item.last_updated < six_months_ago:
-            old_items.append({
-                "item_name": item.item_name,
-                "last_updated": item.last_updated.isoformat() if item.last_updated else "Never"
-            })
-    
-    return old_items
+    return [{
+        "item_name": item.item_name,
+        "last_updated": item.last_updated.isoformat() if item.last_updated else "Never"
+    } for item in items]
+
+@instrument("tool")
+async def get_stock_history(item_name: str, days: int = 30) -> dict:
+    """Get how the stock of an item moved over the last days: the quantity then and now, units received and units used or sold"""
+    service = await get_service()
+    item, matches = await service.resolve_inventory_item(item_name)
+    if not item:
+        if matches:
+            return _ambiguous(item_name, matches)
+        return {"message": f"{item_name} not found in inventory"}
+    since = datetime.utcnow() - timedelta(days=days)
+    try:
+        quantity_then = (await service.get_stock_at(item.id, since))["quantity"]
+    except HTTPException:
+        quantity_then = None
+    movements = await service.get_stock_movements(since, item.id)
+    moved = movements[0] if movements else {"moved_in": 0, "moved_out": 0, "last_moved_at": None}
+    return {"item_name": item.item_name, "days": days, "quantity_then": quantity_then if quantity_then is not None else "Not stocked yet",
+            "quantity_now": item.quantity, "received": moved["moved_in"], "used_or_sold": moved["moved_out"],
+            "last_moved_at": moved["last_moved_at"].isoformat() if moved["last_moved_at"] else None}
 
+@instrument("tool")
 async def get_category_highest_avg_price() -> dict:
     """Get category with highest average price"""
-    items = await service.get_all_inventory_items()
-    if not items:
+    service = await get_service()
+    top_category = await service.get_category_highest_avg_price()
+    if not top_category:
         return {"category": None, "avg_price": 0}
     
-    category_prices = {}
-    for item in items:
-        if item.category:
-            if item.category not in category_prices:
-                category_prices[item.category] = []
-            category_prices[item.category].append(item.unit_price)
-    
-    if not category_prices:
-        return {"category": None, "avg_price": 0}
-    
-    category_averages = {cat: sum(prices)/len(prices) for cat, prices in category_prices.items()}
-    top_category = max(category_averages, key=category_averages.get)
-    
-    return {"category": top_category, "avg_price": round(category_averages[top_category], 2)}
+    return {"category": top_category["category"], "avg_price": round(top_category["avg_price"], 2)}
 
 # Multi-modal Supplier functions
+@instrument("tool")
 async def create_supplier_model(name: str, contact_person: Optional[str] = None, phone_number: Optional[str] = None, category: Optional[str] = None, address: Optional[str] = None) -> dict:
     """Create a new supplier in the system"""
+    service = await get_service()
     from models.data_models import Supplier
     supplier = Supplier(
         id=str(random.randint(1000000000000, 9999999999999)),
@@ -173,43 +302,23 @@ async def create_supplier_model(name: str, contact_person: Optional[str] = None,
     await service.create_supplier(supplier)
     return {"success": True, "message": f"Created supplier '{name}' successfully"}
 
+@instrument("tool")
 async def get_supplier_lowest_reorder_frequency() -> dict:
     """Find supplier whose items have lowest reorder frequency"""
-    items = await service.get_all_inventory_items()
-    supplier_reorder_ratios = {}
-    
-    for item in items:
-        if item.supplier and item.quantity > 0:
-            reorder_ratio = item.quantity / item.reorder_level if item.reorder_level > 0 else float('inf')
-            if item.supplier not in supplier_reorder_ratios:
-                supplier_reorder_ratios[item.supplier] = []
-            supplier_reorder_ratios[item.supplier].append(reorder_ratio)
-    
-    if not supplier_reorder_ratios:
+    service = await get_service()
+    lowest_supplier = await service.get_supplier_lowest_reorder_ratio()
+    if not lowest_supplier:
         return {"supplier": None, "avg_ratio": 0}
     
-    supplier_avg_ratios = {sup: sum(ratios)/len(ratios) for sup, ratios in supplier_reorder_ratios.items()}
-    lowest_supplier = min(supplier_avg_ratios, key=supplier_avg_ratios.get)
-    
-    return {"supplier": lowest_supplier, "avg_ratio": round(supplier_avg_ratios[lowest_supplier], 2)}
+    avg_ratio = lowest_supplier["avg_ratio"]
+    return {"supplier": lowest_supplier["supplier"], "avg_ratio": round(avg_ratio, 2) if avg_ratio is not None else float('inf')}
 
+@instrument("tool")
 async def get_supplier_highest_category_cost() -> dict:
     """Find supplier whose category items cost the most on average"""
-    items = await service.get_all_inventory_items()
-    supplier_category_costs = {}
-    
-    for item in items:
-        if item.supplier and item.category:
-            key = f"{item.supplier}_{item.category}"
-            if key not in supplier_category_costs:
-                supplier_category_costs[key] = []
-            supplier_category_costs[key].append(item.unit_price)
-    
-    if not supplier_category_costs:
+    service = await get_service()
+    highest = await service.get_supplier_highest_category_cost()
+    if not highest:
         return {"supplier": None, "category": None, "avg_cost": 0}
     
-    supplier_category_avg = {key: sum(costs)/len(costs) for key, costs in supplier_category_costs.items()}
-    highest_key = max(supplier_category_avg, key=supplier_category_avg.get)
-    supplier, category = highest_key.split('_', 1)
-    
-    return {"supplier": supplier, "category": category, "avg_cost": round(supplier_category_avg[highest_key], 2)}
\ No newline at end of file
+    return {"supplier": highest["supplier"], "category": highest["category"], "avg_cost": round(highest["avg_cost"], 2)}
\ No newline at end of file
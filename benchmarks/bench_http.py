@@ -0,0 +1,130 @@
+"""Concurrent HTTP load against the /inventory routes.
+
+Served in-process over ASGI by default. With workers, the app runs under uvicorn with
+that many worker processes sharing the database, and the load goes over TCP; compare
+runs with 1, 2, 4... workers to see how throughput scales with cores.
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from fastapi import FastAPI
+
+from benchmarks.datagen import WORDS
+from benchmarks.harness import summarize
+from repos.repo import Repo
+from routers import inventory, suppliers
+from services.container import container
+
+
+def build_app(path: str) -> FastAPI:
+    """The inventory API on its own, without the ADK agent app main.py mounts behind it."""
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await container.start(Repo(path))
+        try:
+            yield
+        finally:
+            await container.stop()
+
+    app = FastAPI(lifespan=lifespan)
+    app.include_router(inventory.router, prefix="/inventory")
+    app.include_router(suppliers.router, prefix="/suppliers")
+    return app
+
+
+def create_app() -> FastAPI:
+    """uvicorn --factory entry point for the worker processes, on the database in BENCH_DB_PATH."""
+    return build_app(os.environ["BENCH_DB_PATH"])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _serve(path: str, workers: int) -> tuple:
+    """Start uvicorn with workers processes on path; returns (process, base URL) once it answers."""
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.bench_http:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env={**os.environ, "BENCH_DB_PATH": path})
+    base_url = f"http://127.0.0.1:{port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(600):
+            try:
+                await client.get("/inventory/?limit=1")
+                return server, base_url
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("uvicorn did not start")
+
+
+async def _load(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            method, url, body = make_request()
+            start = time.perf_counter()
+            response = await client.request(method, url, json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def run(path: str, rows: int, requests: int, concurrency: int, workers: int = 0) -> dict:
+    rng = random.Random(13)
+
+    def random_id() -> str:
+        return f"I{rng.randrange(rows):08d}"
+
+    scenarios = {
+        "list_page": lambda: ("GET", "/inventory/?limit=100", None),
+        "get_item": lambda: ("GET", f"/inventory/{random_id()}", None),
+        "search": lambda: ("GET", f"/inventory/search?q={rng.choice(WORDS)}+{rng.choice(WORDS)}", None),
+        "adjust_quantity": lambda: ("PATCH", f"/inventory/{random_id()}/quantity", {"delta": 1}),
+    }
+    mixes = list(scenarios.values())
+    # Read-heavy blend: 3 reads for every write
+    scenarios["mixed"] = lambda: rng.choice(mixes[:3] * 3 + mixes[3:])()
+
+    async def run_scenarios(client: httpx.AsyncClient) -> dict:
+        results = {}
+        for name, make_request in scenarios.items():
+            await _load(client, make_request, max(1, requests // 20), concurrency)
+            results[name] = await _load(client, make_request, requests, concurrency)
+        return results
+
+    if workers:
+        server, base_url = await _serve(path, workers)
+        try:
+            limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+            async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+                results = await run_scenarios(client)
+        finally:
+            server.terminate()
+            server.wait()
+        return {"cases": results, "concurrency": concurrency, "workers": workers}
+
+    app = build_app(path)
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results = await run_scenarios(client)
+    return {"cases": results, "concurrency": concurrency}
@@ -0,0 +1,109 @@
+"""Micro-benchmarks for every public Repo method."""
+import inspect
+import random
+from datetime import datetime, timedelta
+
+from benchmarks.datagen import CATEGORIES, WORDS, supplier_count
+from benchmarks.harness import measure, measure_concurrent
+from models.data_models import InventoryItem, QuantityAdjustment, Supplier
+from repos.repo import Repo
+
+# Connection lifecycle is measured by the startup benchmarks, not per call
+SKIPPED = {"open", "close"}
+CONCURRENT_WRITERS = 64
+
+
+def new_item(item_id: str, rng: random.Random) -> InventoryItem:
+    return InventoryItem(id=item_id, item_name=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {item_id}",
+                         category=rng.choice(CATEGORIES), quantity=rng.randint(0, 50), reorder_level=5,
+                         supplier=f"Supplier {rng.randrange(10)}", unit_price=round(rng.uniform(1, 100), 2))
+
+
+async def run(path: str, rows: int, iterations: int, heavy_iterations: int) -> dict:
+    rng = random.Random(7)
+    repo = Repo(path)
+    await repo.open()
+    await repo.init_db()
+    counter = iter(range(10 ** 9))
+
+    def random_id() -> str:
+        return f"I{rng.randrange(rows):08d}"
+
+    def random_supplier() -> Supplier:
+        index = rng.randrange(supplier_count(rows))
+        return Supplier(id=f"S{index}", name=f"Supplier {index}")
+
+    async def update():
+        item = await repo.get(random_id())
+        if item:
+            item.quantity += 1
+            await repo.update(item)
+
+    cutoff = datetime.utcnow() - timedelta(days=180)
+    cases = {
+        "init_db": (lambda: repo.init_db(), iterations),
+        "get": (lambda: repo.get(random_id()), iterations),
+        "list": (lambda: repo.list(), heavy_iterations),
+        "list_page": (lambda: repo.list_page(100), iterations),
+        "list_page_filtered": (lambda: repo.list_page(100, category=rng.choice(CATEGORIES), low_stock=True), iterations),
+        "list_by_category": (lambda: repo.list_by_category(rng.choice(CATEGORIES)), heavy_iterations),
+        "list_below_reorder_level": (lambda: repo.list_below_reorder_level(), heavy_iterations),
+        "list_not_updated_since": (lambda: repo.list_not_updated_since(cutoff), heavy_iterations),
+        "get_last_updated": (lambda: repo.get_last_updated(), iterations),
+        "list_by_names": (lambda: repo.list_by_names([f"{rng.choice(WORDS)} {rng.choice(WORDS)}" for _ in range(5)]), iterations),
+        "search_names": (lambda: repo.search_names(f"{rng.choice(WORDS)} {rng.choice(WORDS)}"), iterations),
+        "search_names_typo": (lambda: repo.search_names(f"{rng.choice(WORDS)[:-1]}x {rng.choice(WORDS)[1:]}"), iterations),
+        "get_totals": (lambda: repo.get_totals(), iterations),
+        "get_top_supplier": (lambda: repo.get_top_supplier(), iterations),
+        "get_category_highest_avg_price": (lambda: repo.get_category_highest_avg_price(), iterations),
+        "get_supplier_lowest_reorder_ratio": (lambda: repo.get_supplier_lowest_reorder_ratio(), iterations),
+        "get_supplier_highest_category_cost": (lambda: repo.get_supplier_highest_category_cost(), iterations),
+        "check_aggregates": (lambda: repo.check_aggregates(), heavy_iterations),
+        "insert": (lambda: repo.insert(new_item(f"N{next(counter)}", rng)), iterations),
+        "upsert_many": (lambda: repo.upsert_many([new_item(f"U{rng.randrange(rows)}", rng) for _ in range(1000)]), heavy_iterations),
+        "update": (update, iterations),
+        "adjust_quantities": (lambda: repo.adjust_quantities([QuantityAdjustment(item_id=random_id(), delta=1)]), iterations),
+        "create_and_adjust": (lambda: repo.create_and_adjust(
+            [new_item(f"C{next(counter)}", rng)], [QuantityAdjustment(item_id=random_id(), delta=1) for _ in range(10)]), iterations),
+        "delete": (lambda: repo.delete(random_id()), iterations),
+        "rebuild_name_index": (lambda: repo.rebuild_name_index(), heavy_iterations),
+        "list_reorder_queue": (lambda: repo.list_reorder_queue(), heavy_iterations),
+        "claim_reorder_events": (lambda: repo.claim_reorder_events(100, 0), iterations),
+        "mark_reorder_events_delivered": (lambda: repo.mark_reorder_events_delivered([rng.randrange(1, 1000)]), iterations),
+        "prune_reorder_events": (lambda: repo.prune_reorder_events(cutoff), iterations),
+        "list_changes": (lambda: repo.list_changes(rng.randrange(max(1, iterations)), 100), iterations),
+        "get_change_bounds": (lambda: repo.get_change_bounds(), iterations),
+        "get_data_version": (lambda: repo.get_data_version(), iterations),
+        "prune_changes": (lambda: repo.prune_changes(10 ** 6), iterations),
+        "delete_many": (lambda: repo.delete_many([random_id() for _ in range(10)]), iterations),
+        "insert_supplier": (lambda: repo.insert_supplier(Supplier(id=f"BS{next(counter)}", name=f"Bench Supplier {next(counter)}")), iterations),
+        "list_suppliers": (lambda: repo.list_suppliers(), heavy_iterations),
+        "upsert_suppliers": (lambda: repo.upsert_suppliers([random_supplier()]), iterations),
+        "get_supplier": (lambda: repo.get_supplier(random_supplier().id), iterations),
+        "list_plan_rows": (lambda: repo.list_plan_rows(), heavy_iterations),
+        "get_stock_at": (lambda: repo.get_stock_at(random_id(), cutoff), iterations),
+        "list_stock_movements": (lambda: repo.list_stock_movements(datetime.utcnow() - timedelta(days=1)), heavy_iterations),
+        "list_stock_movements_filtered": (lambda: repo.list_stock_movements(cutoff, random_id()), iterations),
+        "list_idle_since": (lambda: repo.list_idle_since(cutoff), heavy_iterations),
+        "compact_stock_ledger": (lambda: repo.compact_stock_ledger(), iterations),
+        "prune_stock_ledger": (lambda: repo.prune_stock_ledger(cutoff, cutoff), iterations),
+        "list_supplier_summaries": (lambda: repo.list_supplier_summaries(100, random_supplier().id), iterations),
+    }
+    # Point-of-sale style traffic: many callers each moving one item's stock
+    concurrent = {
+        "adjust_quantities_concurrent": lambda: repo.adjust_quantities([QuantityAdjustment(item_id=random_id(), delta=1)]),
+        "update_concurrent": update,
+    }
+    results = {}
+    try:
+        for name, (operation, count) in cases.items():
+            results[name] = await measure(operation, count)
+        for name, operation in concurrent.items():
+            results[name] = await measure_concurrent(operation, iterations * 10, CONCURRENT_WRITERS)
+    finally:
+        await repo.close()
+
+    public = {name for name, _ in inspect.getmembers(Repo, inspect.iscoroutinefunction) if not name.startswith("_")}
+    covered = {name.split("_filtered")[0].split("_typo")[0] for name in cases}
+    return {"cases": results, "unbenchmarked": sorted(public - covered - SKIPPED),
+            "dataset": {"rows": rows, "suppliers": supplier_count(rows)}}
@@ -0,0 +1,72 @@
+"""Per-row cost of turning SQLite rows into a GET /inventory response body.
+
+Compares the validated path (an InventoryItem(...) per row, then FastAPI-style
+re-validation against List[InventoryItem] and JSON encoding) with the fast path
+(repos.repo.row_to_item, which uses model_construct, serialized by orjson).
+
+    python -m benchmarks.bench_row_mapping --rows 10000 100000
+"""
+import argparse
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import orjson
+from pydantic import TypeAdapter
+
+from models.data_models import InventoryItem
+from repos.repo import row_to_item
+
+
+def make_rows(count: int) -> list:
+    start = datetime(2025, 1, 1)
+    return [
+        (str(1000000000000 + i), f"Item {i}", f"Category {i % 20}", i % 50, 10, f"Supplier {i % 200}",
+         round(1 + (i % 997) * 0.37, 2), (start + timedelta(seconds=i)).isoformat(), 0)
+        for i in range(count)
+    ]
+
+
+def validated_row(row) -> InventoryItem:
+    """The row mapping Repo used before the fast path."""
+    return InventoryItem(
+        id=row[0], item_name=row[1], category=row[2], quantity=row[3], reorder_level=row[4],
+        supplier=row[5], unit_price=row[6],
+        last_updated=datetime.fromisoformat(row[7]) if row[7] else None, version=row[8])
+
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def run(count: int) -> dict:
+    rows = make_rows(count)
+    adapter = TypeAdapter(List[InventoryItem])
+
+    def before():
+        items = [validated_row(row) for row in rows]
+        # FastAPI validates the returned objects against response_model, then encodes them
+        validated = adapter.validate_python(items, from_attributes=True)
+        return json.dumps(adapter.dump_python(validated, mode="json")).encode()
+
+    def after():
+        items = [row_to_item(row) for row in rows]
+        return orjson.dumps([item.__dict__ for item in items])
+
+    assert json.loads(before()) == json.loads(after())
+    results = {}
+    for name, fn in (("before", before), ("after", after)):
+        seconds = min(timed(fn) for _ in range(3))
+        results[name] = {"total_ms": round(seconds * 1000, 2), "per_row_us": round(seconds / count * 1e6, 3)}
+    results["speedup"] = round(results["before"]["total_ms"] / results["after"]["total_ms"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    args = parser.parse_args()
+    print(json.dumps({str(count): run(count) for count in args.rows}, indent=2))
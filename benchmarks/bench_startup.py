@@ -0,0 +1,116 @@
+"""Cold start of main.py: import time per module and time until it serves.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --module agent.agent --top 30
+
+Run directly, this is the startup profiling mode: it imports the module in a fresh
+interpreter under -X importtime and lists the modules that took longest, by
+cumulative and by self time. As a suite, each run starts uvicorn on main:app and
+records the time until /inventory answers and until the lazily built agent app
+answers /list-apps.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+from benchmarks.bench_http import _free_port
+from benchmarks.harness import summarize
+from constants import DB_NAME
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_profile(module: str = "main") -> list:
+    """Modules imported by module in a fresh interpreter, in import order, with their
+    self and cumulative import times in ms; the last entry is module itself."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                               cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    entries = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append({
+            "module": name.strip(),
+            "self_ms": int(self_us) / 1000,
+            "cumulative_ms": int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def top_imports(entries: list, top: int, key: str = "cumulative_ms") -> list:
+    return sorted(entries, key=lambda entry: entry[key], reverse=True)[:top]
+
+
+async def _wait_for(client: httpx.AsyncClient, url: str, timeout: float = 120.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get(url)).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.01)
+    raise RuntimeError(f"{url} did not answer within {timeout:.0f} s")
+
+
+async def cold_start(directory: str) -> tuple:
+    """Start uvicorn on main:app with directory as working directory, so it serves the
+    DB_NAME in there. Returns the seconds until /inventory and until /list-apps answer."""
+    port = _free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=directory, env={**os.environ, "PYTHONPATH": ROOT})
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60.0) as client:
+            await _wait_for(client, "/inventory/?limit=1")
+            inventory_ready = time.perf_counter() - started
+            await _wait_for(client, "/list-apps")
+            agent_ready = time.perf_counter() - started
+    finally:
+        server.terminate()
+        server.wait()
+    return inventory_ready, agent_ready
+
+
+async def run(path: str, rows: int, starts: int) -> dict:
+    """Moves the working copy at path to DB_NAME in its directory and cold starts on it."""
+    directory = os.path.dirname(path)
+    os.replace(path, os.path.join(directory, DB_NAME))
+    imports, inventory_ready, agent_ready = [], [], []
+    for _ in range(starts):
+        entries = import_profile()
+        imports.append(entries[-1]["cumulative_ms"] / 1000)
+        ready = await cold_start(directory)
+        inventory_ready.append(ready[0])
+        agent_ready.append(ready[1])
+    return {
+        "cases": {
+            "import_main": summarize(imports, sum(imports)),
+            "first_inventory": summarize(inventory_ready, sum(inventory_ready)),
+            "agent_ready": summarize(agent_ready, sum(agent_ready)),
+        },
+        "starts": starts,
+        "top_imports": [{key: entry[key] for key in ("module", "self_ms", "cumulative_ms")}
+                        for entry in top_imports(entries, 10)],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20, help="modules listed per ranking")
+    args = parser.parse_args()
+    entries = import_profile(args.module)
+    print(f"import {args.module}: {entries[-1]['cumulative_ms']:.1f} ms")
+    for key in ("cumulative_ms", "self_ms"):
+        print(f"\nby {key[:-3]} time (ms):")
+        for entry in top_imports(entries, args.top, key):
+            print(f"{entry[key]:10.1f}  {entry['module']}")
@@ -0,0 +1,52 @@
+"""Micro-benchmarks for every tool the root agent exposes, called directly with no model."""
+import inspect
+import random
+
+from benchmarks.datagen import CATEGORIES
+from benchmarks.harness import measure
+from models.data_models import ItemQuantity
+from repos.repo import Repo
+from services.container import container
+
+
+def load_agent_tools() -> list:
+    """The root agent's tool functions. The model is never called."""
+    from agent.agent import root_agent
+    return list(root_agent.tools)
+
+
+async def run(path: str, rows: int, iterations: int, heavy_iterations: int) -> dict:
+    tools = load_agent_tools()
+    rng = random.Random(11)
+    service = await container.start(Repo(path))
+    sample_page, _ = await service.get_inventory_page(500)
+    names = [item.item_name for item in sample_page]
+
+    arguments = {
+        "get_items_by_category": lambda: {"category": rng.choice(CATEGORIES)},
+        "check_item_stock": lambda: {"item_name": rng.choice(names)},
+        "update_item_quantity": lambda: {"item_name": rng.choice(names), "new_quantity": rng.randint(0, 40)},
+        "remove_item": lambda: {"item_name": rng.choice(names)},
+        "check_items_stock": lambda: {"item_names": rng.sample(names, 12)},
+        "update_items_quantities": lambda: {"updates": [ItemQuantity(item_name=name, new_quantity=rng.randint(0, 40))
+                                                        for name in rng.sample(names, 12)]},
+        "remove_items": lambda: {"item_names": rng.sample(names, 12)},
+        "create_supplier_model": lambda: {"name": f"Bench Supplier {rng.randrange(10 ** 9)}"},
+        "plan_reorders": lambda: {"budget": 10000.0},
+        "get_stock_history": lambda: {"item_name": rng.choice(names), "days": 30},
+    }
+    heavy = {"get_inventory", "get_items_by_category", "get_items_needing_reorder", "get_items_not_updated_6_months"}
+
+    results, unbenchmarked = {}, []
+    try:
+        for tool in tools:
+            name = tool.__name__
+            if name not in arguments and inspect.signature(tool).parameters:
+                unbenchmarked.append(name)
+                continue
+            make_args = arguments.get(name, dict)
+            results[name] = await measure(lambda: tool(**make_args()),
+                                          heavy_iterations if name in heavy else iterations)
+    finally:
+        await container.stop()
+    return {"cases": results, "unbenchmarked": unbenchmarked}
@@ -0,0 +1,114 @@
+"""Synthetic Inventory/Suppliers databases for the benchmarks.
+
+Datasets are generated once per size under benchmarks/.data and reused; every
+benchmark run works on a fresh copy so write benchmarks never skew the next run.
+
+    python -m benchmarks.datagen --rows 1000 100000 1000000
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+from datetime import datetime, timedelta
+
+from repos.repo import Repo
+from repos.stock_ledger import EPOCH_MS
+from constants import TABLE_NAME
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data")
+CATEGORIES = ["Spare Parts", "Tools", "Accessories", "Fluids", "Electrical", "Tyres", "Body", "Filters"]
+WORDS = ["Brake", "Pad", "Filter", "Oil", "Engine", "Gear", "Bolt", "Nut", "Screw", "Hose", "Belt",
+         "Spark", "Plug", "Valve", "Pump", "Clutch", "Bearing", "Gasket", "Seal", "Fuse", "Relay",
+         "Sensor", "Wiper", "Mirror", "Bulb", "Socket", "Wrench", "Jack", "Clamp", "Radiator"]
+GENERATOR_VERSION = 3
+SEED = 20240601
+
+
+def supplier_count(rows: int) -> int:
+    return max(10, rows // 200)
+
+
+def item_name(rng: random.Random, index: int) -> str:
+    return f"{' '.join(rng.sample(WORDS, 2))} {CATEGORIES[index % len(CATEGORIES)].split()[0]} {index}"
+
+
+def dataset_path(rows: int) -> str:
+    return os.path.join(DATA_DIR, f"inventory_{rows}_v{GENERATOR_VERSION}.db")
+
+
+def generate(rows: int, path: str):
+    """Create a database with rows inventory items spread over suppliers and categories."""
+    rng = random.Random(SEED)
+    if os.path.exists(path):
+        os.remove(path)
+
+    async def create_schema():
+        repo = Repo(path, reader_pool_size=0)
+        await repo.open()
+        await repo.init_db()
+        await repo.close()
+    asyncio.run(create_schema())
+
+    suppliers = [f"Supplier {i}" for i in range(supplier_count(rows))]
+    now = datetime.utcnow()
+    db = sqlite3.connect(path)
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = OFF")
+    db.executemany("INSERT INTO Suppliers (id, name, contact_person, phone_number, category, address) VALUES (?, ?, ?, ?, ?, ?)",
+                   [(f"S{i}", name, f"Contact {i}", f"+1-555-{i:06d}", rng.choice(CATEGORIES), f"{i} Industrial Way")
+                    for i, name in enumerate(suppliers)])
+    batch = []
+    for i in range(rows):
+        reorder_level = rng.randint(1, 20)
+        supplier = rng.randrange(len(suppliers))
+        batch.append((
+            f"I{i:08d}", item_name(rng, i), CATEGORIES[i % len(CATEGORIES)],
+            rng.randint(0, reorder_level * 4), reorder_level, suppliers[supplier],
+            round(rng.uniform(0.5, 500), 2),
+            (now - timedelta(minutes=rng.randint(0, 60 * 24 * 400))).isoformat(), f"S{supplier}",
+        ))
+        if len(batch) == 10000 or i == rows - 1:
+            db.executemany(f"""
+                INSERT INTO {TABLE_NAME}
+                (id, item_name, category, quantity, reorder_level, supplier, unit_price, last_updated, supplier_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, batch)
+            batch = []
+    # The triggers stamp the opening movements with the current time; date them like the items
+    db.execute(f"""
+        UPDATE StockMovements SET at = (SELECT {EPOCH_MS.format("julianday(last_updated)")}
+                                        FROM {TABLE_NAME} WHERE id = StockMovements.item_id)
+    """)
+    db.commit()
+    db.execute("ANALYZE")
+    db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    db.close()
+
+
+def ensure_dataset(rows: int) -> str:
+    """Path of the cached dataset with rows items, generating it on first use."""
+    path = dataset_path(rows)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        partial = path + ".partial"
+        generate(rows, partial)
+        os.replace(partial, path)
+    return path
+
+
+def working_copy(rows: int) -> str:
+    """A throwaway copy of the dataset that benchmarks may modify."""
+    source = ensure_dataset(rows)
+    target = os.path.join(tempfile.mkdtemp(prefix="inventory-bench-"), os.path.basename(source))
+    shutil.copyfile(source, target)
+    return target
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000, 1000000])
+    for rows in parser.parse_args().rows:
+        print(ensure_dataset(rows))
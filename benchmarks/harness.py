@@ -0,0 +1,80 @@
+"""Timing helpers shared by the benchmark suites."""
+import asyncio
+import resource
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], wall_seconds: float, errors: int = 0) -> dict:
+    """p50/p95/p99/max latency in ms and throughput in ops/s."""
+    ordered = sorted(latencies)
+    return {
+        "ops": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        "throughput_ops_s": round(len(latencies) / wall_seconds, 1) if wall_seconds else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def _warm_up(operation: Callable[[], Awaitable]):
+    # Random arguments may hit rows an earlier write case deleted; only timed calls count errors
+    try:
+        await operation()
+    except Exception:
+        pass
+
+
+async def measure(operation: Callable[[], Awaitable], iterations: int, warmup: int = 1) -> dict:
+    """Run operation sequentially and summarize its latencies."""
+    for _ in range(warmup):
+        await _warm_up(operation)
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    for _ in range(iterations):
+        start = time.perf_counter()
+        try:
+            await operation()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies, time.perf_counter() - started, errors)
+
+
+async def measure_concurrent(operation: Callable[[], Awaitable], iterations: int, concurrency: int) -> dict:
+    """Run operation from concurrency callers at once, iterations times in total."""
+    await _warm_up(operation)
+    latencies, errors = [], 0
+    remaining = iter(range(iterations))
+
+    async def caller():
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - started, errors)
@@ -0,0 +1,134 @@
+"""Run the benchmark suites and write the results as JSON.
+
+    python -m benchmarks.run --sizes 1000 100000 1000000 --out results/base.json
+    python -m benchmarks.run --out results/head.json --compare results/base.json
+    python -m benchmarks.run --suites http --workers 4
+    python -m benchmarks.run --suites startup --sizes 1000
+
+Every dataset size runs in its own process so peak RSS is reported per size.
+With --compare, cases whose p95 latency grew or whose throughput dropped by more
+than --threshold are listed and the exit status is 1.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+from benchmarks import bench_http, bench_repo, bench_startup, bench_tools
+from benchmarks.datagen import GENERATOR_VERSION, ensure_dataset, working_copy
+from benchmarks.harness import peak_rss_mb
+
+SUITES = ["repo", "tools", "http", "startup"]
+# Latencies this small are timer noise, not regressions
+MIN_SIGNIFICANT_MS = 0.05
+
+
+async def run_size(rows: int, suites: list, iterations: int, heavy_iterations: int,
+                   requests: int, concurrency: int, workers: int = 0, starts: int = 5) -> dict:
+    result = {}
+    # Each suite gets its own copy so writes from one do not skew the next
+    if "repo" in suites:
+        result["repo"] = await bench_repo.run(working_copy(rows), rows, iterations, heavy_iterations)
+    if "tools" in suites:
+        result["tools"] = await bench_tools.run(working_copy(rows), rows, iterations, heavy_iterations)
+    if "http" in suites:
+        result["http"] = await bench_http.run(working_copy(rows), rows, requests, concurrency, workers)
+    if "startup" in suites:
+        result["startup"] = await bench_startup.run(working_copy(rows), rows, starts)
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def compare(base: dict, head: dict, threshold: float) -> list:
+    """Cases present in both runs whose p95 or throughput regressed by more than threshold."""
+    regressions = []
+    for size, suites in head["results"].items():
+        for suite, result in suites.items():
+            if not isinstance(result, dict):
+                continue
+            base_cases = base["results"].get(size, {}).get(suite, {}).get("cases", {})
+            for case, now in result.get("cases", {}).items():
+                before = base_cases.get(case)
+                if not before:
+                    continue
+                slower = (now["p95_ms"] > before["p95_ms"] * (1 + threshold)
+                          and now["p95_ms"] - before["p95_ms"] > MIN_SIGNIFICANT_MS)
+                fewer = now["throughput_ops_s"] < before["throughput_ops_s"] * (1 - threshold)
+                if slower or fewer:
+                    regressions.append({
+                        "size": size, "suite": suite, "case": case,
+                        "p95_ms": [before["p95_ms"], now["p95_ms"]],
+                        "throughput_ops_s": [before["throughput_ops_s"], now["throughput_ops_s"]],
+                    })
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--suites", nargs="+", choices=SUITES, default=SUITES)
+    parser.add_argument("--iterations", type=int, default=200, help="calls per cheap operation")
+    parser.add_argument("--heavy-iterations", type=int, default=3, help="calls per full-scan operation")
+    parser.add_argument("--requests", type=int, default=2000, help="HTTP requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent HTTP clients")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="serve the HTTP suite from this many uvicorn worker processes (default: in-process)")
+    parser.add_argument("--starts", type=int, default=5, help="cold starts of main:app in the startup suite")
+    parser.add_argument("--out", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        result = asyncio.run(run_size(args.single, args.suites, args.iterations, args.heavy_iterations,
+                                      args.requests, args.concurrency, args.workers, args.starts))
+        json.dump(result, sys.stdout)
+        return 0
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "generator_version": GENERATOR_VERSION,
+            "args": {key: value for key, value in vars(args).items() if key not in ("out", "compare", "single")},
+        },
+        "results": {},
+    }
+    for rows in args.sizes:
+        ensure_dataset(rows)
+        command = [sys.executable, "-m", "benchmarks.run", "--single", str(rows), "--suites", *args.suites,
+                   "--iterations", str(args.iterations), "--heavy-iterations", str(args.heavy_iterations),
+                   "--requests", str(args.requests), "--concurrency", str(args.concurrency),
+                   "--workers", str(args.workers), "--starts", str(args.starts)]
+        completed = subprocess.run(command, stdout=subprocess.PIPE, check=True)
+        report["results"][str(rows)] = json.loads(completed.stdout)
+        print(f"benchmarked {rows} rows", file=sys.stderr)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as baseline:
+            report["regressions"] = compare(json.load(baseline), report, args.threshold)
+        for regression in report["regressions"]:
+            print("REGRESSION {size} {suite}.{case}: p95 {p95_ms[0]} -> {p95_ms[1]} ms, "
+                  "throughput {throughput_ops_s[0]} -> {throughput_ops_s[1]} ops/s".format(**regression),
+                  file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as out:
+            out.write(output + "\n")
+    else:
+        print(output)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,95 @@
+import os
+
 # Agent details
 AGENT_NAME = "agent"
 AGENT_DESCRIPTION = "Agent that helps small and medium business shops manage repair service orders and inventory efficiently."
 AGENT_MODEL = "gemini-2.0-flash"
+AGENT_WARMUP = os.environ.get("AGENT_WARMUP", "1") != "0"  # Build the agent app in the background after startup, 0 waits for the first agent request
 
 # DB Details
 DB_NAME = "inventory.db"
 TABLE_NAME = "Inventory"
+
+# DB Connection Pool
+DB_READER_POOL_SIZE = 4                 # Reader connections kept open next to the single writer
+DB_CACHED_STATEMENTS = 256              # Prepared statements cached per connection
+DB_PRAGMAS = {
+    "busy_timeout": 5000,               # Milliseconds to wait on a locked database; first, so the WAL switch waits too
+    "journal_mode": "WAL",              # Lets readers and worker processes proceed while one writer commits
+    "synchronous": "NORMAL",
+    "mmap_size": 268435456,             # 256 MiB
+    "cache_size": -65536,               # Negative values are KiB, i.e. 64 MiB
+}
+WRITE_BATCH_MAX_OPS = 256               # Writes group-committed in one transaction at most
+WRITE_BATCH_WINDOW_MS = 0.0             # Extra wait for writes to join a batch; 0 batches what queued during the last commit
+
+# Inventory listing
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+EXPORT_BATCH_SIZE = 500                 # Rows fetched per query while streaming an export
+BULK_BATCH_SIZE = 1000                  # Rows upserted per transaction by the bulk endpoints
+
+# Inventory read cache
+CACHE_MAX_ENTRIES = 1024                # LRU bound across single items and query results
+CACHE_TTL_SECONDS = 30.0                # 0 disables caching
+CACHE_SYNC_INTERVAL_SECONDS = 0.1       # Staleness bound for writes by other worker processes
+
+# Item name search
+NAME_SEARCH_LIMIT = 5                   # Ranked matches returned per search
+NAME_SEARCH_CANDIDATES = 50             # Index hits re-scored per search
+NAME_SEARCH_TRIGRAMS = 8                # Rarest query trigrams OR-ed by the fuzzy fallback
+NAME_SEARCH_MAX_POSTINGS = 5000         # Index entries the fuzzy fallback may rank
+NAME_MATCH_MIN_SCORE = 0.6              # Below this a match is treated as not found
+NAME_MATCH_MARGIN = 0.1                 # Lead over the runner-up needed to pick a match unasked
+
+# Inventory change feed
+CHANGE_LOG_RETENTION = 100000           # Newest change log entries kept for catch-up, older ones are pruned
+CHANGE_LOG_PRUNE_EVERY = 1000           # Changes published between prunes
+CHANGE_FEED_PAGE_SIZE = 500             # Change log entries read per query
+CHANGE_FEED_POLL_SECONDS = 1.0          # Poll interval for changes committed outside this process
+CHANGE_FEED_QUEUE_SIZE = 1000           # Changes buffered per subscriber before it is reset
+CHANGE_FEED_HEARTBEAT_SECONDS = 15.0    # Keepalive interval on idle streams
+
+# Reorder queue outbox
+REORDER_WEBHOOK_URL = os.environ.get("REORDER_WEBHOOK_URL", "")  # Empty leaves events in the ReorderEvents table
+REORDER_WEBHOOK_TIMEOUT_SECONDS = 10.0
+REORDER_FLUSH_SECONDS = 5.0             # Outbox flush interval
+REORDER_FLUSH_BATCH_SIZE = 100          # Events posted per webhook call
+REORDER_EVENT_LEASE_SECONDS = 60.0      # Claimed events not acknowledged by then are retried
+REORDER_EVENT_RETENTION_DAYS = 7        # Delivered events kept for auditing
+
+# Reorder planner
+REORDER_TARGET_MULTIPLIER = 2.0         # Items are ordered up to this multiple of their reorder level
+REORDER_PLAN_LINE_LIMIT = 100           # Order lines returned per plan by default
+REORDER_PLAN_MAX_REPLAY = 100000        # Change log entries replayed into the snapshot before reloading it
+
+# Stock movement ledger
+STOCK_COMPACTION_SECONDS = 3600.0       # Snapshot interval, also the resolution of answers before the horizon
+STOCK_MOVEMENT_RETENTION_DAYS = 90      # Compacted movements older than this are pruned
+STOCK_SNAPSHOT_RETENTION_DAYS = 730     # Older snapshots are pruned, except each item's latest
+
+# Admission control (admission.py): concurrent slots, waiting callers and longest wait per pool
+AGENT_TURN_CONCURRENCY = 4              # Agent runs streaming at once
+AGENT_TURN_QUEUE_SIZE = 16
+AGENT_TURN_MAX_WAIT_SECONDS = 30.0
+AGENT_TURN_PATHS = ("/run", "/run_sse", "/run_live")
+DB_READ_QUEUE_SIZE = 256                # Reads run on the DB_READER_POOL_SIZE reader connections
+DB_READ_MAX_WAIT_SECONDS = 5.0
+DB_WRITE_CONCURRENCY = WRITE_BATCH_MAX_OPS  # Writes queued for the writer task, i.e. one group commit
+DB_WRITE_QUEUE_SIZE = 1024
+DB_WRITE_MAX_WAIT_SECONDS = 10.0
+
+# Agent sessions (repos/session_store.py)
+SESSION_DB_NAME = "sessions.db"
+SESSION_POOL_SIZE = 4                   # Connections kept open to the session database
+SESSION_LIST_PAGE_SIZE = 100            # Sessions read per query while the ADK session list reads them all
+SESSION_TTL_SECONDS = 7 * 24 * 3600.0   # Sessions idle for longer are deleted with their events
+SESSION_MAX_EVENTS = 500                # Older events of a session are trimmed, at invocation boundaries
+SESSION_EVICTION_SECONDS = 300.0        # Interval of the eviction task
+
+# Metrics (served at /metrics)
+METRICS_ENABLED = True                  # Time Repo queries, Service methods, agent tools and model calls
+METRICS_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+METRICS_SIZE_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 0))  # Log slower Repo calls, 0 disables
+MODEL_CALL_STALE_SECONDS = 600.0        # Model calls never finished by then (e.g. cancelled) stop being timed
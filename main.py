@@ -1,20 +1,24 @@
+import importlib
 import os
-import uvicorn
-from google.adk.cli.fast_api import get_fast_api_app
-from services.service import Service
-from routers import inventory
-from repos.repo import Repo
-from constants import DB_NAME
-from agent.simple_agent import simple_agent
-
-repo = Repo(DB_NAME)
-service = Service(repo)
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+from admission import AdmissionMiddleware, AdmissionPool, Overloaded, overloaded_response
+from routers import inventory, suppliers
+from services.container import container
+from services.lazy_app import LazyApp
+from services.reorder_flusher import ReorderFlusher
+from services.stock_compactor import StockLedgerCompactor
+from constants import (AGENT_WARMUP, SESSION_DB_NAME, AGENT_TURN_CONCURRENCY, AGENT_TURN_QUEUE_SIZE,
+                       AGENT_TURN_MAX_WAIT_SECONDS, AGENT_TURN_PATHS)
+import metrics
 
 # Get the directory where main.py is located
 AGENT_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Session service URI (e.g., SQLite)
-# SESSION_SERVICE_URI = "sqlite:///./sessions.db"
+# Session service URI: agent sessions persist in SQLite, shared by the worker processes
+SESSION_SERVICE_URI = f"sqlite:///./{SESSION_DB_NAME}"
 
 # Configure allowed origins for CORS - Add your domains here
 ALLOWED_ORIGINS = [
@@ -24,19 +28,96 @@ ALLOWED_ORIGINS = [
 # Set web=True if you intend to serve a web interface, False otherwise
 SERVE_WEB_INTERFACE = True
 
-# Call the function to get the FastAPI app instance
-# The agent_dir should point to the directory containing main.py
-# ADK will automatically discover the weather_agent folder within it
-app = get_fast_api_app(
-    agents_dir=AGENT_DIR,  # This points to sample-agent-v2/ directory
-    # session_service_uri=SESSION_SERVICE_URI,
-    allow_origins=ALLOWED_ORIGINS,  # This is the key CORS configuration
-    web=SERVE_WEB_INTERFACE,
+def build_agent_app():
+    """The ADK FastAPI app with the agent imported, built on first use by agent_app."""
+    from google.adk.cli.fast_api import get_fast_api_app
+    from google.adk.cli.service_registry import get_service_registry
+    from repos.session_store import SessionStore
+    from services.session_evictor import SessionEvictor
+    from routers import sessions
+    # The tools and the model client, so the first run does not import them
+    importlib.import_module("agent.agent")
+
+    # The sqlite scheme resolves to the pooled, indexed and evicted SessionStore instead
+    # of ADK's own SqliteSessionService
+    session_store = SessionStore(SESSION_SERVICE_URI)
+    get_service_registry().register_session_service("sqlite", lambda uri, **kwargs: session_store)
+
+    # Evict expired sessions while the agent app runs; close the store when it stops
+    @asynccontextmanager
+    async def agent_lifespan(app: FastAPI):
+        session_evictor = SessionEvictor(session_store)
+        await session_evictor.start()
+        yield
+        await session_evictor.stop()
+        await session_store.close()
+
+    # The agent_dir should point to the directory containing main.py
+    # ADK will automatically discover the agent folder within it
+    adk_app = get_fast_api_app(
+        agents_dir=AGENT_DIR,
+        session_service_uri=SESSION_SERVICE_URI,
+        allow_origins=ALLOWED_ORIGINS,  # This is the key CORS configuration
+        web=SERVE_WEB_INTERFACE,
+        lifespan=agent_lifespan,
+    )
+    adk_app.state.session_store = session_store
+    adk_app.include_router(sessions.router, prefix="/sessions", tags=["Sessions"])
+    return adk_app
+
+# google.adk and the agent modules take most of a cold start's import time, so the
+# inventory API serves without them and the agent app is built on the first request
+# the inventory routes do not match, or in the background right after startup
+agent_app = LazyApp(build_agent_app, "agent app")
+
+# Build the shared Repo/Service once (opening the pool and migrating the schema), start
+# delivering the reorder outbox, compacting the stock ledger and warming up the agent
+# app; stop all on shutdown
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    service = await container.start()
+    reorder_flusher = ReorderFlusher(service.repo)
+    stock_compactor = StockLedgerCompactor(service.repo)
+    await reorder_flusher.start()
+    await stock_compactor.start()
+    if AGENT_WARMUP:
+        agent_app.warm_up()
+    yield
+    await agent_app.close()
+    await stock_compactor.stop()
+    await reorder_flusher.stop()
+    await container.stop()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=ALLOWED_ORIGINS,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
 )
 
 app.include_router(inventory.router, prefix="/inventory", tags=["Inventory"])
+app.include_router(suppliers.router, prefix="/suppliers", tags=["Suppliers"])
+
+# Prometheus scrape target for the Repo, Service, tool and model call histograms
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+# DB reads and writes past the Repo's admission pools are shed with 429/503 and Retry-After
+@app.exception_handler(Overloaded)
+async def handle_overloaded(request: Request, error: Overloaded):
+    return overloaded_response(error)
+
+# Everything else (the ADK API and web UI) goes to the agent app; mounted last so the
+# routes above take precedence. Agent runs are admitted through their own pool, so a
+# burst of chats queues (or is shed) instead of slowing the inventory API down
+agent_turns = AdmissionPool("agent_turn", AGENT_TURN_CONCURRENCY, AGENT_TURN_QUEUE_SIZE, AGENT_TURN_MAX_WAIT_SECONDS)
+app.mount("/", AdmissionMiddleware(agent_app, agent_turns, AGENT_TURN_PATHS))
 
 if __name__ == "__main__":
+    import uvicorn
     # Use the PORT environment variable provided by Cloud Run, defaulting to 8081
     uvicorn.run(app, host="0.0.0.0", port=int(os.environ.get("PORT", 8081)))
     
\ No newline at end of file
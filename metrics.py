@@ -0,0 +1,250 @@
+"""In-process metrics for the inventory hot paths, rendered in Prometheus text format.
+
+Repo queries, Service methods and agent tools are wrapped by instrument() or
+instrument_class(). Each call records its duration, the size of its result
+(rows for a query, items for a listing, 1 for a single object) and, when it
+raises, an error count per exception type. The agent's model calls are timed,
+and their failures counted, by the model_call_started/model_call_finished/
+model_call_failed callbacks. The admission pools (admission.py) publish their
+limits, slots in use and queue depths as gauges.
+GET /metrics serves render().
+
+Recording takes two perf_counter() calls, a bisect and a few list
+increments. It runs on the event loop thread, so no lock is needed. Repo calls
+slower than SLOW_QUERY_THRESHOLD_MS are also logged to the "inventory.slow_query"
+logger.
+"""
+import functools
+import inspect
+import logging
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+from constants import (METRICS_ENABLED, METRICS_LATENCY_BUCKETS, METRICS_SIZE_BUCKETS,
+                       SLOW_QUERY_THRESHOLD_MS, MODEL_CALL_STALE_SECONDS)
+
+slow_query_log = logging.getLogger("inventory.slow_query")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, label_values: Tuple, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: Dict[Tuple, float] = {}
+
+    def set(self, label_values: Tuple, value: float):
+        self._values[label_values] = value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labels, label_values)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...], buckets: Iterable[float]):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = sorted(buckets)
+        # label values -> per-bucket counts (the last one is +Inf), then sum
+        self._series: Dict[Tuple, list] = {}
+
+    def observe(self, label_values: Tuple, value: float):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label_values, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ["+Inf"], series):
+                cumulative += count
+                le = 'le="{}"'.format(bound if bound == "+Inf" else f"{bound:g}")
+                lines.append(f"{self.name}_bucket{_labels(self.labels, label_values, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, label_values)} {series[-1]:.6g}")
+            lines.append(f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, help, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = (),
+                  buckets: Iterable[float] = METRICS_LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+OPERATION_SECONDS = registry.histogram(
+    "inventory_operation_duration_seconds", "Duration of Repo queries, Service methods and agent tool calls",
+    ("component", "operation"))
+OPERATION_RESULT_SIZE = registry.histogram(
+    "inventory_operation_result_size", "Rows or items returned by Repo queries, Service methods and agent tool calls",
+    ("component", "operation"), METRICS_SIZE_BUCKETS)
+OPERATION_ERRORS = registry.counter(
+    "inventory_operation_errors_total", "Repo queries, Service methods and agent tool calls that raised",
+    ("component", "operation", "error"))
+WRITE_BATCH_SIZE = registry.histogram(
+    "inventory_write_batch_size", "Writes group-committed per transaction", buckets=METRICS_SIZE_BUCKETS)
+MODEL_CALL_SECONDS = registry.histogram(
+    "inventory_model_call_duration_seconds", "Duration of agent model calls, failed ones included", ("agent",))
+MODEL_CALL_ERRORS = registry.counter(
+    "inventory_model_call_errors_total", "Agent model calls that raised", ("agent", "error"))
+ADMISSION_LIMIT = registry.gauge(
+    "inventory_admission_limit", "Concurrent slots per admission pool", ("pool",))
+ADMISSION_ACTIVE = registry.gauge(
+    "inventory_admission_active", "Slots in use per admission pool", ("pool",))
+ADMISSION_QUEUE_DEPTH = registry.gauge(
+    "inventory_admission_queue_depth", "Callers waiting for a slot per admission pool", ("pool",))
+ADMISSION_WAIT_SECONDS = registry.histogram(
+    "inventory_admission_wait_seconds", "Time admitted and timed-out callers waited for a slot", ("pool",))
+ADMISSION_REJECTED = registry.counter(
+    "inventory_admission_rejected_total", "Callers shed by an admission pool, by queue_full (429) or timeout (503)",
+    ("pool", "reason"))
+SINGLE_FLIGHT_SHARED = registry.counter(
+    "inventory_single_flight_shared_total", "Cached reads that joined an identical in-flight load instead of querying",
+    ("kind",))
+
+
+def result_size(result) -> int:
+    if result is None:
+        return 0
+    if isinstance(result, tuple) and result and isinstance(result[0], list):
+        return len(result[0])  # (page, next key)
+    if isinstance(result, (list, tuple, set)):
+        return len(result)
+    return 1
+
+
+def instrument(component: str, operation: str = None):
+    """Decorator recording duration, result size and errors of a coroutine function."""
+    def decorate(func):
+        if not METRICS_ENABLED:
+            return func
+        labels = (component, operation or func.__name__)
+        log_slow = component == "repo" and SLOW_QUERY_THRESHOLD_MS > 0
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as error:
+                OPERATION_SECONDS.observe(labels, time.perf_counter() - start)
+                OPERATION_ERRORS.inc(labels + (type(error).__name__,))
+                raise
+            elapsed = time.perf_counter() - start
+            size = result_size(result)
+            OPERATION_SECONDS.observe(labels, elapsed)
+            OPERATION_RESULT_SIZE.observe(labels, size)
+            if log_slow and elapsed * 1000 >= SLOW_QUERY_THRESHOLD_MS:
+                slow_query_log.warning("slow query %s: %.1f ms, %d rows", labels[1], elapsed * 1000, size)
+            return result
+        return wrapper
+    return decorate
+
+
+def instrument_class(component: str):
+    """Class decorator applying instrument() to every public coroutine method the class defines."""
+    def decorate(cls):
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(member):
+                setattr(cls, name, instrument(component, name)(member))
+        return cls
+    return decorate
+
+
+# Model calls start and end in separate callbacks; pair them by invocation and agent,
+# as the agents of one invocation call their models one at a time each. Oldest first:
+# a call cancelled with its invocation never ends, so it is dropped once stale
+_model_calls_started: Dict[Tuple[str, str], float] = {}
+
+
+def model_call_started(callback_context, llm_request):
+    """before_model_callback for an LlmAgent. Returns None so the model is called."""
+    now = time.perf_counter()
+    while _model_calls_started:
+        key, start = next(iter(_model_calls_started.items()))
+        if now - start < MODEL_CALL_STALE_SECONDS:
+            break
+        del _model_calls_started[key]
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    _model_calls_started.pop(key, None)
+    _model_calls_started[key] = now
+    return None
+
+
+def model_call_finished(callback_context, llm_response):
+    """after_model_callback for an LlmAgent. Returns None to keep the model's response.
+
+    A streamed call also calls it for every partial response; it is timed to the final one.
+    """
+    if llm_response.partial:
+        return None
+    start = _model_calls_started.pop((callback_context.invocation_id, callback_context.agent_name), None)
+    if start is not None:
+        MODEL_CALL_SECONDS.observe((callback_context.agent_name,), time.perf_counter() - start)
+    return None
+
+
+def model_call_failed(callback_context, llm_request, error: Exception):
+    """on_model_error_callback for an LlmAgent. Returns None so the error propagates."""
+    start = _model_calls_started.pop((callback_context.invocation_id, callback_context.agent_name), None)
+    if start is not None:
+        MODEL_CALL_SECONDS.observe((callback_context.agent_name,), time.perf_counter() - start)
+    MODEL_CALL_ERRORS.inc((callback_context.agent_name, type(error).__name__))
+    return None
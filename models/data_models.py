@@ -13,6 +13,11 @@ class Supplier(BaseModel):
     category: Optional[str] = None
     address: Optional[str] = None
 
+class SupplierSummary(Supplier):
+    item_count: int = 0
+    stock_value: float = 0.0
+    low_stock_count: int = 0                # Items below their reorder level
+
 class InventoryItem(BaseModel):
     model_config = ConfigDict(
         json_encoders={datetime: lambda dt: dt.isoformat()})
@@ -25,3 +30,20 @@ class InventoryItem(BaseModel):
     supplier: Optional[str] = None
     unit_price: float                       # Cost per unit/item
     last_updated: Optional[datetime] = None  # Auto-update on edit
+    version: int = 0                        # Incremented on every write
+    supplier_id: Optional[str] = None       # Supplier whose name matches supplier, set on write
+
+
+class QuantityDelta(BaseModel):
+    delta: int                              # Signed change, e.g. -2 for a sale
+    non_negative: bool = True               # Refuse changes that would take stock below zero
+    expected_version: Optional[int] = None  # Refuse if the item changed since this version
+
+
+class QuantityAdjustment(QuantityDelta):
+    item_id: str
+
+
+class ItemQuantity(BaseModel):
+    item_name: str                          # As the user typed it, resolved by name search
+    new_quantity: int
@@ -0,0 +1,224 @@
+"""Summary tables kept up to date by triggers on the inventory table.
+
+InventoryTotals, CategoryStats, SupplierStats and SupplierCategoryStats are
+maintained in the same transaction as every row change (see migration 4), so
+analytics read a handful of rows instead of scanning the inventory.
+
+Run ``python -m repos.aggregates`` to check the tables for drift against a
+full recomputation, or ``python -m repos.aggregates --rebuild`` to also
+rewrite them from scratch.
+"""
+import math
+from constants import TABLE_NAME
+
+# Per-row contributions. A supplier's reorder ratio is quantity / reorder_level
+# over its items in stock; items without a positive reorder level count as an
+# infinite ratio, which makes the supplier's average infinite.
+def _ratio_terms(row: str = "") -> tuple:
+    """(ratio value, finite ratio flag, infinite ratio flag) for the row prefix, e.g. "NEW."."""
+    finite = f"({row}quantity > 0 AND ifnull({row}reorder_level, 0) > 0)"
+    infinite = f"({row}quantity > 0 AND ifnull({row}reorder_level, 0) <= 0)"
+    value = f"CASE WHEN {finite} THEN CAST({row}quantity AS REAL) / {row}reorder_level ELSE 0 END"
+    return value, finite, infinite
+
+
+_RATIO_VALUE, _RATIO_FINITE, _RATIO_INFINITE = _ratio_terms()
+
+# table -> (key columns, value columns, recomputation query)
+AGGREGATE_TABLES = {
+    "InventoryTotals": (
+        ["id"],
+        ["item_count", "stock_value"],
+        f"SELECT 1, COUNT(*), ifnull(SUM(quantity * unit_price), 0) FROM {TABLE_NAME}",
+    ),
+    "CategoryStats": (
+        ["category"],
+        ["item_count", "price_sum", "stock_value"],
+        f"""SELECT category, COUNT(*), SUM(unit_price), SUM(quantity * unit_price)
+            FROM {TABLE_NAME} WHERE category <> '' GROUP BY category""",
+    ),
+    "SupplierStats": (
+        ["supplier"],
+        ["item_count", "stock_value", "ratio_sum", "ratio_count", "ratio_inf_count"],
+        f"""SELECT supplier, COUNT(*), SUM(quantity * unit_price), SUM({_RATIO_VALUE}),
+                   SUM({_RATIO_FINITE}), SUM({_RATIO_INFINITE})
+            FROM {TABLE_NAME} WHERE supplier <> '' GROUP BY supplier""",
+    ),
+    "SupplierCategoryStats": (
+        ["supplier", "category"],
+        ["item_count", "price_sum"],
+        f"""SELECT supplier, category, COUNT(*), SUM(unit_price)
+            FROM {TABLE_NAME} WHERE supplier <> '' AND category <> ''
+            GROUP BY supplier, category""",
+    ),
+}
+
+AGGREGATE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS InventoryTotals (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        item_count INTEGER NOT NULL DEFAULT 0,
+        stock_value REAL NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS CategoryStats (
+        category TEXT PRIMARY KEY,
+        item_count INTEGER NOT NULL,
+        price_sum REAL NOT NULL,
+        stock_value REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SupplierStats (
+        supplier TEXT PRIMARY KEY,
+        item_count INTEGER NOT NULL,
+        stock_value REAL NOT NULL,
+        ratio_sum REAL NOT NULL,
+        ratio_count INTEGER NOT NULL,
+        ratio_inf_count INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS SupplierCategoryStats (
+        supplier TEXT NOT NULL,
+        category TEXT NOT NULL,
+        item_count INTEGER NOT NULL,
+        price_sum REAL NOT NULL,
+        PRIMARY KEY (supplier, category)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_category_stats_avg_price ON CategoryStats(price_sum / item_count)",
+    "CREATE INDEX IF NOT EXISTS idx_supplier_stats_item_count ON SupplierStats(item_count)",
+    """CREATE INDEX IF NOT EXISTS idx_supplier_stats_ratio
+       ON SupplierStats(ratio_inf_count > 0, ratio_sum / ratio_count) WHERE ratio_count + ratio_inf_count > 0""",
+    """CREATE INDEX IF NOT EXISTS idx_supplier_category_stats_avg_price
+       ON SupplierCategoryStats(price_sum / item_count)""",
+]
+
+
+def _apply_row(row: str, sign: int) -> str:
+    """Trigger body adding (sign=1) or removing (sign=-1) the row NEW/OLD from the summaries."""
+    value, finite, infinite = _ratio_terms(f"{row}.")
+    return f"""
+        UPDATE InventoryTotals
+        SET item_count = item_count + {sign},
+            stock_value = stock_value + {sign} * {row}.quantity * {row}.unit_price
+        WHERE id = 1;
+        INSERT INTO CategoryStats (category, item_count, price_sum, stock_value)
+        SELECT {row}.category, {sign}, {sign} * {row}.unit_price, {sign} * {row}.quantity * {row}.unit_price
+        WHERE {row}.category <> ''
+        ON CONFLICT (category) DO UPDATE SET
+            item_count = item_count + excluded.item_count,
+            price_sum = price_sum + excluded.price_sum,
+            stock_value = stock_value + excluded.stock_value;
+        INSERT INTO SupplierStats (supplier, item_count, stock_value, ratio_sum, ratio_count, ratio_inf_count)
+        SELECT {row}.supplier, {sign}, {sign} * {row}.quantity * {row}.unit_price,
+               {sign} * ({value}), {sign} * {finite}, {sign} * {infinite}
+        WHERE {row}.supplier <> ''
+        ON CONFLICT (supplier) DO UPDATE SET
+            item_count = item_count + excluded.item_count,
+            stock_value = stock_value + excluded.stock_value,
+            ratio_sum = ratio_sum + excluded.ratio_sum,
+            ratio_count = ratio_count + excluded.ratio_count,
+            ratio_inf_count = ratio_inf_count + excluded.ratio_inf_count;
+        INSERT INTO SupplierCategoryStats (supplier, category, item_count, price_sum)
+        SELECT {row}.supplier, {row}.category, {sign}, {sign} * {row}.unit_price
+        WHERE {row}.supplier <> '' AND {row}.category <> ''
+        ON CONFLICT (supplier, category) DO UPDATE SET
+            item_count = item_count + excluded.item_count,
+            price_sum = price_sum + excluded.price_sum;
+    """
+
+
+_PRUNE_EMPTY = """
+        DELETE FROM CategoryStats WHERE item_count = 0;
+        DELETE FROM SupplierStats WHERE item_count = 0;
+        DELETE FROM SupplierCategoryStats WHERE item_count = 0;
+"""
+
+AGGREGATE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_insert AFTER INSERT ON {TABLE_NAME}
+    BEGIN
+        {_apply_row("NEW", 1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_delete AFTER DELETE ON {TABLE_NAME}
+    BEGIN
+        {_apply_row("OLD", -1)}
+        {_PRUNE_EMPTY}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_stats_update
+    AFTER UPDATE OF category, quantity, reorder_level, supplier, unit_price ON {TABLE_NAME}
+    BEGIN
+        {_apply_row("OLD", -1)}
+        {_apply_row("NEW", 1)}
+        {_PRUNE_EMPTY}
+    END
+    """,
+]
+
+
+def rebuild_statements() -> list:
+    """Statements recomputing every summary table from the inventory table."""
+    statements = []
+    for table, (keys, values, query) in AGGREGATE_TABLES.items():
+        statements.append(f"DELETE FROM {table}")
+        statements.append(f"INSERT INTO {table} ({', '.join(keys + values)}) {query}")
+    return statements
+
+
+async def check(db) -> list:
+    """Compare the summary tables against a full recomputation.
+
+    Returns one entry per drifted value, an empty list means consistent.
+    """
+    drift = []
+    for table, (keys, values, query) in AGGREGATE_TABLES.items():
+        cursor = await db.execute(f"SELECT {', '.join(keys + values)} FROM {table}")
+        stored = {tuple(row[:len(keys)]): row[len(keys):] for row in await cursor.fetchall()}
+        cursor = await db.execute(query)
+        expected = {tuple(row[:len(keys)]): row[len(keys):] for row in await cursor.fetchall()}
+        for key in stored.keys() | expected.keys():
+            stored_row = stored.get(key) or [None] * len(values)
+            expected_row = expected.get(key) or [None] * len(values)
+            for column, got, want in zip(values, stored_row, expected_row):
+                if got is None or want is None:
+                    consistent = got == want
+                else:
+                    consistent = math.isclose(got, want, rel_tol=1e-9, abs_tol=1e-6)
+                if not consistent:
+                    drift.append({"table": table, "key": list(key), "column": column, "stored": got, "expected": want})
+    return drift
+
+
+async def rebuild(db) -> list:
+    """Check for drift, then recompute every summary table. Returns the drift found."""
+    drift = await check(db)
+    for statement in rebuild_statements():
+        await db.execute(statement)
+    return drift
+
+
+if __name__ == "__main__":
+    import asyncio
+    import json
+    import sys
+    from repos.repo import Repo
+
+    async def _main(repair: bool):
+        repo = Repo()
+        await repo.open()
+        try:
+            await repo.init_db()
+            drift = await repo.check_aggregates(rebuild=repair)
+        finally:
+            await repo.close()
+        print(json.dumps({"consistent": not drift, "rebuilt": repair, "drift": drift}, indent=2))
+        return 0 if not drift or repair else 1
+
+    sys.exit(asyncio.run(_main("--rebuild" in sys.argv[1:])))
@@ -0,0 +1,64 @@
+"""Append-only log of inventory changes, written by triggers (see migrations 8 and 12).
+
+Every insert, update and delete on the inventory table appends one row to
+InventoryChanges in the same transaction: the operation, the item id and, for
+inserts and updates, the item as it is after the change, as JSON. seq is
+AUTOINCREMENT, so it grows in commit order and is never reused after pruning.
+A client that loads a snapshot after reading the last seq and then applies the
+changes after that seq keeps an exact mirror of the inventory.
+"""
+from constants import TABLE_NAME
+
+_ITEM_FIELDS = """'id', NEW.id, 'item_name', NEW.item_name, 'category', NEW.category,
+            'quantity', NEW.quantity, 'reorder_level', NEW.reorder_level, 'supplier', NEW.supplier,
+            'unit_price', NEW.unit_price, 'last_updated', NULLIF(NEW.last_updated, ''),
+            'version', NEW.version"""
+
+# The item as migration 8 logged it, before items had a supplier_id (migration 10)
+_ITEM_JSON_V8 = f"json_object({_ITEM_FIELDS})"
+# The item as it is logged since migration 12, with every column GET /inventory returns
+_ITEM_JSON = f"json_object({_ITEM_FIELDS}, 'supplier_id', NEW.supplier_id)"
+
+
+def _write_triggers(item_json: str) -> list:
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_changes_insert AFTER INSERT ON {TABLE_NAME}
+        BEGIN
+            INSERT INTO InventoryChanges (op, item_id, item) VALUES ('insert', NEW.id, {item_json});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS inventory_changes_update AFTER UPDATE ON {TABLE_NAME}
+        BEGIN
+            INSERT INTO InventoryChanges (op, item_id, item) VALUES ('update', NEW.id, {item_json});
+        END
+        """,
+    ]
+
+
+CHANGE_LOG_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS InventoryChanges (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        changed_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        item TEXT
+    )
+    """,
+    *_write_triggers(_ITEM_JSON_V8),
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_changes_delete AFTER DELETE ON {TABLE_NAME}
+    BEGIN
+        INSERT INTO InventoryChanges (op, item_id) VALUES ('delete', OLD.id);
+    END
+    """,
+]
+
+# Migration 12: log supplier_id too, so a mirror kept from the feed matches GET /inventory
+CHANGE_LOG_SUPPLIER_ID = [
+    "DROP TRIGGER IF EXISTS inventory_changes_insert",
+    "DROP TRIGGER IF EXISTS inventory_changes_update",
+    *_write_triggers(_ITEM_JSON),
+]
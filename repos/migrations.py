@@ -0,0 +1,102 @@
+from constants import TABLE_NAME
+from repos.aggregates import AGGREGATE_DDL, AGGREGATE_TRIGGERS, rebuild_statements
+from repos.name_search import NAME_INDEX_DDL, NAME_INDEX_REBUILD
+from repos.change_log import CHANGE_LOG_DDL, CHANGE_LOG_SUPPLIER_ID
+from repos.reorder_queue import REORDER_QUEUE_DDL, REORDER_QUEUE_BACKFILL
+from repos.stock_ledger import STOCK_LEDGER_DDL, STOCK_LEDGER_BACKFILL
+
+# Schema migrations, applied in order. The schema version of a database is kept in
+# PRAGMA user_version: version N means the first N migrations have been applied.
+# Never edit a released migration, append a new one instead.
+MIGRATIONS = [
+    # 1: base tables (IF NOT EXISTS so databases created before versioning are adopted)
+    [
+        f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            id TEXT PRIMARY KEY,
+            item_name TEXT NOT NULL,
+            category TEXT,
+            quantity INTEGER NOT NULL,
+            reorder_level INTEGER DEFAULT 0,
+            supplier TEXT,
+            unit_price REAL NOT NULL,
+            last_updated TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS Suppliers (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            contact_person TEXT,
+            phone_number TEXT,
+            category TEXT,
+            address TEXT
+        )
+        """,
+    ],
+    # 2: indexes for the default listing order and supplier lookups
+    [
+        f"CREATE INDEX IF NOT EXISTS idx_inventory_last_updated ON {TABLE_NAME}(last_updated)",
+        "CREATE INDEX IF NOT EXISTS idx_suppliers_name ON Suppliers(name)",
+    ],
+    # 3: indexes backing the agent tool lookups
+    [
+        f"CREATE INDEX IF NOT EXISTS idx_inventory_category ON {TABLE_NAME}(category COLLATE NOCASE)",
+        f"CREATE INDEX IF NOT EXISTS idx_inventory_supplier ON {TABLE_NAME}(supplier)",
+        f"CREATE INDEX IF NOT EXISTS idx_inventory_item_name ON {TABLE_NAME}(item_name COLLATE NOCASE)",
+        # Partial index: only rows currently below their reorder level are stored
+        f"""CREATE INDEX IF NOT EXISTS idx_inventory_needs_reorder ON {TABLE_NAME}(id)
+            WHERE quantity < reorder_level""",
+    ],
+    # 4: trigger-maintained summary tables for the analytics tools, backfilled from existing rows
+    AGGREGATE_DDL + AGGREGATE_TRIGGERS + rebuild_statements(),
+    # 5: keyset pagination on (last_updated, id). Rows never stamped get '' so they
+    # sort after every timestamp in descending order and stay reachable by the cursor.
+    [
+        f"UPDATE {TABLE_NAME} SET last_updated = '' WHERE last_updated IS NULL",
+        f"CREATE INDEX IF NOT EXISTS idx_inventory_last_updated_id ON {TABLE_NAME}(last_updated, id)",
+        "DROP INDEX IF EXISTS idx_inventory_last_updated",
+    ],
+    # 6: row version for optimistic concurrency on quantity adjustments
+    [
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ],
+    # 7: FTS5 trigram index for fuzzy item-name search, backfilled from existing rows
+    NAME_INDEX_DDL + NAME_INDEX_REBUILD,
+    # 8: append-only change log for the change feed, starting empty at the current state
+    CHANGE_LOG_DDL,
+    # 9: trigger-maintained reorder queue and its outbox, backfilled from existing rows
+    REORDER_QUEUE_DDL + REORDER_QUEUE_BACKFILL,
+    # 10: items reference their supplier by ID, linked by name. The covering index lets the
+    # per-supplier aggregates read the join without touching the inventory table.
+    [
+        f"ALTER TABLE {TABLE_NAME} ADD COLUMN supplier_id TEXT REFERENCES Suppliers(id)",
+        f"""UPDATE {TABLE_NAME} SET supplier_id = (SELECT min(id) FROM Suppliers s WHERE s.name = {TABLE_NAME}.supplier)
+            WHERE supplier IS NOT NULL""",
+        f"""CREATE INDEX IF NOT EXISTS idx_inventory_supplier_id
+            ON {TABLE_NAME}(supplier_id, quantity, unit_price, reorder_level)""",
+    ],
+    # 11: trigger-written stock movement ledger and its snapshots, opened with current quantities
+    STOCK_LEDGER_DDL + STOCK_LEDGER_BACKFILL,
+    # 12: the change log records each item's supplier_id
+    CHANGE_LOG_SUPPLIER_ID,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+async def migrate(db) -> int:
+    """Apply pending migrations on db, which must already be inside a transaction.
+
+    Returns the schema version the database ends up at.
+    """
+    cursor = await db.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than this application ({SCHEMA_VERSION})")
+    for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+        for statement in statements:
+            await db.execute(statement)
+        await db.execute(f"PRAGMA user_version = {target}")
+    return SCHEMA_VERSION
@@ -0,0 +1,79 @@
+"""Fuzzy item-name search over an FTS5 trigram index.
+
+InventoryNameIndex mirrors Inventory.item_name under the same rowid and is kept
+in sync by triggers (see migration 7). Candidates are gathered from an exact
+name match, a substring match (the whole query as one trigram phrase) and, when
+those come up short, a fuzzy match OR-ing the query's rarest trigrams, so names
+sharing part of a misspelt query are still found. Picking the rarest trigrams
+through the InventoryNameVocab table keeps the posting lists FTS5 has to rank
+short. score() then ranks the candidates against the query.
+
+Rowids of a table without an INTEGER PRIMARY KEY may change on VACUUM, so
+rebuild the index (Repo.rebuild_name_index) after vacuuming the database.
+"""
+from difflib import SequenceMatcher
+from typing import List
+from constants import TABLE_NAME
+
+NAME_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS InventoryNameIndex USING fts5(item_name, tokenize = 'trigram')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS InventoryNameVocab USING fts5vocab(InventoryNameIndex, row)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_name_index_insert AFTER INSERT ON {TABLE_NAME}
+    BEGIN
+        INSERT INTO InventoryNameIndex (rowid, item_name) VALUES (NEW.rowid, NEW.item_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_name_index_delete AFTER DELETE ON {TABLE_NAME}
+    BEGIN
+        DELETE FROM InventoryNameIndex WHERE rowid = OLD.rowid;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_name_index_update AFTER UPDATE OF item_name ON {TABLE_NAME}
+    BEGIN
+        UPDATE InventoryNameIndex SET item_name = NEW.item_name WHERE rowid = NEW.rowid;
+    END
+    """,
+]
+
+NAME_INDEX_REBUILD = [
+    "DELETE FROM InventoryNameIndex",
+    f"INSERT INTO InventoryNameIndex (rowid, item_name) SELECT rowid, item_name FROM {TABLE_NAME}",
+]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _quote(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def trigrams(query: str) -> List[str]:
+    """Distinct trigrams of the normalized query, empty if it is shorter than a trigram."""
+    text = _normalize(query)
+    return list(dict.fromkeys(text[i:i + 3] for i in range(len(text) - 2)))
+
+
+def phrase_expression(query: str) -> str:
+    """FTS5 MATCH expression for names containing the normalized query."""
+    return _quote(_normalize(query))
+
+
+def any_expression(terms: List[str]) -> str:
+    """FTS5 MATCH expression for names containing any of the trigrams."""
+    return " OR ".join(_quote(term) for term in terms)
+
+
+def score(query: str, item_name: str) -> float:
+    """Similarity in [0, 1]: 1 for an exact match, high for substrings, edit similarity otherwise."""
+    text, name = _normalize(query), _normalize(item_name)
+    if text == name:
+        return 1.0
+    similarity = SequenceMatcher(None, text, name).ratio()
+    if text and text in name:
+        return max(similarity, 0.8 + 0.2 * len(text) / len(name)) * 0.99
+    return similarity * 0.9
@@ -0,0 +1,88 @@
+"""Reorder queue and outbox kept up to date by triggers on the inventory table.
+
+ReorderQueue holds exactly the items whose quantity is below their reorder
+level, with their shortage and supplier, so the reorder question is an index
+read grouped per supplier instead of a scan (see migration 9). Whenever an item
+enters or leaves the queue, a 'queued' or 'cleared' event is appended to the
+ReorderEvents outbox in the same transaction; the background ReorderFlusher
+delivers undelivered events to the reorder webhook.
+"""
+from constants import TABLE_NAME
+
+
+def _below(row: str) -> str:
+    return f"({row}.quantity < ifnull({row}.reorder_level, 0))"
+
+
+def _event(event: str, row: str, condition: str) -> str:
+    return f"""
+        INSERT INTO ReorderEvents (event, item_id, supplier, shortage)
+        SELECT '{event}', {row}.id, ifnull({row}.supplier, ''), ifnull({row}.reorder_level, 0) - {row}.quantity
+        WHERE {condition};"""
+
+
+_ENQUEUE_NEW = f"""
+        INSERT INTO ReorderQueue (item_id, supplier, shortage)
+        SELECT NEW.id, ifnull(NEW.supplier, ''), ifnull(NEW.reorder_level, 0) - NEW.quantity
+        WHERE {_below("NEW")}
+        ON CONFLICT (item_id) DO UPDATE SET supplier = excluded.supplier, shortage = excluded.shortage;"""
+
+REORDER_QUEUE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS ReorderQueue (
+        item_id TEXT PRIMARY KEY,
+        supplier TEXT NOT NULL,
+        shortage INTEGER NOT NULL,
+        queued_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now'))
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reorder_queue_supplier ON ReorderQueue(supplier, item_id)",
+    """
+    CREATE TABLE IF NOT EXISTS ReorderEvents (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        event TEXT NOT NULL,
+        item_id TEXT NOT NULL,
+        supplier TEXT NOT NULL,
+        shortage INTEGER NOT NULL,
+        created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f', 'now')),
+        claimed_until TEXT,
+        delivered_at TEXT
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_reorder_events_pending ON ReorderEvents(seq) WHERE delivered_at IS NULL",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reorder_queue_insert AFTER INSERT ON {TABLE_NAME}
+    WHEN {_below("NEW")}
+    BEGIN
+        {_ENQUEUE_NEW}
+        {_event("queued", "NEW", "1")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reorder_queue_update
+    AFTER UPDATE OF quantity, reorder_level, supplier ON {TABLE_NAME}
+    WHEN {_below("OLD")} OR {_below("NEW")}
+    BEGIN
+        {_event("queued", "NEW", f"{_below('NEW')} AND NOT {_below('OLD')}")}
+        {_event("cleared", "OLD", f"{_below('OLD')} AND NOT {_below('NEW')}")}
+        DELETE FROM ReorderQueue WHERE item_id = OLD.id AND NOT {_below("NEW")};
+        {_ENQUEUE_NEW}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS reorder_queue_delete AFTER DELETE ON {TABLE_NAME}
+    WHEN {_below("OLD")}
+    BEGIN
+        DELETE FROM ReorderQueue WHERE item_id = OLD.id;
+        {_event("cleared", "OLD", "1")}
+    END
+    """,
+]
+
+REORDER_QUEUE_BACKFILL = [
+    f"""INSERT OR REPLACE INTO ReorderQueue (item_id, supplier, shortage)
+        SELECT id, ifnull(supplier, ''), ifnull(reorder_level, 0) - quantity
+        FROM {TABLE_NAME} WHERE quantity < ifnull(reorder_level, 0)""",
+    """INSERT INTO ReorderEvents (event, item_id, supplier, shortage)
+       SELECT 'queued', item_id, supplier, shortage FROM ReorderQueue ORDER BY supplier, item_id""",
+]
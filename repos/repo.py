@@ -1,48 +1,278 @@
+import asyncio
+import time
 import aiosqlite
-from typing import List, Optional
-from datetime import datetime
-from models.data_models import InventoryItem
-from constants import DB_NAME, TABLE_NAME
+import orjson
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from models.data_models import InventoryItem, QuantityAdjustment, Supplier, SupplierSummary
+from repos.migrations import migrate
+from repos import aggregates, name_search
+from repos.stock_ledger import epoch_ms, from_epoch_ms
+import metrics
+from admission import AdmissionPool
+from metrics import instrument_class
+from constants import (DB_NAME, TABLE_NAME, DB_READER_POOL_SIZE, DB_CACHED_STATEMENTS, DB_PRAGMAS,
+                       NAME_SEARCH_LIMIT, NAME_SEARCH_CANDIDATES, NAME_SEARCH_TRIGRAMS,
+                       NAME_SEARCH_MAX_POSTINGS, WRITE_BATCH_MAX_OPS, WRITE_BATCH_WINDOW_MS,
+                       DB_READ_QUEUE_SIZE, DB_READ_MAX_WAIT_SECONDS, DB_WRITE_CONCURRENCY, DB_WRITE_QUEUE_SIZE,
+                       DB_WRITE_MAX_WAIT_SECONDS)
 
+WRITE_COLUMNS = "id, item_name, category, quantity, reorder_level, supplier, unit_price, last_updated"
+ITEM_COLUMNS = WRITE_COLUMNS + ", version, supplier_id"
+SUPPLIER_COLUMNS = "id, name, contact_person, phone_number, category, address"
+# supplier_id is derived from the supplier name on every write, never taken from the caller
+SUPPLIER_ID_FOR_NAME = "(SELECT min(id) FROM Suppliers WHERE name = ?)"
 
+
+def row_to_item(row) -> InventoryItem:
+    # Rows come from typed columns written through validated models, so skip re-validation
+    return InventoryItem.model_construct(
+        id=row[0],
+        item_name=row[1],
+        category=row[2],
+        quantity=row[3],
+        reorder_level=row[4],
+        supplier=row[5],
+        unit_price=row[6],
+        last_updated=datetime.fromisoformat(row[7]) if row[7] else None,
+        version=row[8],
+        supplier_id=row[9]
+    )
+
+
+def row_to_supplier(row) -> Supplier:
+    return Supplier.model_construct(
+        id=row[0], name=row[1], contact_person=row[2], phone_number=row[3], category=row[4], address=row[5])
+
+
+def row_to_supplier_summary(row) -> SupplierSummary:
+    return SupplierSummary.model_construct(
+        id=row[0], name=row[1], contact_person=row[2], phone_number=row[3], category=row[4], address=row[5],
+        item_count=row[6], stock_value=row[7], low_stock_count=row[8])
+
+
+class AdjustmentError(Exception):
+    """A quantity adjustment was refused. reason is not_found, insufficient_stock or version_conflict."""
+
+    def __init__(self, item_id: str, reason: str):
+        super().__init__(f"{reason}: {item_id}")
+        self.item_id = item_id
+        self.reason = reason
+
+
+@instrument_class("repo")
 class Repo:
-    def __init__(self, db_path: str = DB_NAME):
+    def __init__(self, db_path: str = DB_NAME, reader_pool_size: int = DB_READER_POOL_SIZE):
         self.db_path = db_path
+        self.reader_pool_size = reader_pool_size
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._reader_conns: List[aiosqlite.Connection] = []
+        self._readers: Optional[asyncio.Queue] = None
+        self._write_lock = asyncio.Lock()
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._write_task: Optional[asyncio.Task] = None
+        self._open_lock = asyncio.Lock()
+        # Reads beyond the reader connections and writes beyond one group commit queue here,
+        # boundedly, and are shed with Overloaded once the queue is full or the wait too long
+        self.read_admission = AdmissionPool(
+            "db_read", max(1, reader_pool_size), DB_READ_QUEUE_SIZE, DB_READ_MAX_WAIT_SECONDS)
+        self.write_admission = AdmissionPool(
+            "db_write", DB_WRITE_CONCURRENCY, DB_WRITE_QUEUE_SIZE, DB_WRITE_MAX_WAIT_SECONDS)
 
-    async def init_db(self):
-        """Initialize the inventory and supplier tables if they don't exist."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(f"""
-                CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
-                    id TEXT PRIMARY KEY,
-                    item_name TEXT NOT NULL,
-                    category TEXT,
-                    quantity INTEGER NOT NULL,
-                    reorder_level INTEGER DEFAULT 0,
-                    supplier TEXT,
-                    unit_price REAL NOT NULL,
-                    last_updated TEXT
-                )
-            """)
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS Suppliers (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    contact_person TEXT,
-                    phone_number TEXT,
-                    category TEXT,
-                    address TEXT
-                )
-            """)
-            await db.commit()
+    async def open(self):
+        """Open the writer connection, its writer task and the reader connection pool."""
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            self._writer = await self._connect()
+            self._readers = asyncio.Queue()
+            for _ in range(self.reader_pool_size):
+                db = await self._connect()
+                self._reader_conns.append(db)
+                self._readers.put_nowait(db)
+            self._write_queue = asyncio.Queue()
+            self._write_task = asyncio.create_task(self._write_loop())
+
+    async def close(self):
+        """Finish the writes queued so far, then close every pooled connection.
+
+        Writes queued after close() was called fail with RuntimeError.
+        """
+        async with self._open_lock:
+            if self._write_task is not None:
+                self._write_queue.put_nowait(None)
+                await self._write_task
+                while not self._write_queue.empty():
+                    entry = self._write_queue.get_nowait()
+                    if entry is None:
+                        continue
+                    _, future, release = entry
+                    if not future.done():
+                        future.set_exception(RuntimeError("Repo closed"))
+                    release()
+            self._write_task = None
+            self._write_queue = None
+            for db in self._reader_conns:
+                await db.close()
+            if self._writer is not None:
+                await self._writer.close()
+            self._writer = None
+            self._reader_conns = []
+            self._readers = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        # Autocommit mode: transactions are opened explicitly by _execute_write
+        db = await aiosqlite.connect(
+            self.db_path, isolation_level=None, cached_statements=DB_CACHED_STATEMENTS)
+        for pragma, value in DB_PRAGMAS.items():
+            await db.execute(f"PRAGMA {pragma} = {value}")
+        return db
+
+    @asynccontextmanager
+    async def _reader(self):
+        """Borrow a reader connection from the pool, once admitted by read_admission.
+
+        With reader_pool_size=0 (e.g. an in-memory database, where every connection would
+        see its own empty database) reads share the writer connection, between writes.
+        """
+        if self._writer is None:
+            await self.open()
+        async with self.read_admission.slot():
+            if not self._reader_conns:
+                async with self._write_lock:
+                    yield self._writer
+                return
+            db = await self._readers.get()
+            try:
+                yield db
+            finally:
+                self._readers.put_nowait(db)
+
+    async def _execute_write(self, operation):
+        """Run operation(db) on the writer connection inside a transaction and return its result.
+
+        Writes are group-committed: they queue for the writer task, which runs every
+        write queued while the previous transaction committed (up to WRITE_BATCH_MAX_OPS,
+        after waiting WRITE_BATCH_WINDOW_MS for more) in one transaction. Each write of
+        a batch runs under its own savepoint, so one that raises is rolled back and its
+        error returned to its caller alone. A write whose caller is cancelled before it
+        starts is skipped; once started it runs to completion.
+
+        Its write_admission slot is taken before queueing, so overload is shed there, and
+        held until the writer task is done with the write, even when the caller stops
+        waiting earlier: the writer never has more than the admitted writes to run.
+        """
+        if self._writer is None:
+            await self.open()
+        await self.write_admission.acquire()
+        started = time.perf_counter()
+
+        def release():
+            self.write_admission.release(time.perf_counter() - started)
+        future = asyncio.get_running_loop().create_future()
+        self._write_queue.put_nowait((operation, future, release))
+        return await future
+
+    async def _write_loop(self):
+        """Writer task: commit queued writes in batches until close() queues None."""
+        queue = self._write_queue
+        closing = False
+        while not closing:
+            batch = [await queue.get()]
+            if batch[0] is None:
+                return
+            if WRITE_BATCH_WINDOW_MS > 0:
+                await asyncio.sleep(WRITE_BATCH_WINDOW_MS / 1000)
+            while len(batch) < WRITE_BATCH_MAX_OPS and not queue.empty():
+                entry = queue.get_nowait()
+                if entry is None:
+                    closing = True
+                    break
+                batch.append(entry)
+            # Skip the writes whose callers were cancelled while they queued
+            for _, future, release in batch:
+                if future.done():
+                    release()
+            batch = [(operation, future, release) for operation, future, release in batch if not future.done()]
+            if not batch:
+                continue
+            metrics.WRITE_BATCH_SIZE.observe((), len(batch))
+            try:
+                await self._commit_batch([(operation, future) for operation, future, _ in batch])
+            except Exception as error:
+                # The batch was rolled back; keep the writer alive for the next one
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            finally:
+                for _, _, release in batch:
+                    release()
+
+    async def _commit_batch(self, batch):
+        savepoints = len(batch) > 1
+        outcomes = []
+        async with self._write_lock:
+            db = self._writer
+            try:
+                await db.execute("BEGIN IMMEDIATE")
+                for operation, future in batch:
+                    if savepoints:
+                        await db.execute("SAVEPOINT write_op")
+                    try:
+                        outcomes.append((future, await operation(db), None))
+                    except Exception as error:
+                        if not savepoints:
+                            raise
+                        await db.execute("ROLLBACK TO write_op")
+                        outcomes.append((future, None, error))
+                    if savepoints:
+                        await db.execute("RELEASE write_op")
+                await db.commit()
+            except BaseException as error:
+                await db.rollback()
+                for _, future in batch:
+                    if not future.done():
+                        if isinstance(error, Exception):
+                            future.set_exception(error)
+                        else:
+                            future.cancel()
+                if isinstance(error, Exception):
+                    return
+                raise
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    async def get_data_version(self) -> int:
+        """PRAGMA data_version of the writer connection.
+
+        It changes whenever another connection, e.g. in another worker process, commits,
+        and never for this Repo's own writes. Read between write batches, like every
+        other use of the writer connection.
+        """
+        if self._writer is None:
+            await self.open()
+        async with self._write_lock:
+            cursor = await self._writer.execute("PRAGMA data_version")
+            (version,) = await cursor.fetchone()
+        return version
+
+    async def init_db(self) -> int:
+        """Bring the schema up to date. Run once at startup, not per request."""
+        return await self._execute_write(migrate)
 
     async def insert(self, item: InventoryItem):
         """Insert a new inventory record."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def _insert(db):
             await db.execute(f"""
-                INSERT INTO {TABLE_NAME} 
-                (id, item_name, category, quantity, reorder_level, supplier, unit_price, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                INSERT INTO {TABLE_NAME}
+                ({WRITE_COLUMNS}, supplier_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, {SUPPLIER_ID_FOR_NAME})
             """, (
                 item.id,
                 item.item_name,
@@ -51,72 +281,271 @@ class Repo:
                 item.reorder_level,
                 item.supplier,
                 item.unit_price,
-                datetime.utcnow().isoformat()
+                datetime.utcnow().isoformat(),
+                item.supplier
             ))
-            await db.commit()
+        await self._execute_write(_insert)
+
+    async def upsert_many(self, items: List[InventoryItem]) -> List[str]:
+        """Insert or update many inventory records in one transaction.
+
+        Returns "inserted" or "updated" for each item, in order.
+        """
+        now = datetime.utcnow().isoformat()
+
+        async def _upsert_many(db):
+            placeholders = ", ".join("?" * len(items))
+            cursor = await db.execute(
+                f"SELECT id FROM {TABLE_NAME} WHERE id IN ({placeholders})", [item.id for item in items])
+            seen = {row[0] for row in await cursor.fetchall()}
+            statuses = []
+            for item in items:
+                statuses.append("updated" if item.id in seen else "inserted")
+                seen.add(item.id)
+            await db.executemany(f"""
+                INSERT INTO {TABLE_NAME} ({WRITE_COLUMNS}, supplier_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, {SUPPLIER_ID_FOR_NAME})
+                ON CONFLICT (id) DO UPDATE SET
+                    item_name = excluded.item_name, category = excluded.category,
+                    quantity = excluded.quantity, reorder_level = excluded.reorder_level,
+                    supplier = excluded.supplier, unit_price = excluded.unit_price,
+                    last_updated = excluded.last_updated, version = version + 1,
+                    supplier_id = excluded.supplier_id
+            """, [(item.id, item.item_name, item.category, item.quantity, item.reorder_level,
+                   item.supplier, item.unit_price, now, item.supplier) for item in items])
+            return statuses
+        if not items:
+            return []
+        return await self._execute_write(_upsert_many)
 
     async def get(self, item_id: str) -> Optional[InventoryItem]:
         """Get a single inventory item by ID."""
         query = f"""
-            SELECT id, item_name, category, quantity, reorder_level, supplier, unit_price, last_updated
+            SELECT {ITEM_COLUMNS}
             FROM {TABLE_NAME} WHERE id = ?
         """
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._reader() as db:
             cursor = await db.execute(query, (item_id,))
             row = await cursor.fetchone()
-            if row:
-                return InventoryItem(
-                    id=row[0],
-                    item_name=row[1],
-                    category=row[2],
-                    quantity=row[3],
-                    reorder_level=row[4],
-                    supplier=row[5],
-                    unit_price=row[6],
-                    last_updated=datetime.fromisoformat(
-                        row[7]) if row[7] else None
-                )
-            return None
+            return row_to_item(row) if row else None
+
+    async def _fetch_items(self, query: str, params=()) -> List[InventoryItem]:
+        async with self._reader() as db:
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+            return [row_to_item(row) for row in rows]
 
     async def list(self) -> List[InventoryItem]:
         """List all inventory items."""
-        async with aiosqlite.connect(self.db_path) as db:
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME}
+            ORDER BY last_updated DESC
+        """)
+
+    async def list_page(self, limit: int, after: Optional[Tuple[str, str]] = None,
+                        category: Optional[str] = None, supplier: Optional[str] = None,
+                        low_stock: bool = False) -> Tuple[List[InventoryItem], Optional[Tuple[str, str]]]:
+        """List one page of items, newest first, starting after the (last_updated, id) key.
+
+        Returns the items and the key to pass as after for the next page, None on the last page.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("(last_updated, id) < (?, ?)")
+            params.extend(after)
+        if category is not None:
+            conditions.append("category = ? COLLATE NOCASE")
+            params.append(category)
+        if supplier is not None:
+            conditions.append("supplier = ?")
+            params.append(supplier)
+        if low_stock:
+            conditions.append("quantity < reorder_level")
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        async with self._reader() as db:
             cursor = await db.execute(f"""
-                SELECT id, item_name, category, quantity, reorder_level, supplier, unit_price, last_updated
+                SELECT {ITEM_COLUMNS}
+                FROM {TABLE_NAME} {where}
+                ORDER BY last_updated DESC, id DESC
+                LIMIT ?
+            """, params)
+            rows = await cursor.fetchall()
+        next_key = (rows[-1][7], rows[-1][0]) if len(rows) == limit else None
+        return [row_to_item(row) for row in rows], next_key
+
+    async def list_by_category(self, category: str) -> List[InventoryItem]:
+        """List items of a category, matched case-insensitively."""
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME} WHERE category = ? COLLATE NOCASE
+            ORDER BY last_updated DESC
+        """, (category,))
+
+    async def list_below_reorder_level(self) -> List[InventoryItem]:
+        """List items whose quantity is below their reorder level."""
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME} WHERE id IN (SELECT item_id FROM ReorderQueue)
+        """)
+
+    async def list_reorder_queue(self) -> List[dict]:
+        """List the reorder queue grouped per supplier, for drafting purchase orders."""
+        async with self._reader() as db:
+            cursor = await db.execute(f"""
+                SELECT q.supplier, q.item_id, i.item_name, i.quantity, i.reorder_level, q.shortage,
+                       i.unit_price, q.queued_at
+                FROM ReorderQueue q JOIN {TABLE_NAME} i ON i.id = q.item_id
+                ORDER BY q.supplier, q.item_id
+            """)
+            rows = await cursor.fetchall()
+        groups = []
+        for row in rows:
+            if not groups or groups[-1]["supplier"] != row[0]:
+                groups.append({"supplier": row[0], "items": [], "total_shortage": 0, "estimated_cost": 0.0})
+            group = groups[-1]
+            group["items"].append({"item_id": row[1], "item_name": row[2], "quantity": row[3],
+                                   "reorder_level": row[4], "shortage": row[5], "queued_at": row[7]})
+            group["total_shortage"] += row[5]
+            group["estimated_cost"] += row[5] * row[6]
+        return groups
+
+    async def list_plan_rows(self) -> Tuple[int, List[tuple]]:
+        """Get the last change log seq, then (id, item_name, quantity, reorder_level, unit_price,
+        supplier, category) of every item, for the reorder planner's columnar snapshot.
+
+        Rows may already include changes after the returned seq; replaying those is harmless
+        because change log entries carry the whole item.
+        """
+        async with self._reader() as db:
+            cursor = await db.execute(
+                "SELECT ifnull((SELECT seq FROM sqlite_sequence WHERE name = 'InventoryChanges'), 0)")
+            (last_seq,) = await cursor.fetchone()
+            cursor = await db.execute(f"""
+                SELECT id, item_name, quantity, ifnull(reorder_level, 0), unit_price, supplier, category
                 FROM {TABLE_NAME}
-                ORDER BY last_updated DESC
             """)
             rows = await cursor.fetchall()
-            return [
-                InventoryItem(
-                    id=row[0],
-                    item_name=row[1],
-                    category=row[2],
-                    quantity=row[3],
-                    reorder_level=row[4],
-                    supplier=row[5],
-                    unit_price=row[6],
-                    last_updated=datetime.fromisoformat(
-                        row[7]) if row[7] else None
-                )
-                for row in rows
-            ]
+        return last_seq, rows
+
+    async def list_not_updated_since(self, cutoff: datetime) -> List[InventoryItem]:
+        """List items last updated before cutoff, or never."""
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME} WHERE last_updated < ? OR last_updated IS NULL
+        """, (cutoff.isoformat(),))
+
+    async def get_last_updated(self) -> Optional[InventoryItem]:
+        """Get the most recently updated item."""
+        items = await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME} WHERE last_updated > ''
+            ORDER BY last_updated DESC LIMIT 1
+        """)
+        return items[0] if items else None
+
+    async def list_by_names(self, item_names: List[str]) -> List[InventoryItem]:
+        """List items whose name exactly matches one of item_names, case-insensitively."""
+        if not item_names:
+            return []
+        placeholders = ", ".join("?" * len(item_names))
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS}
+            FROM {TABLE_NAME} WHERE item_name COLLATE NOCASE IN ({placeholders})
+        """, item_names)
+
+    async def search_names(self, query: str, limit: int = NAME_SEARCH_LIMIT) -> List[Tuple[InventoryItem, float]]:
+        """Rank items by name similarity to query, best first, with their scores."""
+        terms = name_search.trigrams(query)
+        candidates = {}
+        async with self._reader() as db:
+            async def collect(sql, params):
+                cursor = await db.execute(sql, params)
+                for row in await cursor.fetchall():
+                    candidates.setdefault(row[0], row)
+
+            await collect(f"""
+                SELECT {ITEM_COLUMNS}
+                FROM {TABLE_NAME} WHERE item_name = ? COLLATE NOCASE
+            """, (query.strip(),))
+            if not terms:
+                # Too short for a trigram: fall back to an indexed prefix match
+                pattern = query.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                await collect(f"""
+                    SELECT {ITEM_COLUMNS}
+                    FROM {TABLE_NAME} WHERE item_name LIKE ? ESCAPE '\\'
+                    LIMIT ?
+                """, (pattern, NAME_SEARCH_CANDIDATES))
+            else:
+                match_sql = f"""
+                    SELECT {ITEM_COLUMNS}
+                    FROM (
+                        SELECT rowid FROM InventoryNameIndex
+                        WHERE InventoryNameIndex MATCH ? {{order}} LIMIT ?
+                    ) AS matches
+                    JOIN {TABLE_NAME} ON {TABLE_NAME}.rowid = matches.rowid
+                """
+                await collect(match_sql.format(order=""),
+                              (name_search.phrase_expression(query), NAME_SEARCH_CANDIDATES))
+                if not candidates:
+                    # Fuzzy fallback on the rarest trigrams present in the index, capped so
+                    # FTS5 only ranks a bounded number of postings
+                    placeholders = ", ".join("?" * len(terms))
+                    cursor = await db.execute(f"""
+                        SELECT term, doc FROM InventoryNameVocab WHERE term IN ({placeholders})
+                        ORDER BY doc LIMIT ?
+                    """, (*terms, NAME_SEARCH_TRIGRAMS))
+                    rare_terms, postings = [], 0
+                    for term, doc in await cursor.fetchall():
+                        if len(rare_terms) >= 2 and postings + doc > NAME_SEARCH_MAX_POSTINGS:
+                            break
+                        rare_terms.append(term)
+                        postings += doc
+                    if rare_terms:
+                        await collect(match_sql.format(order="ORDER BY rank"),
+                                      (name_search.any_expression(rare_terms), NAME_SEARCH_CANDIDATES))
+        ranked = sorted(((item, name_search.score(query, item.item_name))
+                         for item in map(row_to_item, candidates.values())),
+                        key=lambda match: match[1], reverse=True)
+        return ranked[:limit]
+
+    async def rebuild_name_index(self):
+        """Recreate the name search index from the inventory table."""
+        async def _rebuild(db):
+            for statement in name_search.NAME_INDEX_REBUILD:
+                await db.execute(statement)
+        await self._execute_write(_rebuild)
 
     async def delete(self, item_id: str) -> int:
         """Delete an inventory item by ID."""
-        async with aiosqlite.connect(self.db_path) as db:
+        async def _delete(db):
             cursor = await db.execute(f"DELETE FROM {TABLE_NAME} WHERE id = ?", (item_id,))
-            await db.commit()
             return cursor.rowcount
+        return await self._execute_write(_delete)
 
-    async def update(self, item: InventoryItem) -> bool:
-        """Update an existing inventory item."""
-        async with aiosqlite.connect(self.db_path) as db:
+    async def delete_many(self, item_ids: List[str]) -> List[str]:
+        """Delete inventory items by ID in one transaction. Returns the IDs that existed."""
+        async def _delete_many(db):
+            placeholders = ", ".join("?" * len(item_ids))
+            cursor = await db.execute(
+                f"DELETE FROM {TABLE_NAME} WHERE id IN ({placeholders}) RETURNING id", item_ids)
+            return [row[0] for row in await cursor.fetchall()]
+        if not item_ids:
+            return []
+        return await self._execute_write(_delete_many)
+
+    async def update(self, item: InventoryItem) -> Optional[InventoryItem]:
+        """Update an existing inventory item. Returns the stored item, with its new version,
+        last_updated and supplier_id, or None when there is no such item."""
+        async def _update(db):
             cursor = await db.execute(f"""
                 UPDATE {TABLE_NAME}
-                SET item_name = ?, category = ?, quantity = ?, reorder_level = ?, 
-                    supplier = ?, unit_price = ?, last_updated = ?
+                SET item_name = ?, category = ?, quantity = ?, reorder_level = ?,
+                    supplier = ?, unit_price = ?, last_updated = ?, version = version + 1,
+                    supplier_id = {SUPPLIER_ID_FOR_NAME}
                 WHERE id = ?
+                RETURNING {ITEM_COLUMNS}
             """, (
                 item.item_name,
                 item.category,
@@ -125,26 +554,375 @@ class Repo:
                 item.supplier,
                 item.unit_price,
                 datetime.utcnow().isoformat(),
+                item.supplier,
                 item.id
             ))
-            await db.commit()
-            return cursor.rowcount > 0
-
-    async def insert_supplier(self, supplier):
-        """Insert a new supplier record."""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                INSERT INTO Suppliers (id, name, contact_person, phone_number, category, address)
-                VALUES (?, ?, ?, ?, ?, ?)
-            """, (supplier.id, supplier.name, supplier.contact_person, supplier.phone_number, supplier.category, supplier.address))
-            await db.commit()
-
-    async def list_suppliers(self):
+            return await cursor.fetchone()
+        row = await self._execute_write(_update)
+        return row_to_item(row) if row is not None else None
+
+    async def _fetch_one(self, query: str, params=()):
+        async with self._reader() as db:
+            cursor = await db.execute(query, params)
+            return await cursor.fetchone()
+
+    async def get_totals(self) -> dict:
+        """Get the item count and total stock value."""
+        row = await self._fetch_one("SELECT item_count, stock_value FROM InventoryTotals WHERE id = 1")
+        return {"item_count": row[0], "stock_value": row[1]} if row else {"item_count": 0, "stock_value": 0.0}
+
+    async def get_top_supplier(self) -> Optional[dict]:
+        """Get the supplier providing the most items."""
+        row = await self._fetch_one("SELECT supplier, item_count FROM SupplierStats ORDER BY item_count DESC LIMIT 1")
+        return {"supplier": row[0], "item_count": row[1]} if row else None
+
+    async def get_category_highest_avg_price(self) -> Optional[dict]:
+        """Get the category with the highest average unit price."""
+        row = await self._fetch_one("""
+            SELECT category, price_sum / item_count FROM CategoryStats
+            ORDER BY price_sum / item_count DESC LIMIT 1
+        """)
+        return {"category": row[0], "avg_price": row[1]} if row else None
+
+    async def get_supplier_lowest_reorder_ratio(self) -> Optional[dict]:
+        """Get the supplier whose in-stock items have the lowest average quantity / reorder level.
+
+        avg_ratio is None when the ratio is infinite (an item without a reorder level).
+        """
+        row = await self._fetch_one("""
+            SELECT supplier, CASE WHEN ratio_inf_count > 0 THEN NULL ELSE ratio_sum / ratio_count END
+            FROM SupplierStats WHERE ratio_count + ratio_inf_count > 0
+            ORDER BY ratio_inf_count > 0, ratio_sum / ratio_count LIMIT 1
+        """)
+        return {"supplier": row[0], "avg_ratio": row[1]} if row else None
+
+    async def get_supplier_highest_category_cost(self) -> Optional[dict]:
+        """Get the supplier and category pair with the highest average unit price."""
+        row = await self._fetch_one("""
+            SELECT supplier, category, price_sum / item_count FROM SupplierCategoryStats
+            ORDER BY price_sum / item_count DESC LIMIT 1
+        """)
+        return {"supplier": row[0], "category": row[1], "avg_cost": row[2]} if row else None
+
+    async def check_aggregates(self, rebuild: bool = False) -> List[dict]:
+        """Report drift between the summary tables and the inventory, optionally rebuilding them."""
+        if rebuild:
+            return await self._execute_write(aggregates.rebuild)
+        async with self._reader() as db:
+            return await aggregates.check(db)
+
+    async def adjust_quantities(self, adjustments: List[QuantityAdjustment], all_or_nothing: bool = True) -> List[dict]:
+        """Apply signed quantity deltas in one transaction, without reading the items first.
+
+        Each adjustment is a single UPDATE ... RETURNING, so concurrent movements never
+        lose updates. If any adjustment is refused, none are applied and AdjustmentError
+        is raised. With all_or_nothing=False the others are still applied and a refused
+        adjustment's result is {"id": ..., "error": reason} instead.
+        """
+        now = datetime.utcnow().isoformat()
+
+        async def _adjust(db):
+            return [await self._adjust_one(db, adjustment, now, all_or_nothing) for adjustment in adjustments]
+        return await self._execute_write(_adjust)
+
+    async def create_and_adjust(self, items: List[InventoryItem],
+                                adjustments: List[QuantityAdjustment]) -> Tuple[List[dict], List[dict]]:
+        """Create items and apply quantity deltas in one transaction.
+
+        An item is created only if no item has its name, case-insensitively, when the
+        transaction runs; its result is then {"id": ..., "quantity": ...}, otherwise
+        {"id": ..., "error": "name_taken"}. Adjustments are applied as by
+        adjust_quantities with all_or_nothing=False. Returns both result lists, in order.
+        """
+        now = datetime.utcnow().isoformat()
+
+        async def _create_and_adjust(db):
+            created = []
+            for item in items:
+                cursor = await db.execute(f"""
+                    INSERT INTO {TABLE_NAME} ({WRITE_COLUMNS}, supplier_id)
+                    SELECT ?, ?, ?, ?, ?, ?, ?, ?, {SUPPLIER_ID_FOR_NAME}
+                    WHERE NOT EXISTS (SELECT 1 FROM {TABLE_NAME} WHERE item_name = ? COLLATE NOCASE)
+                    RETURNING id, quantity
+                """, (item.id, item.item_name, item.category, item.quantity, item.reorder_level,
+                      item.supplier, item.unit_price, now, item.supplier, item.item_name))
+                row = await cursor.fetchone()
+                created.append({"id": row[0], "quantity": row[1]} if row else {"id": item.id, "error": "name_taken"})
+            adjusted = [await self._adjust_one(db, adjustment, now, False) for adjustment in adjustments]
+            return created, adjusted
+        if not items and not adjustments:
+            return [], []
+        return await self._execute_write(_create_and_adjust)
+
+    async def _adjust_one(self, db, adjustment: QuantityAdjustment, now: str, all_or_nothing: bool) -> dict:
+        cursor = await db.execute(f"""
+            UPDATE {TABLE_NAME}
+            SET quantity = quantity + ?, version = version + 1, last_updated = ?
+            WHERE id = ?
+              AND (? IS NULL OR version = ?)
+              AND (NOT ? OR quantity + ? >= 0)
+            RETURNING id, quantity, version
+        """, (adjustment.delta, now, adjustment.item_id,
+              adjustment.expected_version, adjustment.expected_version,
+              adjustment.non_negative, adjustment.delta))
+        row = await cursor.fetchone()
+        if row is not None:
+            return {"id": row[0], "quantity": row[1], "version": row[2]}
+        cursor = await db.execute(f"SELECT version FROM {TABLE_NAME} WHERE id = ?", (adjustment.item_id,))
+        current = await cursor.fetchone()
+        if current is None:
+            reason = "not_found"
+        elif adjustment.expected_version is not None and current[0] != adjustment.expected_version:
+            reason = "version_conflict"
+        else:
+            reason = "insufficient_stock"
+        if all_or_nothing:
+            raise AdjustmentError(adjustment.item_id, reason)
+        # The guarded UPDATE changed nothing, so there is nothing to roll back
+        return {"id": adjustment.item_id, "error": reason}
+
+    async def list_changes(self, since: int, limit: int) -> List[dict]:
+        """Get up to limit change log entries with seq greater than since, oldest first."""
+        async with self._reader() as db:
+            cursor = await db.execute("""
+                SELECT seq, op, item_id, changed_at, item FROM InventoryChanges
+                WHERE seq > ? ORDER BY seq LIMIT ?
+            """, (since, limit))
+            rows = await cursor.fetchall()
+        return [{"seq": row[0], "op": row[1], "item_id": row[2], "changed_at": row[3],
+                 "item": orjson.loads(row[4]) if row[4] else None} for row in rows]
+
+    async def get_change_bounds(self) -> Tuple[int, int]:
+        """Get (first retained seq, last seq) of the change log, (last + 1, last) when it is empty."""
+        row = await self._fetch_one("""
+            SELECT (SELECT min(seq) FROM InventoryChanges),
+                   ifnull((SELECT seq FROM sqlite_sequence WHERE name = 'InventoryChanges'), 0)
+        """)
+        last_seq = row[1]
+        return (row[0] if row[0] is not None else last_seq + 1), last_seq
+
+    async def prune_changes(self, keep: int) -> int:
+        """Delete all but the newest keep change log entries. Returns the number deleted."""
+        async def _prune(db):
+            cursor = await db.execute("""
+                DELETE FROM InventoryChanges
+                WHERE seq <= (SELECT seq FROM sqlite_sequence WHERE name = 'InventoryChanges') - ?
+            """, (keep,))
+            return cursor.rowcount
+        return await self._execute_write(_prune)
+
+    async def claim_reorder_events(self, limit: int, lease_seconds: float) -> List[dict]:
+        """Claim the oldest limit undelivered reorder events for lease_seconds.
+
+        Nothing is claimed while any of them is under another live claim, so events are
+        delivered in order by one claimant at a time. Events claimed but not marked
+        delivered before the lease ends are claimed again.
+        """
+        now = datetime.utcnow()
+
+        async def _claim(db):
+            cursor = await db.execute("""
+                WITH head AS (
+                    SELECT seq, claimed_until FROM ReorderEvents
+                    WHERE delivered_at IS NULL ORDER BY seq LIMIT ?)
+                UPDATE ReorderEvents SET claimed_until = ?
+                WHERE seq IN (SELECT seq FROM head)
+                  AND NOT EXISTS (SELECT 1 FROM head WHERE claimed_until >= ?)
+                RETURNING seq, event, item_id, supplier, shortage, created_at
+            """, (limit, (now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat()))
+            return await cursor.fetchall()
+        rows = sorted(await self._execute_write(_claim))
+        return [{"seq": row[0], "event": row[1], "item_id": row[2], "supplier": row[3],
+                 "shortage": row[4], "created_at": row[5]} for row in rows]
+
+    async def mark_reorder_events_delivered(self, seqs: List[int]):
+        """Mark claimed reorder events as delivered."""
+        async def _mark(db):
+            placeholders = ", ".join("?" * len(seqs))
+            await db.execute(f"UPDATE ReorderEvents SET delivered_at = ? WHERE seq IN ({placeholders})",
+                             [datetime.utcnow().isoformat(), *seqs])
+        if seqs:
+            await self._execute_write(_mark)
+
+    async def prune_reorder_events(self, delivered_before: datetime) -> int:
+        """Delete reorder events delivered before the cutoff. Returns the number deleted."""
+        async def _prune(db):
+            cursor = await db.execute("DELETE FROM ReorderEvents WHERE delivered_at < ?",
+                                      (delivered_before.isoformat(),))
+            return cursor.rowcount
+        return await self._execute_write(_prune)
+
+    async def get_stock_at(self, item_id: str, at: datetime) -> Optional[int]:
+        """Get the quantity of an item at time at, 0 once deleted.
+
+        Read from the item's last movement by then, or from its latest snapshot when those
+        movements were pruned. None when no stock of the item is recorded by then.
+        """
+        at_ms = epoch_ms(at)
+        row = await self._fetch_one("""
+            SELECT coalesce(
+                (SELECT quantity FROM StockMovements WHERE item_id = ? AND at <= ?
+                 ORDER BY at DESC, seq DESC LIMIT 1),
+                (SELECT quantity FROM StockSnapshots WHERE item_id = ? AND at <= ?
+                 ORDER BY at DESC LIMIT 1))
+        """, (item_id, at_ms, item_id, at_ms))
+        return row[0]
+
+    async def list_stock_movements(self, since: datetime, item_id: Optional[str] = None) -> List[dict]:
+        """Sum up stock movements after since per item, or for item_id only.
+
+        Each entry has the units moved in and out, the net change, the number of movements
+        and the time of the last one. Movements already pruned are not counted.
+        """
+        params = [epoch_ms(since)]
+        item_filter = ""
+        if item_id is not None:
+            item_filter = "AND item_id = ?"
+            params.append(item_id)
+        async with self._reader() as db:
+            cursor = await db.execute(f"""
+                SELECT item_id, sum(max(delta, 0)), sum(max(-delta, 0)), sum(delta), count(*), max(at)
+                FROM StockMovements WHERE at > ? {item_filter}
+                GROUP BY item_id ORDER BY item_id
+            """, params)
+            rows = await cursor.fetchall()
+        return [{"item_id": row[0], "moved_in": row[1], "moved_out": row[2], "net": row[3],
+                 "movements": row[4], "last_moved_at": from_epoch_ms(row[5])} for row in rows]
+
+    async def list_idle_since(self, cutoff: datetime) -> List[InventoryItem]:
+        """List items whose stock has not moved after cutoff.
+
+        Snapshots keep the time of each item's last movement, so this stays exact after pruning.
+        """
+        cutoff_ms = epoch_ms(cutoff)
+        return await self._fetch_items(f"""
+            SELECT {ITEM_COLUMNS} FROM {TABLE_NAME} i
+            WHERE NOT EXISTS (SELECT 1 FROM StockMovements m WHERE m.item_id = i.id AND m.at > ?)
+              AND NOT EXISTS (SELECT 1 FROM StockSnapshots s WHERE s.item_id = i.id AND s.last_moved_at > ?)
+        """, (cutoff_ms, cutoff_ms))
+
+    async def compact_stock_ledger(self) -> int:
+        """Snapshot every item moved since the previous compaction. Returns the number of snapshots written."""
+        now_ms = epoch_ms(datetime.utcnow())
+
+        async def _compact(db):
+            cursor = await db.execute("SELECT ifnull(max(last_seq), 0) FROM StockCompactions")
+            (previous,) = await cursor.fetchone()
+            cursor = await db.execute("SELECT max(seq), max(at) FROM StockMovements WHERE seq > ?", (previous,))
+            last_seq, last_at = await cursor.fetchone()
+            if last_seq is None:
+                return 0
+            # The cut must not precede any movement it covers, even with a clock step back
+            cut = max(now_ms, last_at)
+            cursor = await db.execute("""
+                INSERT OR REPLACE INTO StockSnapshots (item_id, at, quantity, last_moved_at)
+                SELECT item_id, ?, quantity, at FROM StockMovements
+                WHERE seq IN (SELECT max(seq) FROM StockMovements WHERE seq > ? AND seq <= ? GROUP BY item_id)
+            """, (cut, previous, last_seq))
+            await db.execute("INSERT OR REPLACE INTO StockCompactions (at, last_seq) VALUES (?, ?)", (cut, last_seq))
+            return cursor.rowcount
+        return await self._execute_write(_compact)
+
+    async def prune_stock_ledger(self, movements_before: datetime, snapshots_before: datetime) -> Tuple[int, int]:
+        """Delete compacted movements older than movements_before, and snapshots older than
+        snapshots_before except each item's latest. Returns the numbers of movements and
+        snapshots deleted.
+        """
+        async def _prune(db):
+            movements = await db.execute("""
+                DELETE FROM StockMovements
+                WHERE at < ? AND seq <= (SELECT ifnull(max(last_seq), 0) FROM StockCompactions)
+            """, (epoch_ms(movements_before),))
+            snapshots = await db.execute("""
+                DELETE FROM StockSnapshots
+                WHERE at < ? AND at < (SELECT max(at) FROM StockSnapshots latest
+                                       WHERE latest.item_id = StockSnapshots.item_id)
+            """, (epoch_ms(snapshots_before),))
+            await db.execute("DELETE FROM StockCompactions WHERE at < (SELECT max(at) FROM StockCompactions)")
+            return movements.rowcount, snapshots.rowcount
+        return await self._execute_write(_prune)
+
+    async def insert_supplier(self, supplier: Supplier):
+        """Insert a new supplier record and link the items naming it."""
+        await self.upsert_suppliers([supplier])
+
+    async def upsert_suppliers(self, suppliers: List[Supplier]) -> List[str]:
+        """Insert or update many supplier records in one transaction.
+
+        Items whose supplier name matches an upserted supplier are linked to it, and items
+        linked to a renamed supplier under its old name are relinked by that name. Returns
+        "inserted" or "updated" for each supplier, in order.
+        """
+        async def _upsert_suppliers(db):
+            placeholders = ", ".join("?" * len(suppliers))
+            cursor = await db.execute(
+                f"SELECT id FROM Suppliers WHERE id IN ({placeholders})", [supplier.id for supplier in suppliers])
+            seen = {row[0] for row in await cursor.fetchall()}
+            statuses = []
+            for supplier in suppliers:
+                statuses.append("updated" if supplier.id in seen else "inserted")
+                seen.add(supplier.id)
+            await db.executemany(f"""
+                INSERT INTO Suppliers ({SUPPLIER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    name = excluded.name, contact_person = excluded.contact_person,
+                    phone_number = excluded.phone_number, category = excluded.category,
+                    address = excluded.address
+            """, [(supplier.id, supplier.name, supplier.contact_person, supplier.phone_number,
+                   supplier.category, supplier.address) for supplier in suppliers])
+            # A renamed supplier lets go of the items still naming it by its old name, which
+            # fall back to another supplier of that name, if any
+            await db.executemany(f"""
+                UPDATE {TABLE_NAME} SET supplier_id = (SELECT min(id) FROM Suppliers s WHERE s.name = {TABLE_NAME}.supplier)
+                WHERE supplier_id = ? AND supplier IS NOT (SELECT name FROM Suppliers WHERE id = ?)
+            """, [(supplier_id, supplier_id) for supplier_id in {supplier.id for supplier in suppliers}])
+            await db.executemany(f"""
+                UPDATE {TABLE_NAME} SET supplier_id = {SUPPLIER_ID_FOR_NAME}
+                WHERE supplier = ? AND supplier_id IS NOT {SUPPLIER_ID_FOR_NAME}
+            """, [(name, name, name) for name in {supplier.name for supplier in suppliers}])
+            return statuses
+        if not suppliers:
+            return []
+        return await self._execute_write(_upsert_suppliers)
+
+    async def get_supplier(self, supplier_id: str) -> Optional[Supplier]:
+        """Get a supplier by ID."""
+        row = await self._fetch_one(f"SELECT {SUPPLIER_COLUMNS} FROM Suppliers WHERE id = ?", (supplier_id,))
+        return row_to_supplier(row) if row else None
+
+    async def list_suppliers(self) -> List[Supplier]:
         """List all suppliers."""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT id, name, contact_person, phone_number, category, address FROM Suppliers")
+        async with self._reader() as db:
+            cursor = await db.execute(f"SELECT {SUPPLIER_COLUMNS} FROM Suppliers")
+            return [row_to_supplier(row) for row in await cursor.fetchall()]
+
+    async def list_supplier_summaries(self, limit: int, after: Optional[str] = None,
+                                      supplier_id: Optional[str] = None) -> Tuple[List[SupplierSummary], Optional[str]]:
+        """List one page of suppliers by ID, starting after the after ID, with their item
+        count, stock value and low-stock count, in one query joining the inventory on
+        supplier_id. With supplier_id, only that supplier.
+
+        Returns the suppliers and the ID to pass as after for the next page, None on the last page.
+        """
+        conditions, params = [], []
+        if after is not None:
+            conditions.append("s.id > ?")
+            params.append(after)
+        if supplier_id is not None:
+            conditions.append("s.id = ?")
+            params.append(supplier_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params.append(limit)
+        async with self._reader() as db:
+            cursor = await db.execute(f"""
+                SELECT s.id, s.name, s.contact_person, s.phone_number, s.category, s.address,
+                       count(i.supplier_id), ifnull(sum(i.quantity * i.unit_price), 0),
+                       ifnull(sum(i.quantity < ifnull(i.reorder_level, 0)), 0)
+                FROM Suppliers s LEFT JOIN {TABLE_NAME} i ON i.supplier_id = s.id
+                {where}
+                GROUP BY s.id ORDER BY s.id
+                LIMIT ?
+            """, params)
             rows = await cursor.fetchall()
-            return [{
-                "id": row[0], "name": row[1], "contact_person": row[2],
-                "phone_number": row[3], "category": row[4], "address": row[5]
-            } for row in rows]
+        next_key = rows[-1][0] if len(rows) == limit else None
+        return [row_to_supplier_summary(row) for row in rows], next_key
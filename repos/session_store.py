@@ -0,0 +1,231 @@
+"""ADK session store on a local SQLite database (SESSION_DB_NAME).
+
+Extends ADK's SqliteSessionService, which keeps sessions, events and app/user
+state as JSON in SQLite but opens a connection per call, lists every session
+of a user and never forgets one:
+
+- Calls borrow from a pool of open connections (WAL, busy timeout). Writes are
+  serialized in this process and take the write lock up front with BEGIN
+  IMMEDIATE, so worker processes sharing the file queue on the busy timeout
+  instead of failing on a stale read snapshot.
+- Sessions are indexed by (app, user, last activity) and by last activity, and
+  events by (session, timestamp), so listing a user's sessions, loading the
+  latest events of a session and eviction are index range reads.
+- list_sessions returns all of a user's sessions, read SESSION_LIST_PAGE_SIZE at
+  a time; list_sessions_page returns one page of them with a keyset cursor.
+- evict() deletes sessions idle for longer than the TTL, with their events, and
+  trims the events of recently active sessions beyond max_events, cutting only
+  at the start of an invocation so a model call never loses its context.
+"""
+import asyncio
+import contextvars
+from contextlib import asynccontextmanager
+from importlib.metadata import version
+from typing import List, Optional, Tuple
+import aiosqlite
+from google.adk.platform import time as platform_time
+from google.adk.sessions.base_session_service import ListSessionsResponse
+from google.adk.sessions.session import Session
+from constants import DB_PRAGMAS, SESSION_POOL_SIZE, SESSION_LIST_PAGE_SIZE
+
+# This store builds on private parts of ADK's SqliteSessionService, so google-adk is
+# pinned in requirements.txt to the release they were checked against. Another
+# release missing any of them fails here, at startup, instead of mid-request.
+_ADK_UPGRADE_HINT = "install the google-adk version pinned in requirements.txt"
+try:
+    from google.adk.sessions.sqlite_session_service import (CREATE_SCHEMA_SQL, SqliteSessionService,
+                                                            _decode_state, _merge_state)
+except ImportError as error:
+    raise ImportError(f"google-adk {version('google-adk')} lacks the SqliteSessionService internals "
+                      f"SessionStore builds on; {_ADK_UPGRADE_HINT}") from error
+ADK_INTERNALS = ("_db_path", "_db_connect_path", "_db_connect_uri", "_get_db_connection", "_get_app_state")
+
+SESSION_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_sessions_user_activity ON sessions(app_name, user_id, update_time, id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_activity ON sessions(update_time)",
+    "CREATE INDEX IF NOT EXISTS idx_events_session_time ON events(app_name, user_id, session_id, timestamp)",
+]
+
+# Events are stamped when produced, possibly a while before they are appended, so each
+# evict() also re-checks the sessions last updated this long before the previous one
+TRIM_OVERLAP_SECONDS = 300.0
+
+# Set while a create/append/delete runs, so its connection opens a write transaction
+_writing = contextvars.ContextVar("session_store_writing", default=False)
+
+
+class SessionStore(SqliteSessionService):
+    def __init__(self, db_path: str, pool_size: int = SESSION_POOL_SIZE):
+        super().__init__(db_path)
+        missing = [name for name in ADK_INTERNALS if not hasattr(self, name)]
+        if missing:
+            raise RuntimeError(f"google-adk {version('google-adk')} lacks the SqliteSessionService internals "
+                               f"{', '.join(missing)}; {_ADK_UPGRADE_HINT}")
+        # Every connection to an in-memory database would see its own empty database
+        self.pool_size = 1 if self._db_path in ("", ":memory:") else pool_size
+        self._conns: List[aiosqlite.Connection] = []
+        self._pool: Optional[asyncio.Queue] = None
+        self._open_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        # Sessions updated at or after this time are checked for excess events by the next evict()
+        self._trimmed_until = 0.0
+
+    async def open(self):
+        """Open the connection pool and create the schema. Idempotent."""
+        async with self._open_lock:
+            if self._pool is not None:
+                return
+            pool = asyncio.Queue()
+            for _ in range(self.pool_size):
+                db = await self._connect()
+                self._conns.append(db)
+                pool.put_nowait(db)
+            db = self._conns[0]
+            await db.executescript(CREATE_SCHEMA_SQL)
+            for statement in SESSION_INDEXES:
+                await db.execute(statement)
+            await db.commit()
+            self._pool = pool
+
+    async def close(self):
+        """Close every pooled connection."""
+        async with self._open_lock:
+            for db in self._conns:
+                await db.close()
+            self._conns = []
+            self._pool = None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self._db_connect_path, uri=self._db_connect_uri)
+        db.row_factory = aiosqlite.Row
+        for pragma, value in DB_PRAGMAS.items():
+            await db.execute(f"PRAGMA {pragma} = {value}")
+        await db.execute("PRAGMA foreign_keys = ON")
+        return db
+
+    @asynccontextmanager
+    async def _get_db_connection(self):
+        """Borrow a pooled connection; inside _writer(), in a write transaction.
+
+        Whatever a call leaves uncommitted, e.g. on AlreadyExistsError, is rolled back
+        before the connection goes back to the pool.
+        """
+        if self._pool is None:
+            await self.open()
+        db = await self._pool.get()
+        try:
+            if _writing.get():
+                await db.execute("BEGIN IMMEDIATE")
+            yield db
+        finally:
+            try:
+                if db.in_transaction:
+                    await db.rollback()
+            finally:
+                self._pool.put_nowait(db)
+
+    @asynccontextmanager
+    async def _writer(self):
+        async with self._write_lock:
+            token = _writing.set(True)
+            try:
+                yield
+            finally:
+                _writing.reset(token)
+
+    async def create_session(self, **kwargs) -> Session:
+        async with self._writer():
+            return await super().create_session(**kwargs)
+
+    async def append_event(self, session, event):
+        if event.partial:
+            return event
+        async with self._writer():
+            return await super().append_event(session, event)
+
+    async def delete_session(self, **kwargs) -> None:
+        async with self._writer():
+            await super().delete_session(**kwargs)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        """All sessions, without events, oldest first.
+
+        ADK's session list has no cursor, so nothing may be left out; the sessions are
+        read in keyset pages of SESSION_LIST_PAGE_SIZE to keep each query short.
+        """
+        sessions, before = [], None
+        while True:
+            page, before = await self.list_sessions_page(app_name, user_id, SESSION_LIST_PAGE_SIZE, before)
+            sessions.extend(page)
+            if before is None:
+                return ListSessionsResponse(sessions=sessions[::-1])
+
+    async def list_sessions_page(self, app_name: str, user_id: Optional[str], limit: int,
+                                 before: Optional[Tuple[float, str]] = None
+                                 ) -> Tuple[List[Session], Optional[Tuple[float, str]]]:
+        """List one page of sessions without events, most recently active first, starting
+        before the (last update time, session ID) key before; all users' with user_id None.
+
+        Returns the sessions and the key to pass as before for the next page, None on the last page.
+        """
+        conditions, params = ["app_name = ?"], [app_name]
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if before is not None:
+            conditions.append("(update_time, id) < (?, ?)")
+            params.extend(before)
+        params.append(limit)
+        async with self._get_db_connection() as db:
+            rows = await db.execute_fetchall(f"""
+                SELECT id, user_id, state, update_time FROM sessions
+                WHERE {' AND '.join(conditions)}
+                ORDER BY update_time DESC, id DESC
+                LIMIT ?
+            """, params)
+            app_state = await self._get_app_state(db, app_name)
+            user_ids = sorted({row["user_id"] for row in rows})
+            user_states = {}
+            if user_ids:
+                states = await db.execute_fetchall(
+                    f"SELECT user_id, state FROM user_states WHERE app_name = ? "
+                    f"AND user_id IN ({', '.join('?' * len(user_ids))})", [app_name, *user_ids])
+                user_states = {row["user_id"]: _decode_state(row["state"], context="user state") for row in states}
+        sessions = [
+            Session(app_name=app_name, user_id=row["user_id"], id=row["id"], events=[],
+                    state=_merge_state(app_state, user_states.get(row["user_id"], {}),
+                                       _decode_state(row["state"], context="session state")),
+                    last_update_time=row["update_time"])
+            for row in rows]
+        next_key = (rows[-1]["update_time"], rows[-1]["id"]) if len(rows) == limit else None
+        return sessions, next_key
+
+    async def evict(self, ttl_seconds: float, max_events: int) -> Tuple[int, int]:
+        """Delete the sessions idle for more than ttl_seconds, with their events, and trim
+        the sessions active since the last call to about their max_events newest events.
+
+        A session is cut at the first event of the invocation its max_events-th newest
+        event belongs to, so it may keep a few more. Returns the number of sessions and
+        of trimmed events deleted.
+        """
+        now = platform_time.get_time()
+        async with self._writer(), self._get_db_connection() as db:
+            cursor = await db.execute("DELETE FROM sessions WHERE update_time < ?", (now - ttl_seconds,))
+            sessions = cursor.rowcount
+            active = await db.execute_fetchall(
+                "SELECT app_name, user_id, id FROM sessions WHERE update_time >= ?", (self._trimmed_until,))
+            events = 0
+            for app_name, user_id, session_id in active:
+                cursor = await db.execute("""
+                    DELETE FROM events
+                    WHERE app_name = ?1 AND user_id = ?2 AND session_id = ?3 AND timestamp < (
+                        SELECT min(timestamp) FROM events
+                        WHERE app_name = ?1 AND user_id = ?2 AND session_id = ?3 AND invocation_id = (
+                            SELECT invocation_id FROM events
+                            WHERE app_name = ?1 AND user_id = ?2 AND session_id = ?3
+                            ORDER BY timestamp DESC, rowid DESC LIMIT 1 OFFSET ?4))
+                """, (app_name, user_id, session_id, max_events - 1))
+                events += cursor.rowcount
+            await db.commit()
+        self._trimmed_until = now - TRIM_OVERLAP_SECONDS
+        return sessions, events
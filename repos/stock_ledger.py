@@ -0,0 +1,99 @@
+"""Append-only stock movement ledger with snapshot compaction (see migration 11).
+
+Triggers append one StockMovements row per quantity change on the inventory
+table, in the same transaction: the signed delta, the quantity after it and
+the time as integer epoch milliseconds, indexed by (item_id, at). Inserting an
+item moves its whole quantity in, deleting it moves it out to 0. So the stock
+of an item at time T is the quantity of its last movement at or before T, one
+index seek.
+
+Compaction writes, for every item moved since the previous compaction, a
+StockSnapshots row with its quantity and last movement time as of the cut, and
+records the cut and the last seq it covers in StockCompactions. Movements that
+are older than the retention horizon and covered by a cut can then be pruned:
+answers before the horizon fall back to the latest snapshot, at the resolution
+of the compaction interval, while the time of an item's last movement stays
+exact.
+"""
+from datetime import datetime, timezone
+from constants import TABLE_NAME
+
+# Integer epoch milliseconds of a julianday value
+EPOCH_MS = "CAST(round(({} - 2440587.5) * 86400000) AS INTEGER)"
+NOW_MS = EPOCH_MS.format("julianday('now')")
+
+
+def epoch_ms(moment: datetime) -> int:
+    """Epoch milliseconds of a datetime; naive datetimes are UTC, like the rest of the inventory."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return round(moment.timestamp() * 1000)
+
+
+def from_epoch_ms(ms: int) -> datetime:
+    """Naive UTC datetime of epoch milliseconds."""
+    return datetime.fromtimestamp(ms / 1000, timezone.utc).replace(tzinfo=None)
+
+
+def _movement(row: str, delta: str, quantity: str) -> str:
+    return f"""
+        INSERT INTO StockMovements (item_id, at, delta, quantity)
+        VALUES ({row}.id, {NOW_MS}, {delta}, {quantity});"""
+
+
+STOCK_LEDGER_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS StockMovements (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        item_id TEXT NOT NULL,
+        at INTEGER NOT NULL,
+        delta INTEGER NOT NULL,
+        quantity INTEGER NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_item_at ON StockMovements(item_id, at)",
+    "CREATE INDEX IF NOT EXISTS idx_stock_movements_at ON StockMovements(at)",
+    """
+    CREATE TABLE IF NOT EXISTS StockSnapshots (
+        item_id TEXT NOT NULL,
+        at INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        last_moved_at INTEGER NOT NULL,
+        PRIMARY KEY (item_id, at)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_stock_snapshots_at ON StockSnapshots(at)",
+    """
+    CREATE TABLE IF NOT EXISTS StockCompactions (
+        at INTEGER PRIMARY KEY,
+        last_seq INTEGER NOT NULL
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_insert AFTER INSERT ON {TABLE_NAME}
+    BEGIN
+        {_movement("NEW", "NEW.quantity", "NEW.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_update AFTER UPDATE OF quantity ON {TABLE_NAME}
+    WHEN NEW.quantity IS NOT OLD.quantity
+    BEGIN
+        {_movement("NEW", "NEW.quantity - OLD.quantity", "NEW.quantity")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS stock_ledger_delete AFTER DELETE ON {TABLE_NAME}
+    BEGIN
+        {_movement("OLD", "-OLD.quantity", "0")}
+    END
+    """,
+]
+
+# Open the ledger with each existing item's current quantity, dated by its last update
+STOCK_LEDGER_BACKFILL = [
+    f"""INSERT INTO StockMovements (item_id, at, delta, quantity)
+        SELECT id, {EPOCH_MS.format("ifnull(julianday(NULLIF(last_updated, '')), julianday('now'))")},
+               quantity, quantity
+        FROM {TABLE_NAME} ORDER BY last_updated, id""",
+]
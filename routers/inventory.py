@@ -1,34 +1,235 @@
-from fastapi import APIRouter, status
-from typing import List
-from models.data_models import InventoryItem
+import csv
+import io
+import json
+import orjson
+from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal, Optional
+from models.data_models import InventoryItem, QuantityAdjustment, QuantityDelta
 from services.service import Service
-from repos.repo import Repo
-from constants import DB_NAME
+from services.container import get_service
+from constants import (DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, EXPORT_BATCH_SIZE, CHANGE_FEED_PAGE_SIZE,
+                       REORDER_PLAN_LINE_LIMIT)
 
 router = APIRouter()
-repo = Repo(DB_NAME)
-service = Service(repo)
+
+
+def _items_response(items: List[InventoryItem], headers: Optional[dict] = None) -> Response:
+    # Items are built from trusted rows without validation; serialize their fields directly
+    # instead of letting FastAPI validate them again against the response model
+    return Response(orjson.dumps([item.__dict__ for item in items]), media_type="application/json",
+                    headers=headers)
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_inventory_item(item: InventoryItem):
+async def create_inventory_item(item: InventoryItem, service: Service = Depends(get_service)):
     """Create a new inventory item"""
     return await service.create_inventory_item(item)
 
 
+def _parse_ndjson(body: bytes) -> list:
+    rows = []
+    for line in body.splitlines():
+        if not line.strip():
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError as e:
+            rows.append(ValueError(f"Invalid JSON line: {e}"))
+    return rows
+
+
+def _parse_csv(body: bytes) -> list:
+    # Empty cells mean "not set" so optional columns fall back to their defaults
+    reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+    return [{key: value for key, value in row.items() if key and value != ""} for row in reader]
+
+
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_upsert_inventory_items(request: Request, service: Service = Depends(get_service)):
+    """Insert or update many inventory items from a JSON array or an NDJSON body"""
+    body = await request.body()
+    if request.headers.get("content-type", "").startswith(("application/x-ndjson", "application/jsonl")):
+        rows = _parse_ndjson(body)
+    else:
+        try:
+            rows = json.loads(body)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(rows, list):
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return await service.bulk_upsert_inventory_items(rows)
+
+
+@router.post("/bulk/csv", status_code=status.HTTP_200_OK)
+async def bulk_upsert_inventory_items_csv(file: UploadFile = File(...), service: Service = Depends(get_service)):
+    """Insert or update many inventory items from an uploaded CSV file with a header row"""
+    return await service.bulk_upsert_inventory_items(_parse_csv(await file.read()))
+
+
 @router.put("/{item_id}", status_code=status.HTTP_200_OK)
-async def update_inventory_item(item_id: str, item: InventoryItem):
+async def update_inventory_item(item_id: str, item: InventoryItem, service: Service = Depends(get_service)):
     """Update an existing inventory item"""
     return await service.update_inventory_item(item_id, item)
 
 
+@router.patch("/quantities", status_code=status.HTTP_200_OK)
+async def adjust_inventory_quantities(adjustments: List[QuantityAdjustment], service: Service = Depends(get_service)):
+    """Apply a batch of signed quantity deltas in one transaction, all or nothing"""
+    return await service.adjust_inventory_quantities(adjustments)
+
+
+@router.patch("/{item_id}/quantity", status_code=status.HTTP_200_OK)
+async def adjust_inventory_quantity(item_id: str, delta: QuantityDelta, service: Service = Depends(get_service)):
+    """Apply a signed quantity delta to an inventory item without rewriting it"""
+    return await service.adjust_inventory_quantity(item_id, delta)
+
+
 @router.delete("/{item_id}", status_code=status.HTTP_200_OK)
-async def delete_inventory_item(item_id: str):
+async def delete_inventory_item(item_id: str, service: Service = Depends(get_service)):
     """Delete an inventory item"""
     return await service.delete_inventory_item(item_id)
 
 
 @router.get("/", response_model=List[InventoryItem])
-async def get_all_inventory_items():
-    """Retrieve all inventory items"""
-    return await service.get_all_inventory_items()
+async def get_all_inventory_items(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        category: Optional[str] = None,
+        supplier: Optional[str] = None,
+        low_stock: bool = False,
+        service: Service = Depends(get_service)):
+    """Retrieve a page of inventory items, newest first.
+
+    Pass the X-Next-Cursor response header back as cursor to get the next page.
+    """
+    items, next_cursor = await service.get_inventory_page(limit, cursor, category, supplier, low_stock)
+    return _items_response(items, {"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+@router.get("/export")
+async def export_inventory_items(
+        format: Literal["ndjson", "csv"] = "ndjson",
+        category: Optional[str] = None,
+        supplier: Optional[str] = None,
+        low_stock: bool = False,
+        service: Service = Depends(get_service)):
+    """Stream every matching inventory item as NDJSON or CSV"""
+    batches = service.iter_inventory_batches(EXPORT_BATCH_SIZE, category, supplier, low_stock)
+
+    async def ndjson():
+        async for items in batches:
+            yield b"".join(orjson.dumps(item.__dict__) + b"\n" for item in items)
+
+    async def csv_rows():
+        fields = list(InventoryItem.model_fields)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(fields)
+        async for items in batches:
+            for item in items:
+                writer.writerow(item.model_dump(mode="json").values())
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+
+    if format == "csv":
+        return StreamingResponse(csv_rows(), media_type="text/csv",
+                                 headers={"Content-Disposition": "attachment; filename=inventory.csv"})
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@router.get("/changes")
+async def get_inventory_changes(since: int = Query(..., ge=0),
+                                limit: int = Query(CHANGE_FEED_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+                                service: Service = Depends(get_service)):
+    """Retrieve the inventory changes after seq since, oldest first.
+
+    To mirror the inventory, note last_seq, load a snapshot, then apply the changes after
+    that seq. 410 means they were pruned and a fresh snapshot is needed.
+    """
+    return Response(orjson.dumps(await service.get_inventory_changes(since, limit)), media_type="application/json")
+
+
+@router.get("/changes/stream")
+async def stream_inventory_changes(request: Request, since: Optional[int] = Query(None, ge=0),
+                                   service: Service = Depends(get_service)):
+    """Push inventory changes after seq since (default: from now on) as Server-Sent Events.
+
+    Each change is a "change" event whose id is its seq, so a reconnecting EventSource
+    resumes through Last-Event-ID. A "reset" event means changes were missed: reload a
+    snapshot and reconnect with since set to the reset's seq.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    if last_event_id and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def events():
+        async for change in service.stream_inventory_changes(since):
+            if change is None:
+                yield b": keepalive\n\n"
+            elif change["op"] == "reset":
+                yield b"event: reset\ndata: " + orjson.dumps(change) + b"\n\n"
+            else:
+                yield b"id: %d\nevent: change\ndata: %s\n\n" % (change["seq"], orjson.dumps(change))
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.get("/search")
+async def search_inventory_items(q: str = Query(..., min_length=1), limit: int = Query(5, ge=1, le=50),
+                                 service: Service = Depends(get_service)):
+    """Rank inventory items by fuzzy name match"""
+    matches = await service.search_inventory_items(q, limit)
+    return [{"item": item, "score": round(score, 4)} for item, score in matches]
+
+
+@router.get("/reorder-queue")
+async def get_reorder_queue(service: Service = Depends(get_service)):
+    """Items below their reorder level grouped per supplier, ready for purchase orders"""
+    return await service.get_reorder_queue()
+
+
+@router.get("/reorder-plan")
+async def plan_reorders(budget: Optional[float] = Query(None, ge=0), supplier: Optional[str] = None,
+                        category: Optional[str] = None,
+                        limit: int = Query(REORDER_PLAN_LINE_LIMIT, ge=0, le=MAX_PAGE_SIZE),
+                        service: Service = Depends(get_service)):
+    """Order quantities and costs for every item below its reorder level, per supplier and
+    in priority order, funded in that order within budget when given, skipping orders that no longer fit"""
+    return Response(orjson.dumps(await service.plan_reorders(budget, supplier, category, limit)),
+                    media_type="application/json")
+
+
+@router.get("/movements")
+async def get_stock_movements(days: int = Query(30, ge=1), item_id: Optional[str] = None,
+                              service: Service = Depends(get_service)):
+    """Per-item stock moved in and out over the last days, from the movement ledger"""
+    return await service.get_stock_movements(datetime.utcnow() - timedelta(days=days), item_id)
+
+
+@router.get("/idle", response_model=List[InventoryItem])
+async def get_idle_inventory_items(since: datetime, service: Service = Depends(get_service)):
+    """Inventory items whose stock has not moved since a point in time"""
+    return _items_response(await service.get_items_idle_since(since))
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(service: Service = Depends(get_service)):
+    """Hit/miss statistics of the inventory read cache"""
+    return service.get_cache_stats()
+
+
+@router.get("/{item_id}", response_model=InventoryItem)
+async def get_inventory_item(item_id: str, service: Service = Depends(get_service)):
+    """Retrieve a single inventory item"""
+    return await service.get_inventory_item(item_id)
+
+
+@router.get("/{item_id}/stock")
+async def get_stock_at(item_id: str, at: datetime, service: Service = Depends(get_service)):
+    """Quantity of an inventory item at a point in time, 0 once it was deleted"""
+    return await service.get_stock_at(item_id, at)
@@ -0,0 +1,32 @@
+import orjson
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import Optional
+from services.cursor import decode_cursor, encode_cursor
+from constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter()
+
+
+@router.get("/{app_name}/{user_id}")
+async def get_sessions(
+        request: Request,
+        app_name: str,
+        user_id: str,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None):
+    """Retrieve a page of a user's agent sessions, most recently active first, without events or state.
+
+    Pass the X-Next-Cursor response header back as cursor to get the next page.
+    """
+    before = None
+    if cursor:
+        update_time, session_id = decode_cursor(cursor)
+        try:
+            before = (float(update_time), session_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    sessions, next_key = await request.app.state.session_store.list_sessions_page(app_name, user_id, limit, before)
+    body = [{"id": session.id, "app_name": session.app_name, "user_id": session.user_id,
+             "last_update_time": session.last_update_time} for session in sessions]
+    return Response(orjson.dumps(body), media_type="application/json",
+                    headers={"X-Next-Cursor": encode_cursor(next_key)} if next_key else None)
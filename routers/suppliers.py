@@ -0,0 +1,48 @@
+import json
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional
+from models.data_models import Supplier, SupplierSummary
+from services.service import Service
+from services.container import get_service
+from constants import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+router = APIRouter()
+
+
+@router.post("/", status_code=status.HTTP_201_CREATED)
+async def create_supplier(supplier: Supplier, service: Service = Depends(get_service)):
+    """Create a new supplier and link the inventory items naming it"""
+    return await service.create_supplier(supplier)
+
+
+@router.post("/bulk", status_code=status.HTTP_200_OK)
+async def bulk_upsert_suppliers(request: Request, service: Service = Depends(get_service)):
+    """Insert or update many suppliers from a JSON array"""
+    try:
+        rows = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array")
+    return await service.bulk_upsert_suppliers(rows)
+
+
+@router.get("/", response_model=List[SupplierSummary])
+async def get_suppliers(
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = None,
+        service: Service = Depends(get_service)):
+    """Retrieve a page of suppliers by ID, each with its item count, stock value and low-stock count.
+
+    Pass the X-Next-Cursor response header back as cursor to get the next page.
+    """
+    suppliers, next_cursor = await service.get_supplier_page(limit, cursor)
+    return Response(orjson.dumps([supplier.__dict__ for supplier in suppliers]), media_type="application/json",
+                    headers={"X-Next-Cursor": next_cursor} if next_cursor else None)
+
+
+@router.get("/{supplier_id}", response_model=SupplierSummary)
+async def get_supplier(supplier_id: str, service: Service = Depends(get_service)):
+    """Retrieve a single supplier with its aggregates"""
+    return await service.get_supplier(supplier_id)
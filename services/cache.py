@@ -0,0 +1,115 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Tuple
+import metrics
+from constants import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+class InventoryCache:
+    """Read-through LRU cache for inventory reads, with a TTL on every entry.
+
+    Keys are ("item", item_id) for single items and ("query", name, *args) for list
+    and analytics results. A write invalidates the entries of the items it touched
+    and every query result, since any row change can alter any query. Cached values
+    are shared between callers and must not be mutated.
+
+    Loads are single-flight: a miss on a key whose load is already running awaits
+    that load instead of querying again, as long as no invalidation happened since it
+    started. This holds with caching disabled too.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._query_keys = set()
+        # key -> (generation, task) of the loads in flight
+        self._loading: Dict[Hashable, Tuple[int, asyncio.Task]] = {}
+        # Bumped by every invalidation so loads that raced a write are not stored
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.shared_loads = 0
+
+    def get(self, key: Hashable):
+        """Return (found, value) and mark the entry as recently used."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return True, entry[1]
+
+    def set(self, key: Hashable, value: Any):
+        if self.max_entries <= 0 or self.ttl_seconds <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        if key[0] == "query":
+            self._query_keys.add(key)
+        while len(self._entries) > self.max_entries:
+            oldest, _ = self._entries.popitem(last=False)
+            self._query_keys.discard(oldest)
+            self.evictions += 1
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Return the cached value for key, loading and caching it on a miss."""
+        found, value = self.get(key)
+        if found:
+            return value
+        loading = self._loading.get(key)
+        if loading is not None and loading[0] == self.generation:
+            self.shared_loads += 1
+            metrics.SINGLE_FLIGHT_SHARED.inc((key[0],))
+            # Shielded so a cancelled caller does not cancel the load the others await
+            return await asyncio.shield(loading[1])
+        generation = self.generation
+        task = asyncio.ensure_future(loader())
+        self._loading[key] = (generation, task)
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            if self._loading.get(key, (None, None))[1] is task:
+                del self._loading[key]
+        if generation == self.generation:
+            self.set(key, value)
+        return value
+
+    def invalidate(self, item_ids: Iterable[str] = ()):
+        """Drop the given items and every cached query result."""
+        self.generation += 1
+        self.invalidations += 1
+        for item_id in item_ids:
+            self._remove(("item", item_id))
+        for key in list(self._query_keys):
+            self._remove(key)
+
+    def clear(self):
+        self.generation += 1
+        self._entries.clear()
+        self._query_keys.clear()
+
+    def _remove(self, key: Hashable):
+        self._entries.pop(key, None)
+        self._query_keys.discard(key)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "shared_loads": self.shared_loads,
+        }
+
@@ -0,0 +1,52 @@
+import time
+from typing import Optional
+from repos.repo import Repo
+from services.cache import InventoryCache
+from constants import CACHE_SYNC_INTERVAL_SECONDS, CHANGE_FEED_PAGE_SIZE
+
+
+class CacheSync:
+    """Keeps an InventoryCache coherent with writes committed by other processes.
+
+    Writes through this process's Service invalidate the cache directly. Writes by
+    other workers sharing the database are noticed through PRAGMA data_version on the
+    writer connection, which changes only when another connection commits. The
+    inventory change log then tells which items changed, so only those entries and the
+    query results are dropped; supplier-only writes drop just the query results.
+
+    sync() checks at most every interval_seconds, so reads may lag another worker's
+    write by that long; 0 checks before every cached read.
+    """
+
+    def __init__(self, repo: Repo, cache: InventoryCache, interval_seconds: float = CACHE_SYNC_INTERVAL_SECONDS):
+        self.repo = repo
+        self.cache = cache
+        self.interval_seconds = interval_seconds
+        self.data_version: Optional[int] = None
+        self.last_seq = 0
+        self._next_check = 0.0
+
+    async def sync(self):
+        """Drop the cache entries invalidated by other processes' commits since the last check."""
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        # Set before awaiting so concurrent readers do not all check at once
+        self._next_check = now + self.interval_seconds
+        data_version = await self.repo.get_data_version()
+        if data_version == self.data_version:
+            return
+        first_seq, last_seq = await self.repo.get_change_bounds()
+        if self.data_version is None:
+            # First check: the cache only holds what was loaded since startup
+            self.data_version, self.last_seq = data_version, last_seq
+            return
+        self.data_version = data_version
+        if last_seq == self.last_seq:
+            self.cache.invalidate()
+        elif self.last_seq < first_seq - 1 or last_seq - self.last_seq > CHANGE_FEED_PAGE_SIZE:
+            self.cache.clear()
+        else:
+            changes = await self.repo.list_changes(self.last_seq, last_seq - self.last_seq)
+            self.cache.invalidate({change["item_id"] for change in changes})
+        self.last_seq = last_seq
@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Optional, Set
+from repos.repo import Repo
+from constants import (CHANGE_FEED_PAGE_SIZE, CHANGE_FEED_POLL_SECONDS, CHANGE_FEED_QUEUE_SIZE,
+                       CHANGE_FEED_HEARTBEAT_SECONDS, CHANGE_LOG_RETENTION, CHANGE_LOG_PRUNE_EVERY)
+
+log = logging.getLogger("inventory.changes")
+
+
+class _Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        # Set when the subscriber fell too far behind and was dropped from fan-out
+        self.lagged = False
+
+
+class ChangeFeed:
+    """Fans the inventory change log out to live subscribers.
+
+    One publisher task reads new change log entries, once per write notified by the
+    Service and every poll_seconds for writes committed by other processes, and puts
+    them on every subscriber's queue. A subscriber that lets its queue fill up, or
+    asks for changes that were already pruned, gets a reset and must reload a
+    snapshot. The publisher also prunes the log down to CHANGE_LOG_RETENTION entries.
+    """
+
+    def __init__(self, repo: Repo, poll_seconds: float = CHANGE_FEED_POLL_SECONDS,
+                 queue_size: int = CHANGE_FEED_QUEUE_SIZE):
+        self.repo = repo
+        self.poll_seconds = poll_seconds
+        self.queue_size = queue_size
+        self.last_seq = 0
+        self._pruned_at = 0
+        self._subscriptions: Set[_Subscription] = set()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the publisher task, or restart it if it ended. Idempotent."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the publisher task and end every subscription."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for subscription in self._subscriptions:
+            subscription.lagged = True
+            self._end(subscription)
+        self._subscriptions.clear()
+
+    def notify(self):
+        """Wake the publisher after a local write."""
+        self._wakeup.set()
+
+    async def _run(self):
+        positioned = False
+        while True:
+            try:
+                if positioned:
+                    await self._publish()
+                else:
+                    # Start from the latest change; retried like a publish, e.g. while the
+                    # read pool sheds load or the database is locked at startup
+                    _, self.last_seq = await self.repo.get_change_bounds()
+                    self._pruned_at = self.last_seq
+                    positioned = True
+            except Exception:
+                # Retried on the next wakeup; subscribers dedupe by seq
+                log.exception("Change feed publish failed")
+            # Not wait_for: before Python 3.12 it drops a stop()'s cancel that lands just as
+            # a notify() wakes the wait, and the publisher would never stop
+            try:
+                async with asyncio.timeout(self.poll_seconds):
+                    await self._wakeup.wait()
+            except TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def _publish(self):
+        if not self._subscriptions:
+            # Nobody to deliver to: skip reading the entries, just move past them
+            _, self.last_seq = await self.repo.get_change_bounds()
+        while self._subscriptions:
+            changes = await self.repo.list_changes(self.last_seq, CHANGE_FEED_PAGE_SIZE)
+            if not changes:
+                break
+            self.last_seq = changes[-1]["seq"]
+            for subscription in list(self._subscriptions):
+                try:
+                    for change in changes:
+                        subscription.queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    subscription.lagged = True
+                    self._subscriptions.discard(subscription)
+            if len(changes) < CHANGE_FEED_PAGE_SIZE:
+                break
+        if self.last_seq - self._pruned_at >= CHANGE_LOG_PRUNE_EVERY:
+            await self.repo.prune_changes(CHANGE_LOG_RETENTION)
+            self._pruned_at = self.last_seq
+
+    @staticmethod
+    def _end(subscription: _Subscription):
+        # Make room for the end marker so a blocked subscriber wakes up
+        while subscription.queue.full():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(None)
+
+    async def subscribe(self, since: Optional[int] = None,
+                        heartbeat_seconds: float = CHANGE_FEED_HEARTBEAT_SECONDS) -> AsyncIterator[Optional[dict]]:
+        """Yield every change with seq greater than since, first from the log, then live.
+
+        since=None starts at the latest change, so only changes committed from now on are yielded.
+
+        Yields None after heartbeat_seconds without changes, so callers can keep an idle
+        connection alive. Ends with {"op": "reset", "seq": ...} when the subscriber fell
+        behind or since was already pruned; the client must then reload a snapshot and
+        resubscribe from the reset's seq.
+        """
+        await self.start()
+        subscription = _Subscription(self.queue_size)
+        # Subscribe before catching up so nothing published meanwhile is missed
+        self._subscriptions.add(subscription)
+        try:
+            first_seq, last_seq = await self.repo.get_change_bounds()
+            if since is None:
+                since = last_seq
+            if since < first_seq - 1:
+                yield {"op": "reset", "seq": last_seq}
+                return
+            while True:
+                changes = await self.repo.list_changes(since, CHANGE_FEED_PAGE_SIZE)
+                for change in changes:
+                    since = change["seq"]
+                    yield change
+                if len(changes) < CHANGE_FEED_PAGE_SIZE:
+                    break
+            while True:
+                try:
+                    async with asyncio.timeout(heartbeat_seconds):
+                        change = await subscription.queue.get()
+                except TimeoutError:
+                    yield None
+                    continue
+                if change is None:
+                    yield {"op": "reset", "seq": self.last_seq}
+                    return
+                if change["seq"] > since + 1:
+                    # Committed while this subscriber caught up, before the publisher saw it
+                    for missed in await self.repo.list_changes(since, change["seq"] - since - 1):
+                        since = missed["seq"]
+                        yield missed
+                if change["seq"] > since:
+                    since = change["seq"]
+                    yield change
+                if subscription.lagged and subscription.queue.empty():
+                    yield {"op": "reset", "seq": self.last_seq}
+                    return
+        finally:
+            self._subscriptions.discard(subscription)
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Optional
+from repos.repo import Repo
+from services.service import Service
+from services.cache import InventoryCache
+from services.change_feed import ChangeFeed
+from constants import DB_NAME
+
+
+class Container:
+    """Owns the one Repo/Service pair shared by the routers and the agent tools.
+
+    Started from the FastAPI lifespan in main.py. Tests can start it with another
+    backend, e.g. ``await container.start(Repo(":memory:", reader_pool_size=0))``.
+    """
+
+    def __init__(self):
+        self.repo: Optional[Repo] = None
+        self.service: Optional[Service] = None
+        self._lock = asyncio.Lock()
+
+    async def start(self, repo: Optional[Repo] = None) -> Service:
+        """Open the pool, migrate the schema, start the change feed and build the Service. Idempotent."""
+        async with self._lock:
+            if self.service is None:
+                repo = repo or Repo(DB_NAME)
+                await repo.open()
+                await repo.init_db()
+                self.repo = repo
+                changes = ChangeFeed(repo)
+                await changes.start()
+                self.service = Service(repo, InventoryCache(), changes)
+            return self.service
+
+    async def stop(self):
+        """Stop the change feed and close the pool. The next get_service() starts a fresh container."""
+        async with self._lock:
+            if self.service is not None:
+                await self.service.changes.stop()
+            if self.repo is not None:
+                await self.repo.close()
+            self.repo = None
+            self.service = None
+
+
+container = Container()
+
+
+async def get_service() -> Service:
+    """The shared Service: a FastAPI dependency for the routers and the accessor for the
+    agent tools. Starts the container on first use when running outside the app
+    lifespan, e.g. under ``adk run``."""
+    if container.service is not None:
+        return container.service
+    return await container.start()
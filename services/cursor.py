@@ -0,0 +1,20 @@
+"""Opaque page cursors: a keyset pagination key as URL-safe base64 JSON."""
+import base64
+import json
+from typing import Tuple
+from fastapi import HTTPException
+
+
+def encode_cursor(key: Tuple[str, ...]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: str, parts: int = 2) -> Tuple[str, ...]:
+    """The key of cursor, which must have parts parts; an HTTP 400 if it is not a valid cursor."""
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(key, list) or len(key) != parts:
+            raise ValueError(cursor)
+        return tuple(str(part) for part in key)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
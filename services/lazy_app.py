@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Callable, Optional
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+log = logging.getLogger("inventory.startup")
+
+
+class LazyApp:
+    """ASGI app built on its first request instead of at import time.
+
+    main.py mounts the ADK agent app through it, so a cold start imports and builds
+    only the inventory API; google.adk and the agent modules are imported by build()
+    in a worker thread when the first agent request arrives, or earlier by warm_up()
+    once the server is up. Concurrent callers share one build, and a failed build is
+    retried by the next request. The built app's lifespan is entered after the build
+    and exited by close().
+    """
+
+    def __init__(self, build: Callable[[], ASGIApp], name: str = "app"):
+        self.build = build
+        self.name = name
+        self._app: Optional[ASGIApp] = None
+        self._loading: Optional[asyncio.Task] = None
+        self._warm_up: Optional[asyncio.Task] = None
+        self._exit_stack = AsyncExitStack()
+
+    @property
+    def loaded(self) -> bool:
+        return self._app is not None
+
+    async def load(self) -> ASGIApp:
+        """The built app, building it first if needed."""
+        if self._app is None:
+            if self._loading is None:
+                self._loading = asyncio.create_task(self._load())
+            try:
+                await asyncio.shield(self._loading)
+            except Exception:
+                self._loading = None
+                raise
+        return self._app
+
+    async def _load(self):
+        started = time.perf_counter()
+        app = await asyncio.to_thread(self.build)
+        lifespan = getattr(getattr(app, "router", None), "lifespan_context", None)
+        if lifespan is not None:
+            await self._exit_stack.enter_async_context(lifespan(app))
+        self._app = app
+        log.info("Loaded the %s in %.0f ms", self.name, (time.perf_counter() - started) * 1000)
+
+    def warm_up(self):
+        """Start building in the background. Idempotent."""
+        if self._warm_up is None and self._app is None:
+            self._warm_up = asyncio.create_task(self._run_warm_up())
+
+    async def _run_warm_up(self):
+        try:
+            await self.load()
+        except Exception:
+            log.exception("Warming up the %s failed, the next request retries", self.name)
+
+    async def close(self):
+        """Stop a pending warm-up and exit the built app's lifespan."""
+        if self._warm_up is not None:
+            self._warm_up.cancel()
+            try:
+                await self._warm_up
+            except asyncio.CancelledError:
+                pass
+            self._warm_up = None
+        if self._loading is not None:
+            try:
+                await self._loading
+            except Exception:
+                pass
+            self._loading = None
+        await self._exit_stack.aclose()
+        self._app = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        app = self._app if self._app is not None else await self.load()
+        await app(scope, receive, send)
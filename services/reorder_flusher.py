@@ -0,0 +1,88 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+from repos.repo import Repo
+from constants import (REORDER_WEBHOOK_URL, REORDER_WEBHOOK_TIMEOUT_SECONDS, REORDER_FLUSH_SECONDS,
+                       REORDER_FLUSH_BATCH_SIZE, REORDER_EVENT_LEASE_SECONDS, REORDER_EVENT_RETENTION_DAYS)
+
+if TYPE_CHECKING:
+    import httpx
+
+log = logging.getLogger("inventory.reorder")
+
+
+class ReorderFlusher:
+    """Background task delivering the reorder outbox to the reorder webhook.
+
+    Every flush_seconds it claims the oldest undelivered ReorderEvents, POSTs them as
+    {"events": [...]} to webhook_url and marks them delivered on a 2xx answer. A failed
+    delivery is retried, still in seq order, once the claim's lease runs out, so the
+    webhook must tolerate duplicates (events carry a unique seq). Without a webhook the
+    events stay in the ReorderEvents table for other consumers. Delivered events are
+    pruned after REORDER_EVENT_RETENTION_DAYS.
+    """
+
+    def __init__(self, repo: Repo, webhook_url: str = REORDER_WEBHOOK_URL,
+                 flush_seconds: float = REORDER_FLUSH_SECONDS):
+        self.repo = repo
+        self.webhook_url = webhook_url
+        self.flush_seconds = flush_seconds
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the flush task. Idempotent."""
+        if self._task is None:
+            if self.webhook_url:
+                # httpx (and the CLI dependencies it pulls in) is only imported when there is a webhook
+                import httpx
+                self._client = httpx.AsyncClient(timeout=REORDER_WEBHOOK_TIMEOUT_SECONDS)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.flush()
+                await self.repo.prune_reorder_events(
+                    datetime.utcnow() - timedelta(days=REORDER_EVENT_RETENTION_DAYS))
+            except Exception:
+                log.exception("Reorder outbox flush failed")
+            await asyncio.sleep(self.flush_seconds)
+
+    async def flush(self) -> int:
+        """Deliver undelivered events until the outbox is drained. Returns the number delivered."""
+        if self._client is None:
+            return 0
+        delivered = 0
+        while True:
+            events = await self.repo.claim_reorder_events(REORDER_FLUSH_BATCH_SIZE, REORDER_EVENT_LEASE_SECONDS)
+            if not events:
+                return delivered
+            if not await self._post(events):
+                return delivered
+            await self.repo.mark_reorder_events_delivered([event["seq"] for event in events])
+            delivered += len(events)
+
+    async def _post(self, events: List[dict]) -> bool:
+        import httpx
+        try:
+            response = await self._client.post(self.webhook_url, json={"events": events})
+            if response.is_success:
+                return True
+            log.warning("Reorder webhook answered %s, retrying after the lease", response.status_code)
+        except httpx.HTTPError as e:
+            log.warning("Reorder webhook unreachable (%s), retrying after the lease", e)
+        return False
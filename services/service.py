@@ -1,16 +1,44 @@
-from typing import List
+import asyncio
+from typing import TYPE_CHECKING, Any, AsyncIterator, Awaitable, Callable, Iterable, List, Optional, Tuple, Type
+from datetime import datetime
 from fastapi import HTTPException
-from models.data_models import InventoryItem
-from repos.repo import Repo
+from pydantic import BaseModel, ValidationError
+from models.data_models import InventoryItem, QuantityAdjustment, QuantityDelta, Supplier, SupplierSummary
+from repos.repo import AdjustmentError, Repo
+from services.cache import InventoryCache
+from services.cache_sync import CacheSync
+from services.change_feed import ChangeFeed
+from services.cursor import decode_cursor, encode_cursor
+from metrics import instrument_class
+from constants import (BULK_BATCH_SIZE, NAME_SEARCH_LIMIT, NAME_MATCH_MIN_SCORE, NAME_MATCH_MARGIN,
+                       REORDER_PLAN_LINE_LIMIT)
 
+if TYPE_CHECKING:
+    from services.reorder_planner import ReorderPlanner
 
+
+@instrument_class("service")
 class Service:
-    def __init__(self, repo: Repo):
+    def __init__(self, repo: Repo, cache: Optional[InventoryCache] = None, changes: Optional[ChangeFeed] = None,
+                 planner: Optional["ReorderPlanner"] = None):
         self.repo = repo
+        self.cache = cache if cache is not None else InventoryCache()
+        self.changes = changes if changes is not None else ChangeFeed(repo)
+        self.planner = planner
+        self.cache_sync = CacheSync(repo, self.cache)
+
+    def _written(self, item_ids: Iterable[str]):
+        """Drop cached reads of the written items and wake the change feed"""
+        self.cache.invalidate(item_ids)
+        self.changes.notify()
+
+    async def _cached_query(self, name: str, loader, *args):
+        """Read a list/analytics result through the cache"""
+        await self.cache_sync.sync()
+        return await self.cache.get_or_load(("query", name, *args), lambda: loader(*args))
 
     async def create_inventory_item(self, item: InventoryItem):
         """Create a new inventory item record"""
-        await self.repo.init_db()
         if isinstance(item, dict):
             item = InventoryItem(**item)
         existing = await self.repo.get(item.id)
@@ -18,41 +46,327 @@ class Service:
             raise HTTPException(
                 status_code=409, detail="Inventory item already exists")
         await self.repo.insert(item)
+        self._written([item.id])
         return item
 
     async def update_inventory_item(self, item_id: str, item: InventoryItem) -> InventoryItem:
-        """Update an existing inventory item"""
-        await self.repo.init_db()
+        """Update an existing inventory item and return it as stored, with its new version"""
         if isinstance(item, dict):
             item = InventoryItem(**item)
         item.id = item_id
         updated = await self.repo.update(item)
-        if not updated:
+        self._written([item_id])
+        if updated is None:
             raise HTTPException(
                 status_code=404, detail="Inventory item not found to update")
-        return item
+        return updated
+
+    async def bulk_upsert_inventory_items(self, rows: Iterable[Any]) -> dict:
+        """Insert or update many inventory items, BULK_BATCH_SIZE rows per transaction.
+
+        rows may hold InventoryItem objects, dicts, or Exception instances for rows that
+        could not be parsed upstream. Returns the per-status counts and a per-row result.
+        """
+        async def upsert(items: List[InventoryItem]) -> List[str]:
+            statuses = await self.repo.upsert_many(items)
+            self._written(item.id for item in items)
+            return statuses
+        return await self._bulk_upsert(rows, InventoryItem, upsert)
+
+    async def _bulk_upsert(self, rows: Iterable[Any], model: Type[BaseModel],
+                           upsert: Callable[[list], Awaitable[List[str]]]) -> dict:
+        """Validate rows as model and write them through upsert in BULK_BATCH_SIZE batches.
+
+        upsert writes one batch and returns "inserted" or "updated" per record. Rows that
+        are Exception instances or fail validation are rejected with the error.
+        """
+        results = []
+        batch, batch_results = [], []
+
+        async def flush():
+            statuses = await upsert(batch)
+            for result, status in zip(batch_results, statuses):
+                result["status"] = status
+            batch.clear()
+            batch_results.clear()
+
+        for index, row in enumerate(rows):
+            result = {"index": index, "id": None, "status": "rejected"}
+            results.append(result)
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                record = row if isinstance(row, model) else model.model_validate(row)
+            except (ValidationError, ValueError, TypeError) as e:
+                result["id"] = row.get("id") if isinstance(row, dict) else None
+                result["error"] = str(e)
+                continue
+            result["id"] = record.id
+            batch.append(record)
+            batch_results.append(result)
+            if len(batch) >= BULK_BATCH_SIZE:
+                await flush()
+        if batch:
+            await flush()
+
+        counts = {"inserted": 0, "updated": 0, "rejected": 0}
+        for result in results:
+            counts[result["status"]] += 1
+        return {**counts, "results": results}
+
+    async def adjust_inventory_quantity(self, item_id: str, delta: QuantityDelta) -> dict:
+        """Atomically apply a signed quantity delta to an inventory item"""
+        adjustment = QuantityAdjustment(item_id=item_id, **delta.model_dump())
+        return (await self.adjust_inventory_quantities([adjustment]))[0]
+
+    async def adjust_inventory_quantities(self, adjustments: List[QuantityAdjustment],
+                                          all_or_nothing: bool = True) -> List[dict]:
+        """Apply a batch of quantity deltas in one transaction, all or nothing unless told otherwise.
+
+        With all_or_nothing=False refused deltas are reported per item with an "error" reason
+        (not_found, insufficient_stock or version_conflict) and the rest are applied.
+        """
+        try:
+            results = await self.repo.adjust_quantities(adjustments, all_or_nothing)
+            self._written(adjustment.item_id for adjustment in adjustments)
+            return results
+        except AdjustmentError as e:
+            if e.reason == "not_found":
+                raise HTTPException(
+                    status_code=404, detail=f"Inventory item {e.item_id} not found to adjust")
+            if e.reason == "version_conflict":
+                raise HTTPException(
+                    status_code=409, detail=f"Inventory item {e.item_id} was modified concurrently")
+            raise HTTPException(
+                status_code=409, detail=f"Insufficient stock for inventory item {e.item_id}")
+
+    async def create_and_adjust_inventory_items(self, items: List[InventoryItem],
+                                                adjustments: List[QuantityAdjustment]) -> Tuple[List[dict], List[dict]]:
+        """Create items whose names are still free and apply quantity deltas, in one transaction.
+
+        Refusals are reported per item: "name_taken" for a creation, not_found,
+        insufficient_stock or version_conflict for a delta.
+        """
+        created, adjusted = await self.repo.create_and_adjust(items, adjustments)
+        self._written([item.id for item in items] + [adjustment.item_id for adjustment in adjustments])
+        return created, adjusted
 
     async def delete_inventory_item(self, item_id: str):
         """Delete an inventory item"""
-        await self.repo.init_db()
         deleted_count = await self.repo.delete(item_id)
+        self._written([item_id])
         if deleted_count == 0:
             raise HTTPException(
                 status_code=404, detail="Inventory item not found to delete")
         return {"message": f"Inventory item with id {item_id} deleted successfully"}
 
+    async def delete_inventory_items(self, item_ids: List[str]) -> List[str]:
+        """Delete several inventory items in one transaction, returning the IDs that existed"""
+        deleted = await self.repo.delete_many(item_ids)
+        self._written(item_ids)
+        return deleted
+
+    async def get_inventory_item(self, item_id: str) -> InventoryItem:
+        """Retrieve a single inventory item"""
+        await self.cache_sync.sync()
+        item = await self.cache.get_or_load(("item", item_id), lambda: self.repo.get(item_id))
+        if item is None:
+            raise HTTPException(
+                status_code=404, detail="Inventory item not found")
+        return item
+
     async def get_all_inventory_items(self) -> List[InventoryItem]:
         """Retrieve all inventory items"""
-        await self.repo.init_db()
-        return await self.repo.list()
+        return await self._cached_query("list", self.repo.list)
+
+    async def get_inventory_page(self, limit: int, cursor: Optional[str] = None,
+                                 category: Optional[str] = None, supplier: Optional[str] = None,
+                                 low_stock: bool = False) -> Tuple[List[InventoryItem], Optional[str]]:
+        """Retrieve one page of inventory items and the cursor of the next page"""
+        after = decode_cursor(cursor) if cursor else None
+        items, next_key = await self._cached_query(
+            "page", self.repo.list_page, limit, after, category, supplier, low_stock)
+        return items, encode_cursor(next_key) if next_key else None
+
+    async def iter_inventory_batches(self, batch_size: int, category: Optional[str] = None,
+                                     supplier: Optional[str] = None,
+                                     low_stock: bool = False) -> AsyncIterator[List[InventoryItem]]:
+        """Yield every matching inventory item in batches, one query per batch"""
+        after = None
+        while True:
+            items, after = await self.repo.list_page(batch_size, after, category, supplier, low_stock)
+            if items:
+                yield items
+            if after is None:
+                return
+
+    async def get_inventory_items_by_category(self, category: str) -> List[InventoryItem]:
+        """Retrieve inventory items of a category"""
+        return await self._cached_query("category", self.repo.list_by_category, category)
+
+    async def get_items_needing_reorder(self) -> List[InventoryItem]:
+        """Retrieve inventory items below their reorder level"""
+        return await self._cached_query("below_reorder_level", self.repo.list_below_reorder_level)
+
+    async def get_reorder_queue(self) -> List[dict]:
+        """Retrieve the reorder queue grouped per supplier, with shortages and estimated costs"""
+        return await self._cached_query("reorder_queue", self.repo.list_reorder_queue)
+
+    async def plan_reorders(self, budget: Optional[float] = None, supplier: Optional[str] = None,
+                            category: Optional[str] = None, limit: int = REORDER_PLAN_LINE_LIMIT) -> dict:
+        """Plan the reorder of the whole catalogue, prioritised within an optional budget"""
+        if self.planner is None:
+            # NumPy is imported on the first plan rather than on every cold start
+            from services.reorder_planner import ReorderPlanner
+            self.planner = ReorderPlanner(self.repo)
+        return await self.planner.plan(budget, supplier, category, limit)
+
+    async def get_items_not_updated_since(self, cutoff: datetime) -> List[InventoryItem]:
+        """Retrieve inventory items not updated since cutoff"""
+        return await self.repo.list_not_updated_since(cutoff)
 
-    async def create_supplier(self, supplier):
-        """Create a new supplier record"""
-        await self.repo.init_db()
+    async def get_stock_at(self, item_id: str, at: datetime) -> dict:
+        """Retrieve the quantity of an inventory item at a point in time"""
+        quantity = await self.repo.get_stock_at(item_id, at)
+        if quantity is None:
+            raise HTTPException(
+                status_code=404, detail="No stock recorded for inventory item at that time")
+        return {"item_id": item_id, "at": at, "quantity": quantity}
+
+    async def get_stock_movements(self, since: datetime, item_id: Optional[str] = None) -> List[dict]:
+        """Retrieve per-item stock movement totals since a point in time"""
+        return await self.repo.list_stock_movements(since, item_id)
+
+    async def get_items_idle_since(self, cutoff: datetime) -> List[InventoryItem]:
+        """Retrieve inventory items whose stock has not moved since cutoff"""
+        return await self.repo.list_idle_since(cutoff)
+
+    async def get_last_updated_item(self) -> Optional[InventoryItem]:
+        """Retrieve the most recently updated inventory item"""
+        return await self._cached_query("last_updated", self.repo.get_last_updated)
+
+    async def get_inventory_items_by_names(self, item_names: List[str]) -> List[InventoryItem]:
+        """Retrieve inventory items with any of the exact names"""
+        return await self.repo.list_by_names(item_names)
+
+    async def search_inventory_items(self, query: str, limit: int = NAME_SEARCH_LIMIT) -> List[Tuple[InventoryItem, float]]:
+        """Rank inventory items by name similarity to query, with scores"""
+        return await self._cached_query("search", self.repo.search_names, query, limit)
+
+    async def resolve_inventory_item(self, item_name: str) -> Tuple[Optional[InventoryItem], List[Tuple[InventoryItem, float]]]:
+        """Resolve a user-typed name to one inventory item.
+
+        Returns (item, candidates). item is None when nothing matches well enough, or when
+        several items match about equally well; candidates then lists them to disambiguate.
+        """
+        matches = [match for match in await self.search_inventory_items(item_name)
+                   if match[1] >= NAME_MATCH_MIN_SCORE]
+        if not matches:
+            return None, []
+        best_item, best_score = matches[0]
+        if best_score == 1.0 or len(matches) == 1 or best_score - matches[1][1] >= NAME_MATCH_MARGIN:
+            return best_item, matches
+        return None, matches
+
+    async def get_inventory_changes(self, since: int, limit: int) -> dict:
+        """Retrieve the inventory changes after seq since, for clients catching up a local mirror"""
+        first_seq, last_seq = await self.repo.get_change_bounds()
+        if since < first_seq - 1:
+            raise HTTPException(
+                status_code=410, detail=f"Changes after {since} were pruned, reload a snapshot")
+        changes = await self.repo.list_changes(since, limit)
+        return {"changes": changes, "last_seq": last_seq}
+
+    def stream_inventory_changes(self, since: Optional[int] = None) -> AsyncIterator[Optional[dict]]:
+        """Stream inventory changes after seq since (default: from now on) as they are committed"""
+        return self.changes.subscribe(since)
+
+    async def resolve_inventory_items(self, item_names: List[str]) -> List[Tuple[Optional[InventoryItem], List[Tuple[InventoryItem, float]]]]:
+        """Resolve several user-typed names at once, concurrently over the reader pool.
+
+        Returns one (item, candidates) pair per name, in order, as resolve_inventory_item does.
+        """
+        unique_names = list(dict.fromkeys(item_names))
+        resolved = await asyncio.gather(*(self.resolve_inventory_item(name) for name in unique_names))
+        by_name = dict(zip(unique_names, resolved))
+        return [by_name[name] for name in item_names]
+
+    def get_cache_stats(self) -> dict:
+        """Retrieve hit/miss statistics of the inventory cache"""
+        return self.cache.stats()
+
+    async def get_inventory_totals(self) -> dict:
+        """Retrieve the item count and total stock value"""
+        return await self._cached_query("totals", self.repo.get_totals)
+
+    async def get_top_supplier(self) -> Optional[dict]:
+        """Retrieve the supplier providing the most items"""
+        return await self._cached_query("top_supplier", self.repo.get_top_supplier)
+
+    async def get_category_highest_avg_price(self) -> Optional[dict]:
+        """Retrieve the category with the highest average price"""
+        return await self._cached_query("category_highest_avg_price", self.repo.get_category_highest_avg_price)
+
+    async def get_supplier_lowest_reorder_ratio(self) -> Optional[dict]:
+        """Retrieve the supplier with the lowest average reorder ratio"""
+        return await self._cached_query("supplier_lowest_reorder_ratio", self.repo.get_supplier_lowest_reorder_ratio)
+
+    async def get_supplier_highest_category_cost(self) -> Optional[dict]:
+        """Retrieve the supplier and category with the highest average cost"""
+        return await self._cached_query("supplier_highest_category_cost", self.repo.get_supplier_highest_category_cost)
+
+    async def check_aggregates(self, rebuild: bool = False) -> List[dict]:
+        """Check the analytics summary tables for drift, optionally rebuilding them"""
+        drift = await self.repo.check_aggregates(rebuild)
+        if rebuild:
+            self.cache.invalidate()
+        return drift
+
+    async def create_supplier(self, supplier: Supplier) -> Supplier:
+        """Create a new supplier record, linking the items that name it"""
+        if isinstance(supplier, dict):
+            supplier = Supplier(**supplier)
+        existing = await self.repo.get_supplier(supplier.id)
+        if existing:
+            raise HTTPException(
+                status_code=409, detail="Supplier already exists")
         await self.repo.insert_supplier(supplier)
+        # Linking items changes their supplier_id and every per-supplier aggregate; which
+        # items were linked is not known here, so every cached item goes too
+        self.cache.clear()
+        self.changes.notify()
         return supplier
 
-    async def get_all_suppliers(self):
+    async def bulk_upsert_suppliers(self, rows: Iterable[Any]) -> dict:
+        """Insert or update many suppliers, BULK_BATCH_SIZE rows per transaction.
+
+        Returns the per-status counts and a per-row result, like bulk_upsert_inventory_items.
+        """
+        async def upsert(suppliers: List[Supplier]) -> List[str]:
+            statuses = await self.repo.upsert_suppliers(suppliers)
+            # Like create_supplier: the linked items are not known here
+            self.cache.clear()
+            self.changes.notify()
+            return statuses
+        return await self._bulk_upsert(rows, Supplier, upsert)
+
+    async def get_supplier(self, supplier_id: str) -> SupplierSummary:
+        """Retrieve a single supplier with its item count, stock value and low-stock count"""
+        suppliers, _ = await self._cached_query(
+            "supplier", self.repo.list_supplier_summaries, 1, None, supplier_id)
+        if not suppliers:
+            raise HTTPException(
+                status_code=404, detail="Supplier not found")
+        return suppliers[0]
+
+    async def get_supplier_page(self, limit: int,
+                                cursor: Optional[str] = None) -> Tuple[List[SupplierSummary], Optional[str]]:
+        """Retrieve one page of suppliers with their aggregates and the cursor of the next page"""
+        after = decode_cursor(cursor, 1)[0] if cursor else None
+        suppliers, next_key = await self._cached_query(
+            "supplier_page", self.repo.list_supplier_summaries, limit, after)
+        return suppliers, encode_cursor((next_key,)) if next_key else None
+
+    async def get_all_suppliers(self) -> List[Supplier]:
         """Retrieve all suppliers"""
-        await self.repo.init_db()
         return await self.repo.list_suppliers()
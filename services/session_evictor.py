@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from typing import Optional
+from repos.session_store import SessionStore
+from constants import SESSION_EVICTION_SECONDS, SESSION_TTL_SECONDS, SESSION_MAX_EVENTS
+
+log = logging.getLogger("inventory.sessions")
+
+
+class SessionEvictor:
+    """Background task evicting agent sessions from the session store.
+
+    Every interval_seconds it deletes the sessions idle for longer than
+    SESSION_TTL_SECONDS and trims recently active ones to about SESSION_MAX_EVENTS events.
+    """
+
+    def __init__(self, store: SessionStore, interval_seconds: float = SESSION_EVICTION_SECONDS):
+        self.store = store
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the eviction task. Idempotent."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.evict()
+            except Exception:
+                log.exception("Session eviction failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def evict(self):
+        sessions, events = await self.store.evict(SESSION_TTL_SECONDS, SESSION_MAX_EVENTS)
+        if sessions or events:
+            log.info("Sessions evicted: %d expired sessions and %d trimmed events deleted", sessions, events)
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from repos.repo import Repo
+from constants import STOCK_COMPACTION_SECONDS, STOCK_MOVEMENT_RETENTION_DAYS, STOCK_SNAPSHOT_RETENTION_DAYS
+
+log = logging.getLogger("inventory.stock_ledger")
+
+
+class StockLedgerCompactor:
+    """Background task compacting and pruning the stock movement ledger.
+
+    Every interval_seconds it snapshots the items moved since the previous run, then
+    prunes compacted movements older than STOCK_MOVEMENT_RETENTION_DAYS and snapshots
+    older than STOCK_SNAPSHOT_RETENTION_DAYS, keeping each item's latest snapshot.
+    """
+
+    def __init__(self, repo: Repo, interval_seconds: float = STOCK_COMPACTION_SECONDS):
+        self.repo = repo
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the compaction task. Idempotent."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.compact()
+            except Exception:
+                log.exception("Stock ledger compaction failed")
+
+    async def compact(self):
+        """Snapshot, then prune past the retention horizons."""
+        snapshots = await self.repo.compact_stock_ledger()
+        now = datetime.utcnow()
+        movements, pruned_snapshots = await self.repo.prune_stock_ledger(
+            now - timedelta(days=STOCK_MOVEMENT_RETENTION_DAYS), now - timedelta(days=STOCK_SNAPSHOT_RETENTION_DAYS))
+        log.info("Stock ledger compacted: %d snapshots written, %d movements and %d snapshots pruned",
+                 snapshots, movements, pruned_snapshots)
@@ -0,0 +1,38 @@
+"""Tests run against the in-memory backend: python -m pytest from the repository root."""
+import asyncio
+from contextlib import asynccontextmanager
+from models.data_models import InventoryItem
+from repos.repo import Repo
+from services.container import container
+
+
+def item(item_id: str, quantity: int = 10) -> InventoryItem:
+    return InventoryItem(id=item_id, item_name=f"Item {item_id}", category="Spare Parts", quantity=quantity,
+                         reorder_level=5, supplier="Acme", unit_price=2.5)
+
+
+@asynccontextmanager
+async def in_memory_service():
+    service = await container.start(Repo(":memory:", reader_pool_size=0))
+    try:
+        yield service
+    finally:
+        await container.stop()
+
+
+async def hold_writer(repo: Repo) -> tuple:
+    """Queue a write that blocks the writer task until release is set, so the writes
+    queued meanwhile are committed together in the next batch."""
+    started, release = asyncio.Event(), asyncio.Event()
+
+    async def blocking(db):
+        started.set()
+        await release.wait()
+    task = asyncio.create_task(repo._execute_write(blocking))
+    await started.wait()
+    return task, release
+
+
+async def queued(repo: Repo, writes: int):
+    while repo._write_queue.qsize() < writes:
+        await asyncio.sleep(0)
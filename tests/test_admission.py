@@ -0,0 +1,80 @@
+"""AdmissionPool shedding (429 on a full queue, 503 on a timed-out wait) and the DB write slots."""
+import asyncio
+import pytest
+from admission import AdmissionMiddleware, AdmissionPool, Overloaded
+from tests import hold_writer, in_memory_service, item, queued
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        pool = AdmissionPool("test_queue", 1, 1, 60)
+        await pool.acquire()
+        waiter = asyncio.create_task(pool.acquire())
+        await asyncio.sleep(0)
+        assert pool.waiting == 1
+        with pytest.raises(Overloaded) as rejected:
+            await pool.acquire()
+        assert rejected.value.status_code == 429
+        assert rejected.value.retry_after >= 1
+
+        pool.release(0.5)
+        await waiter
+        assert (pool.active, pool.waiting, pool.rejected) == (1, 0, 1)
+    asyncio.run(scenario())
+
+
+def test_timed_out_wait_is_rejected_with_503():
+    async def scenario():
+        pool = AdmissionPool("test_timeout", 1, 10, 0.01)
+        async with pool.slot():
+            with pytest.raises(Overloaded) as rejected:
+                await pool.acquire()
+            assert rejected.value.status_code == 503
+            assert pool.waiting == 0
+        # The slot is free again and the timed-out waiter took none
+        assert pool.active == 0
+        await pool.acquire()
+    asyncio.run(scenario())
+
+
+def test_middleware_answers_a_shed_request():
+    async def scenario():
+        pool = AdmissionPool("test_http", 1, 0, 60)
+        sent = []
+
+        async def app(scope, receive, send):
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+
+        async def send(message):
+            sent.append(message)
+        middleware = AdmissionMiddleware(app, pool, ["/run"])
+        scope = {"type": "http", "path": "/run", "method": "POST", "headers": []}
+        async with pool.slot():
+            await middleware(scope, None, send)
+        await middleware(scope, None, send)
+        assert [message["status"] for message in sent if message["type"] == "http.response.start"] == [429, 200]
+        assert (b"retry-after", b"1") in sent[0]["headers"]
+    asyncio.run(scenario())
+
+
+def test_write_slot_is_held_until_the_write_is_done():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            slots = repo.write_admission
+            blocker, release = await hold_writer(repo)
+            skipped = asyncio.create_task(repo.insert(item("skipped")))
+            await queued(repo, 1)
+            assert slots.active == 2
+
+            # The running write still holds its slot after its caller gives up, the
+            # queued one is released once the writer skips it
+            blocker.cancel()
+            skipped.cancel()
+            await asyncio.sleep(0)
+            assert slots.active == 2
+            release.set()
+            while slots.active:
+                await asyncio.sleep(0)
+            assert await repo.get("skipped") is None
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+"""InventoryCache generations: loads racing an invalidation are neither shared nor stored."""
+import asyncio
+from models.data_models import QuantityDelta
+from services.cache import InventoryCache
+from tests import in_memory_service, item
+
+
+def test_load_started_before_an_invalidation_is_not_shared_or_stored():
+    async def scenario():
+        cache = InventoryCache()
+        key = ("query", "inventory")
+        release = asyncio.Event()
+        loads = []
+
+        async def stale_loader():
+            loads.append("stale")
+            await release.wait()
+            return "stale"
+
+        async def fresh_loader():
+            loads.append("fresh")
+            return "fresh"
+
+        stale = asyncio.create_task(cache.get_or_load(key, stale_loader))
+        joined = asyncio.create_task(cache.get_or_load(key, fresh_loader))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        assert await cache.get_or_load(key, fresh_loader) == "fresh"
+        release.set()
+        assert await stale == "stale"
+        # Started in the same generation as the stale load, so it shared it
+        assert await joined == "stale"
+
+        assert loads == ["stale", "fresh"]
+        assert cache.shared_loads == 1
+        assert cache.get(key) == (True, "fresh")
+    asyncio.run(scenario())
+
+
+def test_write_invalidates_cached_reads():
+    async def scenario():
+        async with in_memory_service() as service:
+            await service.create_inventory_item(item("a"))
+            assert (await service.get_inventory_item("a")).quantity == 10
+            assert [entry.id for entry in await service.get_all_inventory_items()] == ["a"]
+            generation = service.cache.generation
+
+            await service.adjust_inventory_quantity("a", QuantityDelta(delta=-4))
+            assert service.cache.generation > generation
+            assert (await service.get_inventory_item("a")).quantity == 6
+            assert (await service.get_all_inventory_items())[0].quantity == 6
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+"""ChangeFeed: catch-up, gap filling, resets and a publisher that outlives failed reads."""
+import asyncio
+from admission import Overloaded
+from services.change_feed import ChangeFeed
+from tests import in_memory_service, item
+
+# Long enough that only notify() wakes the publisher during a test
+IDLE_POLL_SECONDS = 3600
+
+
+async def positioned(feed: ChangeFeed, seq: int):
+    while feed.last_seq != seq:
+        await asyncio.sleep(0)
+
+
+def test_subscriber_fills_a_gap_the_publisher_skipped():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            feed = ChangeFeed(repo, poll_seconds=IDLE_POLL_SECONDS)
+            await repo.insert(item("a"))
+            stream = feed.subscribe(since=0)
+            assert (await anext(stream))["item_id"] == "a"
+            await positioned(feed, 1)
+
+            await repo.insert(item("b"))
+            await repo.insert(item("c"))
+            # The publisher moved past b, e.g. while it had no subscribers to deliver to
+            feed.last_seq = 2
+            feed.notify()
+            assert [(await anext(stream))["item_id"] for _ in range(2)] == ["b", "c"]
+            await stream.aclose()
+            await feed.stop()
+    asyncio.run(scenario())
+
+
+def test_pruned_since_is_reset():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            for item_id in "abc":
+                await repo.insert(item(item_id))
+            await repo.prune_changes(1)
+            feed = ChangeFeed(repo, poll_seconds=IDLE_POLL_SECONDS)
+
+            assert [change async for change in feed.subscribe(since=0)] == [{"op": "reset", "seq": 3}]
+            # Still retained: caught up without a reset
+            stream = feed.subscribe(since=2)
+            assert (await anext(stream))["item_id"] == "c"
+            await stream.aclose()
+            await feed.stop()
+    asyncio.run(scenario())
+
+
+def test_lagging_subscriber_is_reset():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            await repo.insert(item("z"))
+            feed = ChangeFeed(repo, poll_seconds=IDLE_POLL_SECONDS, queue_size=2)
+            stream = feed.subscribe(heartbeat_seconds=IDLE_POLL_SECONDS)
+            # The first step subscribes and catches up, finding nothing, then waits for the publisher
+            first = asyncio.create_task(anext(stream))
+            await positioned(feed, 1)
+            await repo.upsert_many([item(item_id) for item_id in "abcd"])
+            feed.notify()
+
+            changes = [await first] + [change async for change in stream]
+            assert [change["item_id"] for change in changes[:-1]] == ["a", "b"]
+            assert changes[-1] == {"op": "reset", "seq": 5}
+            await feed.stop()
+    asyncio.run(scenario())
+
+
+def test_publisher_retries_a_failed_start():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            get_change_bounds = repo.get_change_bounds
+            failures = []
+
+            async def overloaded_once():
+                if not failures:
+                    failures.append(1)
+                    raise Overloaded("db_read", 503, 1)
+                return await get_change_bounds()
+            repo.get_change_bounds = overloaded_once
+
+            await repo.insert(item("a"))
+            feed = ChangeFeed(repo, poll_seconds=0.01)
+            await feed.start()
+            await positioned(feed, 1)
+            assert failures and not feed._task.done()
+
+            stream = feed.subscribe(heartbeat_seconds=IDLE_POLL_SECONDS)
+            next_change = asyncio.create_task(anext(stream))
+            await asyncio.sleep(0.05)
+            await repo.insert(item("b"))
+            assert (await next_change)["item_id"] == "b"
+            await stream.aclose()
+
+            # An ended publisher is started again
+            await feed.stop()
+            feed._task = asyncio.create_task(asyncio.sleep(0))
+            await feed._task
+            await feed.start()
+            assert not feed._task.done()
+            await feed.stop()
+    asyncio.run(scenario())
@@ -0,0 +1,31 @@
+"""Model call timing: calls paired across callbacks, partial responses skipped, stale calls dropped."""
+from types import SimpleNamespace
+import metrics
+
+
+def context(invocation_id: str) -> SimpleNamespace:
+    return SimpleNamespace(invocation_id=invocation_id, agent_name="test_agent")
+
+
+def calls_timed() -> int:
+    series = metrics.MODEL_CALL_SECONDS._series.get(("test_agent",))
+    return sum(series[:-1]) if series else 0
+
+
+def test_streamed_call_is_timed_once_at_its_final_response():
+    timed = calls_timed()
+    metrics.model_call_started(context("streamed"), None)
+    metrics.model_call_finished(context("streamed"), SimpleNamespace(partial=True))
+    assert calls_timed() == timed
+    metrics.model_call_finished(context("streamed"), SimpleNamespace(partial=False))
+    assert calls_timed() == timed + 1
+    assert ("streamed", "test_agent") not in metrics._model_calls_started
+
+
+def test_calls_that_never_end_are_dropped_once_stale():
+    metrics.model_call_started(context("cancelled"), None)
+    metrics._model_calls_started[("cancelled", "test_agent")] -= metrics.MODEL_CALL_STALE_SECONDS
+    metrics.model_call_started(context("next"), None)
+    assert ("cancelled", "test_agent") not in metrics._model_calls_started
+    metrics.model_call_failed(context("next"), None, TimeoutError())
+    assert ("next", "test_agent") not in metrics._model_calls_started
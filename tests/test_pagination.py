@@ -0,0 +1,37 @@
+"""Keyset pagination of the inventory listing."""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from services.cursor import encode_cursor
+from tests import in_memory_service, item
+
+
+def test_keyset_pages_split_equal_timestamps():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            await repo.upsert_many([item(f"i{index}") for index in range(7)])
+
+            async def same_timestamp(db):
+                await db.execute("UPDATE Inventory SET last_updated = '2024-01-01T00:00:00'")
+            await repo._execute_write(same_timestamp)
+            service.cache.invalidate()
+
+            pages, cursor = [], None
+            while True:
+                items, cursor = await service.get_inventory_page(3, cursor)
+                pages.append([entry.id for entry in items])
+                if cursor is None:
+                    break
+            assert pages == [["i6", "i5", "i4"], ["i3", "i2", "i1"], ["i0"]]
+    asyncio.run(scenario())
+
+
+def test_malformed_cursor_is_a_bad_request():
+    async def scenario():
+        async with in_memory_service() as service:
+            for cursor in ("not base64!", encode_cursor(("only one part",))):
+                with pytest.raises(HTTPException) as invalid:
+                    await service.get_inventory_page(3, cursor)
+                assert invalid.value.status_code == 400
+    asyncio.run(scenario())
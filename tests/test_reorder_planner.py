@@ -0,0 +1,48 @@
+"""ReorderPlanner: priority order, budget funding and the snapshot kept current from the change log."""
+import asyncio
+from models.data_models import InventoryItem, QuantityDelta
+from services.reorder_planner import InventorySnapshot, ReorderPlanner
+from tests import in_memory_service
+
+
+def row(item_id: str, quantity: int, reorder_level: int, unit_price: float, supplier: str = "Acme") -> tuple:
+    return item_id, f"Item {item_id}", quantity, reorder_level, unit_price, supplier, "Spare Parts"
+
+
+def test_budget_skips_orders_that_no_longer_fit():
+    snapshot = InventorySnapshot(0, [
+        row("out", 0, 10, 11.25),         # stock-out: 20 units for 225
+        row("low", 4, 10, 1.0),           # 16 units for 16
+        row("free", 5, 10, 0.0),          # 15 units for nothing
+        row("half", 5, 10, 6.0),          # 15 units for 90
+        row("stocked", 20, 10, 1.0),
+    ])
+    plan = ReorderPlanner(None).plan_snapshot(snapshot, budget=100)
+
+    assert [line["item_id"] for line in plan["lines"]] == ["out", "low", "free", "half"]
+    assert {line["item_id"]: line["funded"] for line in plan["lines"]} == {
+        "out": False, "low": True, "free": True, "half": False}
+    assert (plan["items"], plan["cost"], plan["funded_items"], plan["funded_cost"]) == (4, 331.0, 2, 16.0)
+    # What the stock-out leaves over still funds the cheaper orders behind it
+    assert ReorderPlanner(None).plan_snapshot(snapshot, budget=250)["funded_cost"] == 241.0
+
+
+def test_plan_follows_writes_through_the_change_log():
+    async def scenario():
+        async with in_memory_service() as service:
+            await service.create_inventory_item(InventoryItem(
+                id="a", item_name="Bolts", category="Spare Parts", quantity=2, reorder_level=10,
+                supplier="Acme", unit_price=1.0))
+            assert (await service.plan_reorders())["lines"][0]["order_quantity"] == 18
+            snapshot = service.planner._snapshot
+
+            await service.adjust_inventory_quantity("a", QuantityDelta(delta=6))
+            plan = await service.plan_reorders()
+            assert service.planner._snapshot is snapshot
+            assert plan["lines"][0]["order_quantity"] == 12
+            assert plan["suppliers"] == [{"supplier": "Acme", "items": 1, "units": 12, "cost": 12.0,
+                                          "funded_items": 1, "funded_cost": 12.0}]
+
+            await service.adjust_inventory_quantity("a", QuantityDelta(delta=10))
+            assert (await service.plan_reorders())["items"] == 0
+    asyncio.run(scenario())
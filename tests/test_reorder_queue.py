@@ -0,0 +1,67 @@
+"""Reorder queue triggers and the ReorderFlusher delivering their outbox to the webhook."""
+import asyncio
+import httpx
+import orjson
+from models.data_models import QuantityAdjustment
+from services.reorder_flusher import ReorderFlusher
+from tests import in_memory_service, item
+
+
+async def queued_shortages(repo) -> dict:
+    return {line["item_id"]: line["shortage"] for group in await repo.list_reorder_queue() for line in group["items"]}
+
+
+async def pending_events(repo) -> list:
+    async with repo._reader() as db:
+        cursor = await db.execute(
+            "SELECT event, item_id, shortage FROM ReorderEvents WHERE delivered_at IS NULL ORDER BY seq")
+        return [tuple(row) for row in await cursor.fetchall()]
+
+
+def test_triggers_queue_and_clear_items_below_their_reorder_level():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            # reorder_level is 5
+            await repo.upsert_many([item("low", 2), item("stocked", 8)])
+            assert await queued_shortages(repo) == {"low": 3}
+
+            await repo.adjust_quantities([QuantityAdjustment(item_id="low", delta=-1),
+                                          QuantityAdjustment(item_id="stocked", delta=-4)])
+            assert await queued_shortages(repo) == {"low": 4, "stocked": 1}
+
+            await repo.adjust_quantities([QuantityAdjustment(item_id="low", delta=10)])
+            await repo.delete("stocked")
+            assert await queued_shortages(repo) == {}
+            # One event per transition into or out of the queue, not per movement
+            assert await pending_events(repo) == [
+                ("queued", "low", 3), ("queued", "stocked", 1), ("cleared", "low", 4), ("cleared", "stocked", 1)]
+    asyncio.run(scenario())
+
+
+def test_flusher_delivers_in_order_and_retries_after_the_lease():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            await repo.upsert_many([item("a", 1), item("b", 2)])
+            answers, posted = [500, 200], []
+
+            def webhook(request: httpx.Request) -> httpx.Response:
+                posted.append([event["item_id"] for event in orjson.loads(request.content)["events"]])
+                return httpx.Response(answers.pop(0))
+            flusher = ReorderFlusher(repo, webhook_url="http://reorders.test/hook")
+            flusher._client = httpx.AsyncClient(transport=httpx.MockTransport(webhook))
+
+            assert await flusher.flush() == 0
+            # Still claimed by the failed delivery: not posted again before the lease ends
+            assert await flusher.flush() == 0
+            assert len(await pending_events(repo)) == 2
+
+            async def lease_ended(db):
+                await db.execute("UPDATE ReorderEvents SET claimed_until = '2000-01-01T00:00:00'")
+            await repo._execute_write(lease_ended)
+            assert await flusher.flush() == 2
+            assert posted == [["a", "b"], ["a", "b"]]
+            assert await pending_events(repo) == []
+            await flusher.stop()
+    asyncio.run(scenario())
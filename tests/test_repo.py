@@ -0,0 +1,82 @@
+"""Behaviour of the Repo write path on the in-memory backend."""
+import asyncio
+import pytest
+from models.data_models import QuantityAdjustment
+from repos.repo import AdjustmentError, Repo
+from tests import hold_writer, in_memory_service, item, queued
+
+
+def test_failing_write_in_a_batch_rolls_back_alone():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            await repo.upsert_many([item("a"), item("b")])
+            batch_sizes = []
+            commit_batch = repo._commit_batch
+
+            async def recording(batch):
+                batch_sizes.append(len(batch))
+                await commit_batch(batch)
+            repo._commit_batch = recording
+
+            blocker, release = await hold_writer(repo)
+            insert = asyncio.create_task(repo.insert(item("c")))
+            # Applies the delta to a, then is refused on the missing item
+            failing = asyncio.create_task(repo.adjust_quantities(
+                [QuantityAdjustment(item_id="a", delta=5), QuantityAdjustment(item_id="missing", delta=1)]))
+            adjust = asyncio.create_task(repo.adjust_quantities([QuantityAdjustment(item_id="b", delta=-3)]))
+            await queued(repo, 3)
+            release.set()
+            await blocker
+            await insert
+            with pytest.raises(AdjustmentError) as refused:
+                await failing
+            assert refused.value.reason == "not_found"
+            assert (await adjust)[0]["quantity"] == 7
+
+            assert batch_sizes == [1, 3]
+            assert (await repo.get("a")).quantity == 10
+            assert (await repo.get("b")).quantity == 7
+            assert await repo.get("c") is not None
+    asyncio.run(scenario())
+
+
+def test_cancelled_write_is_skipped():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            blocker, release = await hold_writer(repo)
+            cancelled = asyncio.create_task(repo.insert(item("skipped")))
+            kept = asyncio.create_task(repo.insert(item("kept")))
+            await queued(repo, 2)
+            cancelled.cancel()
+            release.set()
+            await blocker
+            await kept
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+
+            assert await repo.get("skipped") is None
+            assert await repo.get("kept") is not None
+            # The writer task is still serving writes
+            await repo.insert(item("later"))
+            assert await repo.get("later") is not None
+    asyncio.run(scenario())
+
+
+def test_write_queued_after_close_fails():
+    async def scenario():
+        repo = Repo(":memory:", reader_pool_size=0)
+        await repo.init_db()
+        blocker, release = await hold_writer(repo)
+        closing = asyncio.create_task(repo.close())
+        await queued(repo, 1)
+        late = asyncio.create_task(repo.insert(item("late")))
+        await queued(repo, 2)
+        release.set()
+        await closing
+        await blocker
+        with pytest.raises(RuntimeError, match="Repo closed"):
+            await late
+        assert repo.write_admission.active == 0
+    asyncio.run(scenario())
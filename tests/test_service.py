@@ -0,0 +1,46 @@
+"""Service writes: what they return to the routers."""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from models.data_models import QuantityDelta
+from tests import in_memory_service, item
+
+
+def test_update_returns_the_stored_item():
+    async def scenario():
+        async with in_memory_service() as service:
+            await service.create_inventory_item(item("a"))
+            updated = await service.update_inventory_item("a", item("ignored", quantity=3))
+
+            assert (updated.id, updated.quantity, updated.version) == ("a", 3, 1)
+            assert updated.last_updated is not None
+            assert updated == await service.get_inventory_item("a")
+            # The returned version is the one the next guarded write expects
+            adjusted = await service.adjust_inventory_quantity(
+                "a", QuantityDelta(delta=1, expected_version=updated.version))
+            assert adjusted["version"] == 2
+
+            with pytest.raises(HTTPException) as missing:
+                await service.update_inventory_item("missing", item("missing"))
+            assert missing.value.status_code == 404
+    asyncio.run(scenario())
+
+
+def test_bulk_upserts_report_each_row():
+    async def scenario():
+        async with in_memory_service() as service:
+            await service.create_inventory_item(item("a"))
+            report = await service.bulk_upsert_inventory_items(
+                [item("a", quantity=1), {"id": "b"}, ValueError("bad CSV row"), item("c").model_dump()])
+            assert {key: report[key] for key in ("inserted", "updated", "rejected")} == {
+                "inserted": 1, "updated": 1, "rejected": 2}
+            assert [(result["id"], result["status"]) for result in report["results"]] == [
+                ("a", "updated"), ("b", "rejected"), (None, "rejected"), ("c", "inserted")]
+            assert (await service.get_inventory_item("a")).quantity == 1
+
+            report = await service.bulk_upsert_suppliers([{"id": "s1", "name": "Acme"}, {"name": "No id"}])
+            assert [(result["id"], result["status"]) for result in report["results"]] == [
+                ("s1", "inserted"), (None, "rejected")]
+            # Linked to the new supplier, and the cached item was dropped
+            assert (await service.get_inventory_item("a")).supplier_id == "s1"
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+"""Stock ledger: point-in-time stock and idle items stay answerable after compaction and pruning."""
+import asyncio
+from datetime import datetime, timedelta
+from models.data_models import QuantityAdjustment
+from tests import in_memory_service, item
+
+
+async def moment() -> datetime:
+    # Movements are stamped in milliseconds: keep the moments around them apart
+    await asyncio.sleep(0.01)
+    now = datetime.utcnow()
+    await asyncio.sleep(0.01)
+    return now
+
+
+def test_stock_history_survives_compaction_and_pruning():
+    async def scenario():
+        async with in_memory_service() as service:
+            repo = service.repo
+            before = await moment()
+            await repo.insert(item("a", quantity=10))
+            await repo.insert(item("idle", quantity=4))
+            await repo.adjust_quantities([QuantityAdjustment(item_id="a", delta=-3)])
+            compacted = await moment()
+            assert await repo.compact_stock_ledger() == 2
+            assert await repo.compact_stock_ledger() == 0
+            between = await moment()
+            await repo.adjust_quantities([QuantityAdjustment(item_id="a", delta=5)])
+
+            future = datetime.utcnow() + timedelta(days=1)
+            # Only the three movements covered by the compaction go; each item keeps its snapshot
+            assert await repo.prune_stock_ledger(future, future) == (3, 0)
+
+            assert await repo.get_stock_at("a", before) is None
+            assert await repo.get_stock_at("a", between) == 7
+            assert await repo.get_stock_at("a", datetime.utcnow()) == 12
+            assert await repo.get_stock_at("idle", between) == 4
+            # Read from the snapshot's last movement time, not the compaction time
+            assert [entry.id for entry in await repo.list_idle_since(compacted)] == ["idle"]
+            assert [movement["item_id"] for movement in await repo.list_stock_movements(before)] == ["a"]
+    asyncio.run(scenario())